@@ -1,4 +1,9 @@
-DATABASE_URI = 'sqlite:///monitoring.db'
+DATABASE_URI = 'sqlite:///data/monitoring.db'  # Relative SQLite paths are resolved from the project root
+DATABASE_POOL_SIZE = 10  # Persistent connections (SQLite: read connections; writes use a single connection)
+DATABASE_MAX_OVERFLOW = 20  # Extra connections allowed under load
+DATABASE_POOL_TIMEOUT = 30  # Seconds to wait for a free pooled connection
+SQLITE_BUSY_TIMEOUT = 5000  # ms SQLite retries on a locked database before failing
+SQLITE_MMAP_SIZE = 268435456  # Bytes of the database file memory-mapped for reads (256 MB)
 MONITORING_INTERVAL = 30  # in seconds
 LOGGING_LEVEL = 'INFO'  # Options: DEBUG, INFO, WARNING, ERROR, CRITICAL
-DEBUG_MODE = True  # Set to False in production
\ No newline at end of file
+DEBUG_MODE = True  # Set to False in production
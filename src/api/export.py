@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from storage.database import iter_results, EXPORT_COLUMNS
+
+export_api = Blueprint('export_api', __name__, url_prefix='/api/export')
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+# Bytes de texto que se acumulan antes de enviar (o comprimir) un trozo de la respuesta
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_time(value):
+    """Convierte una fecha ISO 8601 en datetime UTC naive (como se guardan); None si no hay valor.
+
+    Lanza ValueError si el formato no es válido.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record['checked_at'] = record['checked_at'].isoformat() if record['checked_at'] else None
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        values = list(row)
+        values[EXPORT_COLUMNS.index('checked_at')] = row.checked_at.isoformat() if row.checked_at else ''
+        writer.writerow(values)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _chunks(lines, compress):
+    """Agrupa las líneas en trozos de ~CHUNK_SIZE y, si se pide, los comprime en gzip al vuelo"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: formato gzip
+    pending = []
+    size = 0
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            data = ''.join(pending).encode('utf-8')
+            pending, size = [], 0
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+    data = ''.join(pending).encode('utf-8')
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+@export_api.route('/results', methods=['GET'])
+def export_results():
+    """Exporta el histórico de resultados en NDJSON o CSV, en streaming y opcionalmente con gzip.
+
+    Parámetros: url o prefix, since (inclusivo) y until (exclusivo) en ISO 8601,
+    format=ndjson|csv y compress=gzip. La memoria usada es constante sea cual
+    sea el número de filas.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'Formato inválido. Disponibles: {list(EXPORT_FORMATS)}'}), 400
+    compress = request.args.get('compress')
+    if compress not in (None, '', 'gzip'):
+        return jsonify({'success': False, 'message': 'compress solo admite gzip'}), 400
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'since y until deben ser fechas ISO 8601'}), 400
+
+    rows = iter_results(
+        url=request.args.get('url'),
+        url_prefix=request.args.get('prefix'),
+        since=since,
+        until=until
+    )
+    lines = _ndjson_lines(rows) if fmt == 'ndjson' else _csv_lines(rows)
+
+    filename = f'results.{fmt}'
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    else:
+        mimetype = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(_chunks(lines, bool(compress))),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
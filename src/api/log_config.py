@@ -41,4 +41,33 @@ def set_level():
             'config': logging_manager.get_current_config()
         })
     else:
-        return jsonify({'success': False, 'message': 'Error al cambiar nivel de logging'}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'message': 'Error al cambiar nivel de logging'}), 500
+
+@log_api.route('/pipeline', methods=['GET'])
+def get_pipeline():
+    """Configuración y contadores del pipeline de logging (cola, muestreo y límite por URL)."""
+    return jsonify({
+        'success': True,
+        'pipeline': logging_manager.pipeline,
+        'stats': logging_manager.get_pipeline_stats()
+    })
+
+@log_api.route('/pipeline', methods=['POST'])
+def set_pipeline():
+    """Cambia en caliente format (text/json), sample_rate, url_rate o url_burst."""
+    data = request.json
+    if not data:
+        return jsonify({'success': False, 'message': 'Opciones no especificadas'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Las opciones deben ser un objeto JSON'}), 400
+    
+    try:
+        logging_manager.set_pipeline(**data)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'pipeline': logging_manager.pipeline,
+        'stats': logging_manager.get_pipeline_stats()
+    })
@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+from utils.metrics import REGISTRY
+
+metrics_api = Blueprint('metrics_api', __name__)
+
+
+@metrics_api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas del proceso en formato de texto de Prometheus"""
+    return Response(REGISTRY.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+
+# Locks de reconstrucción repartidos por hash de la clave: memoria fija sea cual sea
+# el número de claves distintas que lleguen (cursores, rangos, parámetros arbitrarios)
+BUILD_LOCK_STRIPES = 64
+
+
+class _Entry:
+    __slots__ = ('version', 'built_at', 'etag', 'body', 'mimetype')
+
+    def __init__(self, version, built_at, etag, body, mimetype):
+        self.version = version
+        self.built_at = built_at
+        self.etag = etag
+        self.body = body
+        self.mimetype = mimetype
+
+
+class ResponseCache:
+    """Caché de respuestas de los endpoints de lectura, invalidada por versión.
+
+    Cada entrada guarda el cuerpo ya serializado junto a la versión de los
+    datos con que se construyó (DataVersions). Mientras la versión no cambie
+    se sirve tal cual, y si el cliente ya tiene ese ETag se responde 304 sin
+    cuerpo. Con `max_staleness` > 0 una entrada recién construida se sirve
+    aunque haya llegado algún resultado nuevo, de modo que con muchas
+    comprobaciones por segundo cada respuesta se reconstruye como mucho una
+    vez por ese intervalo sin importar cuántos clientes la pidan. Las
+    reconstrucciones simultáneas de la misma clave se hacen una sola vez
+    (claves distintas pueden compartir lock y esperarse entre sí).
+    """
+
+    def __init__(self, versions, max_entries=512, max_staleness=1.0):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.max_staleness = max_staleness
+        self._entries = OrderedDict()  # clave -> _Entry, en orden LRU
+        self._build_locks = [threading.Lock() for _ in range(BUILD_LOCK_STRIPES)]
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _fresh(self, entry, version):
+        if entry is None:
+            return False
+        return entry.version == version or time.monotonic() - entry.built_at < self.max_staleness
+
+    def _lookup(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if not self._fresh(entry, version):
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _build_lock(self, key):
+        return self._build_locks[hash(key) % BUILD_LOCK_STRIPES]
+
+    def respond(self, key, version, build):
+        """Respuesta para `key` con los datos en `version`; `build` genera la respuesta si hace falta.
+
+        Solo se guardan las respuestas 200; el resto se devuelven sin cachear.
+        """
+        entry = self._lookup(key, version)
+        if entry is None:
+            with self._build_lock(key):
+                # Otro hilo pudo construirla mientras esperábamos el turno
+                entry = self._lookup(key, version)
+                if entry is None:
+                    built_at = time.monotonic()
+                    response = current_app.make_response(build())
+                    if response.status_code != 200:
+                        return response
+                    with self._lock:
+                        self.misses += 1
+                    body = response.get_data()
+                    etag = hashlib.sha1(f'{key}|{version}'.encode('utf-8') + body).hexdigest()
+                    entry = _Entry(version, built_at, etag, body, response.mimetype)
+                    self._store(key, entry)
+
+        if request.if_none_match.contains(entry.etag):
+            with self._lock:
+                self.not_modified += 1
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        # El navegador guarda la respuesta pero la revalida en cada sondeo
+        response.cache_control.no_cache = True
+        return response
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'max_staleness': self.max_staleness,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_ratio': round(self.hits / total, 4) if total else None
+            }
+
+
+def cached_view(get_cache, per_url=False):
+    """Decorador para vistas GET cacheadas por ruta completa y versión de datos.
+
+    `get_cache` devuelve la ResponseCache activa (o None para no cachear).
+    Con `per_url` la versión es la de la URL del parámetro `url`, si viene;
+    si no, la global.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return view(*args, **kwargs)
+            url = request.args.get('url') if per_url else None
+            version = cache.versions.get(url)
+            return cache.respond(request.full_path, version, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -1,51 +1,139 @@
-from flask import Blueprint, jsonify, request, current_app
+import base64
+import hashlib
+import json
+import math
+import time
+from flask import Blueprint, jsonify, request, current_app, g
 from monitor.checker import UptimeChecker
-from storage.database import save_result, get_results
-from datetime import datetime
+from storage.database import get_results, backend, PHASE_COLUMNS
+from datetime import datetime, timedelta, timezone
+from monitor.stats import WINDOWS
+from monitor.sharding import ShardCoordinator
+from storage.timeseries import get_timeseries, timeseries_version, MAX_BUCKETS
+from api.export import parse_time
+from api.response_cache import ResponseCache, cached_view
+from utils.metrics import REGISTRY
 
 api = Blueprint('api', __name__, url_prefix='/api')
 uptime_checker = None
+response_cache = None
 
-def init_routes(checker):
-    global uptime_checker
+REQUEST_DURATION = REGISTRY.histogram(
+    'uptime_api_request_duration_seconds', 'Duración de las peticiones a la API por endpoint', ['endpoint', 'method']
+)
+REQUESTS = REGISTRY.counter('uptime_api_requests_total', 'Peticiones a la API por endpoint y estado', ['endpoint', 'status'])
+
+def init_routes(checker, cache_staleness=1.0):
+    """Enlaza el checker con la API; `cache_staleness` son los segundos que una
+    respuesta cacheada puede servirse aunque hayan llegado resultados nuevos"""
+    global uptime_checker, response_cache
     uptime_checker = checker
+    response_cache = ResponseCache(checker.versions, max_staleness=cache_staleness) if checker else None
+
+def _response_cache():
+    return response_cache
+
+@api.before_request
+def _start_timer():
+    g.api_started = time.perf_counter()
+
+@api.after_request
+def _observe_request(response):
+    started = g.pop('api_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_DURATION.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(endpoint, response.status_code).inc()
+    return response
+
+URL_STATUSES = ('up', 'down', 'unknown')
+MAX_PER_PAGE = 1000
+# Máximo de URLs por petición de alta en bloque
+MAX_BULK_URLS = 50000
+# Origen para alinear a múltiplos del ancho de bucket las series con window
+EPOCH = datetime(1970, 1, 1)
+
+def _summarize_history(results):
+    """Convierte los últimos resultados de una URL en historial de estados y porcentaje de disponibilidad"""
+    history = []
+    successful_checks = 0
+    
+    for result in results:
+        if result.is_up:
+            history.append('up')
+            successful_checks += 1
+        elif result.status_code == 0:
+            history.append('unknown')
+        else:
+            history.append('down')
+    
+    # Calcular porcentaje (evitar división por cero)
+    uptime_percentage = 0
+    if results:
+        uptime_percentage = round((successful_checks / len(results)) * 100)
+    return history, uptime_percentage
+
+def _phase_timings(result):
+    """Desglose por fases de un resultado ({fase: ms}) o None si no se midió"""
+    timings = {phase: getattr(result, column) for phase, column in PHASE_COLUMNS.items()}
+    if all(value is None for value in timings.values()):
+        return None
+    return timings
+
+def _current_status(state):
+    """Estado de una URL según (status_code, is_up) de su último resultado"""
+    if state is None:
+        return 'unknown'
+    status_code, is_up = state
+    if is_up:
+        return 'up'
+    return 'unknown' if status_code == 0 else 'down'
 
 @api.route('/urls', methods=['GET'])
+@cached_view(_response_cache)
 def get_urls():
-    if uptime_checker:
-        urls_with_data = []
-        for url, interval in uptime_checker.urls.items():
-            # Obtener los últimos 10 resultados para cada URL
-            results = get_results(url, limit=10)
-            history = []
-            
-            # Calcular el porcentaje de disponibilidad
-            total_checks = len(results)
-            successful_checks = 0
-            
-            for result in results:
-                if result.is_up:
-                    history.append('up')
-                    successful_checks += 1
-                elif result.status_code == 0:
-                    history.append('unknown')
-                else:
-                    history.append('down')
-            
-            # Calcular porcentaje (evitar división por cero)
-            uptime_percentage = 0
-            if total_checks > 0:
-                uptime_percentage = round((successful_checks / total_checks) * 100)
-            
-            urls_with_data.append({
-                'url': url,
-                'interval': interval,
-                'history': history,
-                'uptime_percentage': uptime_percentage,
-                'status': history[0] if history else 'unknown'
-            })
-        return jsonify({'urls': urls_with_data})
-    return jsonify({'urls': []})
+    if not uptime_checker:
+        return jsonify({'urls': [], 'total': 0, 'page': 1, 'per_page': 0})
+    
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(MAX_PER_PAGE, max(1, int(request.args.get('per_page', 100))))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page y per_page deben ser enteros'}), 400
+    
+    status = request.args.get('status')
+    if status and status not in URL_STATUSES:
+        return jsonify({'success': False, 'message': f'Estado inválido. Disponibles: {list(URL_STATUSES)}'}), 400
+    prefix = request.args.get('prefix')
+    
+    urls = sorted(uptime_checker.urls.items())
+    if prefix:
+        urls = [(url, interval) for url, interval in urls if url.startswith(prefix)]
+    
+    # Los últimos resultados se sirven desde la caché en memoria del checker
+    recent = uptime_checker.recent_results
+    if status:
+        # Para filtrar basta el último resultado de cada URL; el historial solo se lee para la página
+        states = recent.latest_states(url for url, _ in urls)
+        urls = [(url, interval) for url, interval in urls if _current_status(states.get(url)) == status]
+    total = len(urls)
+    urls = urls[(page - 1) * per_page:page * per_page]
+    
+    urls_with_data = []
+    for url, interval in urls:
+        history, uptime_percentage = _summarize_history(recent.get(url, 10))
+        urls_with_data.append({
+            'url': url,
+            'interval': interval,
+            'timing': uptime_checker.timings.get(url, 'warm'),
+            'probe_mode': uptime_checker.probe_modes.get(url, 'full'),
+            'dns_cache': uptime_checker.dns_caching.get(url, True),
+            'history': history,
+            'uptime_percentage': uptime_percentage,
+            'uptime_24h': uptime_checker.stats.uptime(url, '24h'),
+            'status': history[0] if history else 'unknown'
+        })
+    return jsonify({'urls': urls_with_data, 'total': total, 'page': page, 'per_page': per_page})
 
 @api.route('/urls', methods=['POST'])
 def add_url():
@@ -55,26 +143,139 @@ def add_url():
     
     url = data['url']
     interval = data.get('interval', 30)  # Intervalo predeterminado si no se proporciona
+    timing = data.get('timing')  # 'warm' o 'cold'; None conserva el modo actual
+    probe_mode = data.get('probe_mode')  # 'head', 'headers', 'partial' o 'full'; None conserva el modo actual
+    dns_cache = data.get('dns_cache')  # false para medir la resolución DNS en cada sonda nueva
     
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
+    url = _normalize_url(url)
     
     if uptime_checker:
         try:
             # Si la URL ya existe, simplemente actualiza el intervalo
             existing = url in uptime_checker.urls
-            uptime_checker.add_url(url, interval)
+            uptime_checker.add_url(url, interval, timing, probe_mode, dns_cache)
             
-            # Si es una URL nueva, realizar un primer chequeo inmediato
+            # Si es una URL nueva, realizar un primer chequeo inmediato; si el planificador
+            # ya la está sondeando se comparte esa sonda en lugar de lanzar otra
             if not existing:
-                result = uptime_checker.check_url(url)
+                result, _ = uptime_checker.check_now(url)
+                return jsonify({'success': True, 'message': 'URL añadida correctamente', 'result': result})
             
             return jsonify({'success': True, 'message': 'URL añadida correctamente'})
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         except Exception as e:
             return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
     
     return jsonify({'success': False, 'message': 'Error interno del servidor'}), 500
 
+@api.route('/urls/check', methods=['POST'])
+def check_url_now():
+    """Verifica una URL al momento y devuelve el resultado.
+
+    Si ya hay una sonda en curso para la URL se espera a ella y se devuelve su
+    resultado (shared=true) en lugar de sondear otra vez.
+    """
+    data = request.get_json(silent=True) or {}
+    url = data.get('url') or request.args.get('url')
+    if not url:
+        return jsonify({'success': False, 'message': 'URL no proporcionada'}), 400
+    if not uptime_checker:
+        return jsonify({'success': False, 'message': 'Monitor no inicializado'}), 503
+    
+    try:
+        result, shared = uptime_checker.check_now(_normalize_url(url))
+    except KeyError:
+        return jsonify({'success': False, 'message': 'URL no encontrada'}), 404
+    except Exception as e:
+        current_app.logger.error(f"Error al verificar {url}: {str(e)}")
+        return jsonify({'success': False, 'message': f'Error interno: {str(e)}'}), 500
+    return jsonify({'success': True, 'shared': shared, 'result': result})
+
+def _normalize_url(url):
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+def _bulk_entries():
+    """Entradas del alta en bloque: lista JSON (o {"urls": [...]}) o NDJSON, una por línea.
+
+    Cada entrada es una URL o un objeto con url y opcionalmente interval,
+    timing, probe_mode y dns_cache. Lanza ValueError si el cuerpo no es válido.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), 1):
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    raise ValueError(f'Línea {number}: JSON inválido')
+    else:
+        items = request.get_json(silent=True)
+        if isinstance(items, dict):
+            items = items.get('urls')
+        if not isinstance(items, list):
+            raise ValueError('Se esperaba una lista de URLs, {"urls": [...]} o NDJSON')
+    
+    entries = []
+    for position, item in enumerate(items):
+        if isinstance(item, str):
+            item = {'url': item}
+        if not isinstance(item, dict) or not isinstance(item.get('url'), str) or not item['url'].strip():
+            raise ValueError(f'Entrada {position}: falta la URL')
+        entry = {key: item.get(key) for key in ('interval', 'timing', 'probe_mode', 'dns_cache')}
+        entry['url'] = _normalize_url(item['url'].strip())
+        entries.append(entry)
+    return entries
+
+@api.route('/urls/bulk', methods=['POST'])
+def add_urls_bulk():
+    """Alta o actualización de muchas URLs en una transacción; responde al momento con un trabajo.
+
+    Las URLs nuevas se programan para su primera verificación y sus resultados
+    se consultan en GET /api/urls/bulk/<job_id>.
+    """
+    if not uptime_checker:
+        return jsonify({'success': False, 'message': 'Monitor no inicializado'}), 503
+    try:
+        entries = _bulk_entries()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not entries:
+        return jsonify({'success': False, 'message': 'No se han proporcionado URLs'}), 400
+    if len(entries) > MAX_BULK_URLS:
+        return jsonify({'success': False, 'message': f'Máximo {MAX_BULK_URLS} URLs por petición'}), 413
+    
+    try:
+        job = uptime_checker.add_urls(entries)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error en el alta en bloque: {str(e)}")
+        return jsonify({'success': False, 'message': f'Error interno: {str(e)}'}), 500
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'added': len(job.urls),
+        'updated': job.updated,
+        'status_url': f'/api/urls/bulk/{job.id}'
+    }), 202
+
+@api.route('/urls/bulk/<job_id>', methods=['GET'])
+def get_bulk_job(job_id):
+    """Progreso de un alta en bloque y primeros resultados de sus URLs (paginados con offset/limit)"""
+    job = uptime_checker.imports.get(job_id) if uptime_checker else None
+    if job is None:
+        return jsonify({'success': False, 'message': 'Trabajo no encontrado'}), 404
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(MAX_PER_PAGE, max(1, int(request.args.get('limit', MAX_PER_PAGE))))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'offset y limit deben ser enteros'}), 400
+    return jsonify(dict(job.to_dict(offset, limit), success=True))
+
 @api.route('/urls', methods=['DELETE'])
 def remove_url():
     url = request.args.get('url')
@@ -89,12 +290,63 @@ def remove_url():
         current_app.logger.error(f"Error al eliminar URL {url}: {str(e)}")
         return jsonify({'success': False, 'message': f'Error interno: {str(e)}'}), 500
 
+def _recent_results(url, limit):
+    """Últimos resultados de una URL desde la caché; recurre a la base de datos si no alcanza"""
+    if uptime_checker and url in uptime_checker.recent_results and limit <= uptime_checker.recent_results.capacity:
+        return uptime_checker.recent_results.get(url, limit)
+    return get_results(url, limit)
+
+def _encode_cursor(result):
+    """Cursor opaco con (checked_at, id) de la última fila de una página.
+
+    Los resultados servidos desde la caché no tienen id todavía (se escriben
+    en bloque más tarde); su cursor continúa por fecha estrictamente anterior.
+    """
+    payload = [result.checked_at.isoformat(), getattr(result, 'id', None)]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+def _decode_cursor(value):
+    """Inverso de _encode_cursor; lanza ValueError si el cursor no es válido"""
+    try:
+        checked_at, result_id = json.loads(base64.urlsafe_b64decode(value.encode('ascii')))
+        if result_id is not None:
+            result_id = int(result_id)
+        checked_at = parse_time(checked_at)
+    except (TypeError, ValueError, UnicodeEncodeError) as e:
+        raise ValueError(f'Cursor inválido: {value}') from e
+    if checked_at is None:
+        raise ValueError(f'Cursor inválido: {value}')
+    return checked_at, result_id
+
+def _page_args(default_limit):
+    """Lee limit, cursor, since y until de la petición; lanza ValueError si no son válidos"""
+    limit = min(MAX_PER_PAGE, max(1, int(request.args.get('limit', default_limit))))
+    cursor = request.args.get('cursor')
+    before = _decode_cursor(cursor) if cursor else None
+    since = parse_time(request.args.get('since'))
+    until = parse_time(request.args.get('until'))
+    return limit, before, since, until
+
+def _results_page(url, limit, before, since, until):
+    """Una página de resultados y el cursor de la siguiente (None si es la última)"""
+    if before is None and since is None and until is None:
+        # Primera página sin filtros: se sirve desde la caché si alcanza
+        results = _recent_results(url, limit)
+    else:
+        results = get_results(url, limit, since=since, until=until, before=before)
+    next_cursor = _encode_cursor(results[-1]) if len(results) == limit else None
+    return results, next_cursor
+
 @api.route('/results', methods=['GET'])
+@cached_view(_response_cache, per_url=True)
 def get_monitoring_results():
     url = request.args.get('url')
-    limit = int(request.args.get('limit', 100))
+    try:
+        limit, before, since, until = _page_args(100)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
-    results = get_results(url, limit)
+    results, next_cursor = _results_page(url, limit, before, since, until)
     
     # Convertir resultados a formato JSON
     results_json = []
@@ -104,12 +356,14 @@ def get_monitoring_results():
             'status_code': result.status_code,
             'response_time': result.response_time,
             'is_up': result.is_up,
-            'checked_at': result.checked_at.isoformat() if result.checked_at else None
+            'checked_at': result.checked_at.isoformat() if result.checked_at else None,
+            'timings': _phase_timings(result)
         })
     
-    return jsonify({'results': results_json})
+    return jsonify({'results': results_json, 'next_cursor': next_cursor})
 
 @api.route('/url-details', methods=['GET'])
+@cached_view(_response_cache, per_url=True)
 def get_url_details():
     url = request.args.get('url')
     if not url:
@@ -118,14 +372,19 @@ def get_url_details():
     # Obtener el intervalo real desde uptime_checker
     interval = uptime_checker.urls.get(url, 30) if uptime_checker else 30
     
-    # Obtener hasta 100 resultados para la URL
-    results = get_results(url, limit=100)
+    # Obtener hasta 100 resultados para la URL (o la página pedida con cursor/since/until)
+    try:
+        limit, before, since, until = _page_args(100)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    results, next_cursor = _results_page(url, limit, before, since, until)
     
     # Convertir resultados a formato JSON
     details = {
         'url': url,
         'interval': interval,  # Usar el valor real del intervalo
-        'history': []
+        'history': [],
+        'next_cursor': next_cursor
     }
     
     for result in results:
@@ -133,7 +392,8 @@ def get_url_details():
             'status_code': result.status_code,
             'response_time': result.response_time,
             'is_up': result.is_up,
-            'checked_at': result.checked_at.isoformat() if result.checked_at else None
+            'checked_at': result.checked_at.isoformat() if result.checked_at else None,
+            'timings': _phase_timings(result)
         })
     
     # Calcular disponibilidad
@@ -142,4 +402,149 @@ def get_url_details():
     uptime_percentage = round((up / total) * 100) if total > 0 else 0
     details['uptime_percentage'] = uptime_percentage
     
-    return jsonify(details)
\ No newline at end of file
+    # Cifras de SLA de las ventanas deslizantes
+    if uptime_checker:
+        details['stats'] = uptime_checker.stats.snapshot(url)
+        if uptime_checker.policy:
+            details['policy'] = uptime_checker.policy.state(url)
+    
+    return jsonify(details)
+
+@api.route('/storage/stats', methods=['GET'])
+def get_storage_stats():
+    """Estado del buffer de escritura de resultados"""
+    if not uptime_checker:
+        return jsonify({'success': False, 'message': 'Monitor no inicializado'}), 503
+    return jsonify({
+        'success': True,
+        'writer': uptime_checker.result_writer.get_stats(),
+        'recent_results_cache': uptime_checker.recent_results.get_stats(),
+        'response_cache': response_cache.get_stats() if response_cache else None,
+        'backend': backend.get_stats(),
+        'broadcaster': uptime_checker.broadcaster.get_stats() if uptime_checker.broadcaster else None,
+        'snapshot': uptime_checker.snapshot.get_stats() if uptime_checker.snapshot else None
+    })
+
+@api.route('/stats', methods=['GET'])
+@cached_view(_response_cache, per_url=True)
+def get_stats():
+    """Disponibilidad y percentiles de latencia por ventana deslizante (1h/24h/7d/30d)"""
+    if not uptime_checker:
+        return jsonify({'success': False, 'message': 'Monitor no inicializado'}), 503
+    
+    windows = request.args.get('window')
+    windows = windows.split(',') if windows else None
+    if windows and any(window not in WINDOWS for window in windows):
+        return jsonify({'success': False, 'message': f'Ventana inválida. Disponibles: {list(WINDOWS)}'}), 400
+    
+    url = request.args.get('url')
+    if url:
+        if url not in uptime_checker.urls:
+            return jsonify({'success': False, 'message': 'URL no encontrada'}), 404
+        return jsonify({'success': True, 'url': url, 'windows': uptime_checker.stats.snapshot(url, windows)})
+    
+    # Sin URL: todas las URLs, por defecto solo la ventana de 24h para acotar la respuesta
+    prefix = request.args.get('prefix')
+    windows = windows or ['24h']
+    stats = [
+        {'url': url, 'windows': uptime_checker.stats.snapshot(url, windows)}
+        for url in sorted(uptime_checker.urls)
+        if not prefix or url.startswith(prefix)
+    ]
+    return jsonify({'success': True, 'urls': stats})
+
+def _timeseries_range(buckets):
+    """Rango (since, until) de la serie a partir de since/until o de window.
+
+    Con window (por defecto 24h) el final se alinea al siguiente límite de
+    bucket, así que sondeos repetidos piden el mismo rango y reciben el mismo
+    ETag mientras no haya datos nuevos. Lanza ValueError si no es válido.
+    """
+    since = parse_time(request.args.get('since'))
+    until = parse_time(request.args.get('until'))
+    if since:
+        return since, until or datetime.utcnow()
+    window = request.args.get('window', '24h')
+    if window not in WINDOWS:
+        raise ValueError(f'Ventana inválida. Disponibles: {list(WINDOWS)}')
+    span = WINDOWS[window]
+    if not until:
+        width = span / buckets
+        now = (datetime.utcnow() - EPOCH).total_seconds()
+        until = EPOCH + timedelta(seconds=math.ceil(now / width) * width)
+    return until - timedelta(seconds=span), until
+
+@api.route('/timeseries', methods=['GET'])
+def get_url_timeseries():
+    """Serie temporal de una URL con un número fijo de buckets sea cual sea el rango.
+
+    Parámetros: url, buckets (por defecto 200, máximo MAX_BUCKETS) y window
+    (1h/24h/7d/30d) o since/until en ISO 8601. Responde con ETag y
+    Last-Modified de los buckets ya cerrados y devuelve 304 si no han cambiado.
+    """
+    url = request.args.get('url')
+    if not url:
+        return jsonify({'success': False, 'message': 'URL no proporcionada'}), 400
+    try:
+        buckets = min(MAX_BUCKETS, max(1, int(request.args.get('buckets', 200))))
+        since, until = _timeseries_range(buckets)
+        if until <= since:
+            raise ValueError('until debe ser posterior a since')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    # Validación condicional antes de agregar nada: solo dos búsquedas por índice.
+    # La marca solo cubre los buckets cerrados, así que los sondeos reciben 304
+    # hasta que se cierra el bucket en curso aunque haya comprobaciones nuevas
+    raw_start, last_closed, closed = timeseries_version(url, since, until, buckets)
+    key = f'{url}|{since.isoformat()}|{until.isoformat()}|{buckets}|{raw_start}|{last_closed}|{closed.isoformat()}'
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    last_modified = last_closed.replace(tzinfo=timezone.utc) if last_closed else None
+    not_modified = etag in request.if_none_match if request.if_none_match else (
+        last_modified is not None and request.if_modified_since is not None
+        and last_modified.replace(microsecond=0) <= request.if_modified_since
+    )
+
+    response = current_app.response_class(status=304) if not_modified else \
+        jsonify(dict(get_timeseries(url, since, until, buckets), success=True))
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # El cliente puede guardar la respuesta pero debe revalidarla en cada sondeo
+    response.cache_control.no_cache = True
+    return response
+
+@api.route('/shards', methods=['GET'])
+def get_shards():
+    """Reparto de URLs entre workers en modo shards"""
+    if not uptime_checker or not isinstance(uptime_checker.scheduler, ShardCoordinator):
+        return jsonify({'success': False, 'message': 'El modo shards no está activo'}), 404
+    return jsonify({'success': True, 'shards': uptime_checker.scheduler.get_stats()})
+
+@api.route('/dns', methods=['GET'])
+def get_dns_cache():
+    """Contadores de aciertos y fallos de la caché DNS del motor de sondeo"""
+    if not uptime_checker:
+        return jsonify({'success': False, 'message': 'Monitor no inicializado'}), 503
+    if isinstance(uptime_checker.scheduler, ShardCoordinator):
+        return jsonify({'success': False, 'message': 'En modo shards la caché DNS vive en cada worker'}), 404
+    return jsonify({'success': True, 'dns_cache': uptime_checker.probe_engine.dns_cache.get_stats()})
+
+@api.route('/scheduler', methods=['GET'])
+def get_scheduler():
+    """Estado del planificador, política adaptativa y perfil de carga (verificaciones por segundo)"""
+    if not uptime_checker:
+        return jsonify({'success': False, 'message': 'Monitor no inicializado'}), 503
+    
+    scheduler = uptime_checker.scheduler
+    data = {'success': True, 'stats': scheduler.get_stats()}
+    data['single_flight'] = uptime_checker.flights.get_stats()
+    if uptime_checker.policy:
+        data['policy'] = uptime_checker.policy.get_stats()
+    if hasattr(scheduler, 'load_profile'):
+        try:
+            horizon = min(3600, int(request.args.get('horizon', 60)))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'horizon debe ser un entero'}), 400
+        data['load_profile'] = scheduler.load_profile(horizon)
+    return jsonify(data)
\ No newline at end of file
@@ -7,6 +7,7 @@ from flask_socketio import SocketIO
 from flask_cors import CORS
 import os
 import argparse
+import atexit
 import logging
 
 # Configurar el parser de argumentos de línea de comandos
@@ -15,14 +16,28 @@ parser.add_argument('--log-level', '-l',
                     choices=['debug', 'info', 'warning', 'error', 'critical'],
                     default='info',
                     help='Nivel de logging (default: info)')
+parser.add_argument('--log-format', choices=['text', 'json'], default=None,
+                    help='Formato de los logs: texto o una línea JSON por mensaje (default: el guardado, texto)')
+parser.add_argument('--shard-workers', type=int, default=0,
+                    help='Número de procesos worker locales para el sondeo por shards (default: 0, sin shards)')
+parser.add_argument('--shard-port', type=int, default=None,
+                    help='Puerto del coordinador de shards para workers externos (default: 6000 si hay shards)')
+parser.add_argument('--startup-ramp', type=float, default=None,
+                    help='Segundos en los que repartir las primeras verificaciones al arrancar (default: fase de cada URL)')
+parser.add_argument('--jitter', type=float, default=0.0,
+                    help='Retraso aleatorio por verificación como fracción del intervalo, p. ej. 0.05 (default: 0)')
+parser.add_argument('--host-concurrency', type=int, default=4,
+                    help='Máximo de verificaciones simultáneas contra un mismo host (default: 4, 0 sin límite)')
+parser.add_argument('--host-rate', type=float, default=None,
+                    help='Máximo de verificaciones por segundo contra un mismo host (default: sin límite)')
+parser.add_argument('--no-adaptive', action='store_true',
+                    help='Intervalos y timeouts fijos: sin reintentos de confirmación, backoff ni timeouts adaptativos')
+parser.add_argument('--snapshot-interval', type=float, default=60,
+                    help='Segundos entre instantáneas del estado en memoria para arrancar sin reconstruirlo (default: 60, 0 las desactiva)')
 args = parser.parse_args()
 
 # Configurar logging según el parámetro recibido
 log_level = getattr(logging, args.log_level.upper())
-logging.basicConfig(
-    level=log_level,
-    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s'
-)
 
 # Imprimir información sobre el nivel de logging
 print(f"Nivel de logging establecido a: {args.log_level.upper()}")
@@ -31,8 +46,12 @@ print(f"Nivel de logging establecido a: {args.log_level.upper()}")
 from utils.logging_config import logging_manager
 from api.log_config import log_api
 
-# Establecer el nivel de logging seleccionado
+# Establecer el nivel de logging seleccionado; el formateo y la escritura se
+# hacen en un hilo aparte para no frenar las sondas
 logging_manager.set_level(args.log_level)
+if args.log_format:
+    logging_manager.set_pipeline(format=args.log_format)
+logging_manager.start_pipeline()
 
 # Crear directorio para la base de datos si no existe
 os.makedirs(os.path.dirname(os.path.abspath(__file__)) + '/../data', exist_ok=True)
@@ -74,17 +93,33 @@ def handle_exception(e):
 from storage.database import init_db
 from monitor.checker import UptimeChecker
 from api.routes import api, init_routes
+from api.export import export_api
+from api.metrics import metrics_api
 
 # Inicializar base de datos
 with app.app_context():
     init_db()
 
-# Inicializar checker
-uptime_checker = UptimeChecker(socketio)
+# Inicializar checker (en modo shards si se han pedido workers o un puerto de coordinador)
+# Con un puerto explícito se escucha en todas las interfaces para admitir workers de otros nodos
+shard_address = ('0.0.0.0', args.shard_port) if args.shard_port else None
+uptime_checker = UptimeChecker(
+    socketio,
+    shard_workers=args.shard_workers,
+    shard_address=shard_address,
+    jitter=args.jitter,
+    startup_ramp=args.startup_ramp,
+    adaptive=not args.no_adaptive,
+    host_concurrency=args.host_concurrency,
+    host_rate=args.host_rate,
+    snapshot_interval=args.snapshot_interval
+)
 
 # Configurar rutas API
 init_routes(uptime_checker)
 app.register_blueprint(api)
+app.register_blueprint(export_api)
+app.register_blueprint(metrics_api)
 
 # Y luego registra el blueprint:
 app.register_blueprint(log_api)
@@ -98,6 +133,10 @@ if __name__ == '__main__':
     uptime_checker.start_monitoring()
     
     print(f"Servidor iniciado en http://localhost:5000 (Nivel de log: {args.log_level})")
+    # Escribir los mensajes pendientes de la cola al salir
+    atexit.register(logging_manager.stop_pipeline)
+    # Volcar resultados pendientes y guardar la instantánea de estado al salir
+    atexit.register(uptime_checker.stop_monitoring)
     # Iniciar servidor web
     socketio.run(
         app, 
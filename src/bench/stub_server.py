@@ -0,0 +1,80 @@
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """Servidor HTTP local para benchmarks.
+
+    Responde a cualquier ruta con latencia, tasa de errores y cuerpos lentos
+    configurables:
+      - latency: segundos de espera antes de responder
+      - error_rate: fracción de respuestas 500 (0.0 - 1.0)
+      - body_size: bytes del cuerpo de respuesta
+      - chunk_delay: pausa en segundos entre trozos de 1KB del cuerpo (cuerpos lentos)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, body_size=512, chunk_delay=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.body_size = body_size
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, como un servidor real
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def _respond(self, send_body):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status = 500 if random.random() < stub.error_rate else 200
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(stub.body_size))
+                self.end_headers()
+                if not send_body:
+                    return
+                remaining = stub.body_size
+                chunk = b'x' * 1024
+                while remaining > 0:
+                    size = min(remaining, len(chunk))
+                    self.wfile.write(chunk[:size])
+                    remaining -= size
+                    if stub.chunk_delay and remaining > 0:
+                        self.wfile.flush()
+                        time.sleep(stub.chunk_delay)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,270 @@
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import requests
+
+from bench.stub_server import StubServer
+
+
+def percentiles(values, points=(0.5, 0.95, 0.99)):
+    """Percentiles por rango más cercano; devuelve {'p50': ..., 'p95': ..., 'max': ...}"""
+    if not values:
+        result = {f'p{int(p * 100)}': None for p in points}
+        result['max'] = None
+        return result
+    ordered = sorted(values)
+    result = {}
+    for p in points:
+        rank = max(1, math.ceil(p * len(ordered)))
+        result[f'p{int(p * 100)}'] = round(ordered[rank - 1], 3)
+    result['max'] = round(ordered[-1], 3)
+    return result
+
+
+def fleet_urls(base_url, size):
+    return [f'{base_url}/u/{i}' for i in range(size)]
+
+
+def bench_probe(stub, fleet, interval, duration, workers, host_concurrency=0):
+    """Throughput de sondeo y jitter del planificador (intervalo real frente al configurado)"""
+    from monitor.scheduler import ProbeScheduler
+    from monitor.probe import ProbeEngine
+    from monitor.limiter import HostLimiter
+
+    engine = ProbeEngine(max_per_host=workers, max_total=workers)
+    starts = defaultdict(list)
+    errors = [0]
+
+    def run_check(url):
+        starts[url].append(time.monotonic())
+        try:
+            if engine.probe(url).status_code != 200:
+                errors[0] += 1
+        except requests.RequestException:
+            errors[0] += 1
+
+    scheduler = ProbeScheduler(run_check, workers=workers, limiter=HostLimiter(max_per_host=host_concurrency))
+    for url in fleet_urls(stub.base_url, fleet):
+        scheduler.schedule(url, interval)
+
+    requests_before = stub.requests
+    started_at = time.monotonic()
+    scheduler.start()
+    time.sleep(duration)
+    scheduler.stop()
+    elapsed = time.monotonic() - started_at
+    engine.close()
+
+    checks = sum(len(times) for times in starts.values())
+    jitter = []
+    first_check = []
+    for times in starts.values():
+        first_check.append((times[0] - started_at) * 1000)
+        for previous, current in zip(times, times[1:]):
+            jitter.append(abs((current - previous) - interval) * 1000)
+
+    return {
+        'checks': checks,
+        'checks_per_sec': round(checks / elapsed, 1),
+        'expected_checks_per_sec': round(fleet / interval, 1),
+        'server_requests': stub.requests - requests_before,
+        'errors': errors[0],
+        'urls_checked': len(starts),
+        'first_check_delay_ms': percentiles(first_check),
+        'jitter_ms': percentiles(jitter),
+        'scheduler': scheduler.get_stats()
+    }
+
+
+def bench_storage(single_rows=1000, bulk_rows=20000, batch_size=500):
+    """Filas por segundo con un commit por fila (save_result) y en bloque (save_results)"""
+    from storage.database import save_result, save_results
+
+    start = time.perf_counter()
+    for i in range(single_rows):
+        save_result(f'http://bench/{i % 100}', 200, 10, True)
+    single_elapsed = time.perf_counter() - start
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'url': f'http://bench/{i % 100}',
+            'status_code': 200,
+            'response_time': 10,
+            'is_up': True,
+            'checked_at': now
+        }
+        for i in range(bulk_rows)
+    ]
+    start = time.perf_counter()
+    for i in range(0, bulk_rows, batch_size):
+        save_results(rows[i:i + batch_size])
+    bulk_elapsed = time.perf_counter() - start
+
+    return {
+        'single_rows': single_rows,
+        'single_rows_per_sec': round(single_rows / single_elapsed, 1),
+        'bulk_rows': bulk_rows,
+        'bulk_batch_size': batch_size,
+        'bulk_rows_per_sec': round(bulk_rows / bulk_elapsed, 1)
+    }
+
+
+def bench_concurrency(writers=4, readers=8, duration=5, batch_size=50):
+    """Lectores y escritores simultáneos sobre la base de datos: operaciones por segundo,
+    latencias y errores (p. ej. "database is locked")"""
+    from storage.database import save_results, save_url, get_results, get_recent_results_by_url, backend
+
+    urls = [f'http://bench/concurrency/{i}' for i in range(50)]
+    latencies = {'write': [], 'read': []}
+    errors = {'write': [], 'read': []}
+    deadline = time.monotonic() + duration
+
+    def writer(n):
+        k = 0
+        while time.monotonic() < deadline:
+            k += 1
+            now = datetime.utcnow()
+            rows = [
+                {'url': urls[(n + i) % len(urls)], 'status_code': 200, 'response_time': 10, 'is_up': True,
+                 'checked_at': now}
+                for i in range(batch_size)
+            ]
+            start = time.perf_counter()
+            try:
+                if k % 10 == 0:
+                    save_url(urls[n % len(urls)], 30)
+                else:
+                    save_results(rows)
+                latencies['write'].append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors['write'].append(str(e))
+
+    def reader(n):
+        k = 0
+        while time.monotonic() < deadline:
+            k += 1
+            start = time.perf_counter()
+            try:
+                if k % 2:
+                    get_results(urls[(n + k) % len(urls)], 100)
+                else:
+                    get_recent_results_by_url(urls[:10], limit=20)
+                latencies['read'].append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors['read'].append(str(e))
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = {'writers': writers, 'readers': readers, 'duration': duration, 'profile': backend.profile}
+    for kind in ('write', 'read'):
+        report[kind] = {
+            'ops': len(latencies[kind]),
+            'ops_per_sec': round(len(latencies[kind]) / duration, 1),
+            'latency_ms': percentiles(latencies[kind]),
+            'errors': len(errors[kind]),
+            'locked_errors': sum(1 for error in errors[kind] if 'locked' in error)
+        }
+    return report
+
+
+API_QUERIES = (
+    '/api/urls?per_page=100',
+    '/api/urls?per_page=1000',
+    '/api/urls?status=down&per_page=100',
+)
+
+
+def bench_api(fleet, requests_per_query=50, history=10):
+    """Latencia de los endpoints de lectura con una flota sintética en memoria.
+
+    Devuelve dos informes por consulta: reconstruyendo la respuesta en cada
+    petición (como si llegaran resultados nuevos entre una y otra) y
+    sirviéndola de la caché de respuestas.
+    """
+    from flask import Flask
+    from monitor.checker import UptimeChecker
+    from api.routes import api, init_routes
+
+    checker = UptimeChecker()
+    now = datetime.utcnow()
+    for i in range(fleet):
+        url = f'http://fleet.invalid/u/{i}'
+        checker.urls[url] = 30
+        for k in range(history, 0, -1):
+            is_up = random.random() > 0.05
+            checked_at = now - timedelta(seconds=30 * k)
+            checker.recent_results.record(url, 200 if is_up else 500, 50, is_up, checked_at)
+            checker.stats.record(url, 200 if is_up else 500, 50, is_up, checked_at)
+
+    app = Flask(__name__)
+    # Sin margen de obsolescencia: cada cambio de versión obliga a reconstruir
+    init_routes(checker, cache_staleness=0)
+    app.register_blueprint(api)
+    client = app.test_client()
+
+    def measure(invalidate):
+        results = {}
+        for query in API_QUERIES:
+            timings = []
+            for _ in range(requests_per_query):
+                if invalidate:
+                    checker.versions.bump()
+                start = time.perf_counter()
+                response = client.get(query)
+                timings.append((time.perf_counter() - start) * 1000)
+                response.close()
+            results[query] = percentiles(timings)
+        return results
+
+    return measure(invalidate=True), measure(invalidate=False)
+
+
+def run(fleets, duration=10, interval=5, workers=100, host_concurrency=0, latency=0.01, error_rate=0.0,
+        body_size=512, chunk_delay=0.0, api_requests=50, skip=()):
+    """Ejecuta la suite completa y devuelve un informe serializable a JSON"""
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'params': {
+                'fleets': list(fleets),
+                'duration': duration,
+                'interval': interval,
+                'workers': workers,
+                'host_concurrency': host_concurrency,
+                'latency': latency,
+                'error_rate': error_rate,
+                'body_size': body_size,
+                'chunk_delay': chunk_delay,
+                'api_requests': api_requests
+            }
+        },
+        'fleets': []
+    }
+
+    if 'storage' not in skip:
+        report['storage'] = bench_storage()
+    if 'concurrency' not in skip:
+        report['concurrency'] = bench_concurrency()
+
+    stub = StubServer(latency=latency, error_rate=error_rate, body_size=body_size, chunk_delay=chunk_delay).start()
+    try:
+        for fleet in fleets:
+            entry = {'fleet': fleet}
+            if 'probe' not in skip:
+                entry['probe'] = bench_probe(stub, fleet, interval, duration, workers, host_concurrency)
+            if 'api' not in skip:
+                entry['api_ms'], entry['api_cached_ms'] = bench_api(fleet, api_requests)
+            report['fleets'].append(entry)
+    finally:
+        stub.stop()
+    return report
@@ -0,0 +1,70 @@
+"""Suite de benchmarks de los caminos críticos de sondeo, almacenamiento y API.
+
+Ejemplos:
+    python src/benchmark.py --fleet 100,1000,10000 --duration 15
+    python src/benchmark.py --fleet 50000 --eventlet --workers 1000 --output bench.json
+
+Usa una base de datos temporal y un servidor HTTP local; no toca data/monitoring.db.
+El informe se escribe en JSON para poder comparar versiones.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+parser = argparse.ArgumentParser(description='Benchmarks del monitor de URLs')
+parser.add_argument('--fleet', default='100,1000', help='Tamaños de flota separados por comas (default: 100,1000)')
+parser.add_argument('--duration', type=float, default=10, help='Segundos de sondeo por flota (default: 10)')
+parser.add_argument('--interval', type=float, default=5, help='Intervalo de cada URL en segundos (default: 5)')
+parser.add_argument('--workers', type=int, default=100, help='Workers del planificador (default: 100)')
+parser.add_argument('--host-concurrency', type=int, default=0,
+                    help='Límite de sondas simultáneas por host; toda la flota apunta al stub (default: 0, sin límite)')
+parser.add_argument('--latency', type=float, default=0.01, help='Latencia del servidor stub en segundos')
+parser.add_argument('--error-rate', type=float, default=0.0, help='Fracción de respuestas 500 del stub')
+parser.add_argument('--body-size', type=int, default=512, help='Tamaño del cuerpo de respuesta en bytes')
+parser.add_argument('--chunk-delay', type=float, default=0.0, help='Pausa entre trozos de 1KB del cuerpo')
+parser.add_argument('--api-requests', type=int, default=50, help='Peticiones por consulta de API')
+parser.add_argument('--skip', default='', help='Fases a omitir: probe,storage,concurrency,api')
+parser.add_argument('--eventlet', action='store_true', help='Aplicar eventlet.monkey_patch() como la aplicación')
+parser.add_argument('--output', '-o', help='Fichero JSON de salida (por defecto, stdout)')
+args = parser.parse_args()
+
+if args.eventlet:
+    import eventlet
+    eventlet.monkey_patch()
+
+# La base de datos debe configurarse antes de importar storage.database
+tmp_dir = tempfile.mkdtemp(prefix='monitor-bench-')
+os.environ['MONITOR_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+import logging
+logging.disable(logging.WARNING)
+
+from storage.database import init_db
+from bench import suite
+
+init_db()
+report = suite.run(
+    [int(size) for size in args.fleet.split(',') if size],
+    duration=args.duration,
+    interval=args.interval,
+    workers=args.workers,
+    host_concurrency=args.host_concurrency,
+    latency=args.latency,
+    error_rate=args.error_rate,
+    body_size=args.body_size,
+    chunk_delay=args.chunk_delay,
+    api_requests=args.api_requests,
+    skip=[phase for phase in args.skip.split(',') if phase]
+)
+report['meta']['eventlet'] = args.eventlet
+report['meta']['python'] = sys.version.split()[0]
+
+output = json.dumps(report, indent=2)
+if args.output:
+    with open(args.output, 'w') as f:
+        f.write(output)
+    print(f"Informe guardado en {args.output}")
+else:
+    print(output)
@@ -0,0 +1,170 @@
+import threading
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+ROOM_ALL = 'all'
+
+# Campos que se comparan para construir los deltas
+DELTA_FIELDS = ('status_code', 'response_time', 'is_up')
+
+
+def url_room(url):
+    return f'url:{url}'
+
+
+def group_room(url):
+    """Las URLs se agrupan por host"""
+    return f'host:{urlsplit(url).netloc}'
+
+
+class StatusBroadcaster:
+    """Capa de difusión de `status_update` por Socket.IO.
+
+    Las actualizaciones se acumulan y se envían en un único frame
+    `status_batch` por tick y por sala, conservando solo el último resultado de
+    cada URL y únicamente los campos que cambiaron. Los cambios de estado
+    (caída o recuperación) son urgentes y se emiten al momento como
+    `status_update`.
+    """
+
+    def __init__(self, socketio, tick=0.25, namespace='/'):
+        self.socketio = socketio
+        self.tick = tick
+        self.namespace = namespace
+        self.running = False
+        self._pending = {}  # url -> último payload sin enviar
+        self._last_sent = {}  # url -> último estado enviado (para deltas y transiciones)
+        self._lock = threading.Lock()
+
+        self.frames_sent = 0
+        self.updates_received = 0
+        self.updates_coalesced = 0
+        self.urgent_sent = 0
+        self.clients = 0  # Clientes Socket.IO conectados
+
+    def register_handlers(self):
+        """Registra los eventos para que los clientes se suscriban a salas"""
+        from flask_socketio import join_room, leave_room
+
+        @self.socketio.on('connect', namespace=self.namespace)
+        def on_connect(*args):
+            with self._lock:
+                self.clients += 1
+
+        @self.socketio.on('disconnect', namespace=self.namespace)
+        def on_disconnect(*args):
+            with self._lock:
+                self.clients -= 1
+
+        @self.socketio.on('subscribe', namespace=self.namespace)
+        def on_subscribe(data):
+            for room in self._rooms_from_request(data):
+                join_room(room)
+
+        @self.socketio.on('unsubscribe', namespace=self.namespace)
+        def on_unsubscribe(data):
+            for room in self._rooms_from_request(data):
+                leave_room(room)
+
+    def _rooms_from_request(self, data):
+        data = data or {}
+        rooms = [url_room(url) for url in data.get('urls', [])]
+        rooms += [f'host:{host}' for host in data.get('groups', [])]
+        if data.get('all'):
+            rooms.append(ROOM_ALL)
+        return rooms
+
+    def publish(self, update):
+        """Encola una actualización; las transiciones de estado se envían inmediatamente"""
+        url = update['url']
+        with self._lock:
+            self.updates_received += 1
+            previous = self._last_sent.get(url)
+            urgent = previous is not None and previous['is_up'] != update['is_up']
+
+            if urgent or not self.running:
+                # El resultado urgente sustituye cualquier actualización pendiente de la URL
+                self._pending.pop(url, None)
+                self._last_sent[url] = update
+            else:
+                if url in self._pending:
+                    self.updates_coalesced += 1
+                self._pending[url] = update
+                return
+
+        if urgent:
+            self.urgent_sent += 1
+            payload = dict(update, urgent=True)
+        else:
+            payload = update
+        for room in (ROOM_ALL, url_room(url), group_room(url)):
+            self.socketio.emit('status_update', payload, namespace=self.namespace, to=room)
+
+    def forget(self, url):
+        with self._lock:
+            self._pending.pop(url, None)
+            self._last_sent.pop(url, None)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.socketio.start_background_task(self._tick_loop)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        # Enviar lo que quede pendiente
+        self.flush()
+
+    def flush(self):
+        """Envía un frame `status_batch` por sala con los deltas acumulados"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            deltas = []
+            for url, update in pending.items():
+                deltas.append(self._delta(self._last_sent.get(url), update))
+                self._last_sent[url] = update
+
+        rooms = {ROOM_ALL: deltas}
+        for delta in deltas:
+            rooms.setdefault(url_room(delta['url']), []).append(delta)
+            rooms.setdefault(group_room(delta['url']), []).append(delta)
+
+        for room, updates in rooms.items():
+            self.socketio.emit('status_batch', {'updates': updates}, namespace=self.namespace, to=room)
+        self.frames_sent += len(rooms)
+        return len(deltas)
+
+    def _delta(self, previous, update):
+        if previous is None:
+            return dict(update)
+        delta = {key: value for key, value in update.items() if key not in DELTA_FIELDS}
+        for key in DELTA_FIELDS:
+            if previous.get(key) != update.get(key):
+                delta[key] = update[key]
+        return delta
+
+    def get_stats(self):
+        return {
+            'tick': self.tick,
+            'pending': len(self._pending),
+            'updates_received': self.updates_received,
+            'updates_coalesced': self.updates_coalesced,
+            'urgent_sent': self.urgent_sent,
+            'frames_sent': self.frames_sent,
+            'clients': self.clients
+        }
+
+    def _tick_loop(self):
+        while self.running:
+            self.socketio.sleep(self.tick)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error al difundir actualizaciones de estado: {str(e)}")
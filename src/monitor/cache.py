@@ -0,0 +1,259 @@
+import struct
+import threading
+from array import array
+from collections import namedtuple
+from datetime import datetime, timezone
+from storage.database import PHASE_COLUMNS
+
+# Vista de solo lectura de un resultado cacheado (mismos atributos que MonitoringResult)
+CachedResult = namedtuple(
+    'CachedResult',
+    ['url', 'status_code', 'response_time', 'is_up', 'checked_at'] + list(PHASE_COLUMNS.values()),
+    defaults=(None,) * len(PHASE_COLUMNS)
+)
+
+# Bytes por posición: checked_at (double) + status_code (uint16) + response_time (uint32) + is_up (byte)
+# + una duración uint16 por fase de la sonda
+SLOT_BYTES = 8 + 2 + 4 + 1 + 2 * len(PHASE_COLUMNS)
+
+# Valor reservado para "fase sin medir" (resultados fallidos o anteriores al desglose)
+_NO_PHASE = 0xFFFF
+
+# Lectura de status_code en un buffer serializado (arrays en el orden de bytes nativo)
+_STATUS_CODE = struct.Struct('=H')
+
+
+def _to_epoch(dt):
+    """Convierte un datetime UTC naive (como los guarda la base de datos) a segundos epoch"""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _from_epoch(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+
+class ResultRing:
+    """Buffer circular de tamaño fijo con los últimos resultados de una URL.
+
+    Cada campo vive en su propio array tipado, así que el coste en memoria es
+    exactamente `capacity * SLOT_BYTES` más una cabecera constante.
+    """
+
+    __slots__ = ('capacity', 'size', 'head', 'checked_at', 'status_code', 'response_time', 'is_up', 'phases')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = 0
+        self.head = 0  # Posición donde se escribirá el próximo resultado
+        self.checked_at = array('d', bytes(8 * capacity))
+        self.status_code = array('H', bytes(2 * capacity))
+        self.response_time = array('I', bytes(4 * capacity))
+        self.is_up = bytearray(capacity)
+        # Duraciones por fase contiguas: posición i ocupa [i * fases, (i + 1) * fases)
+        self.phases = array('H', [_NO_PHASE]) * (capacity * len(PHASE_COLUMNS))
+
+    @classmethod
+    def from_buffer(cls, capacity, size, head, buffer):
+        """Reconstruye un buffer a partir de los bytes de to_bytes() (copia con frombytes, sin recorrerlos)"""
+        ring = cls.__new__(cls)
+        ring.capacity = capacity
+        ring.size = size
+        ring.head = head
+        end = 8 * capacity
+        ring.checked_at = array('d')
+        ring.checked_at.frombytes(buffer[:end])
+        start, end = end, end + 2 * capacity
+        ring.status_code = array('H')
+        ring.status_code.frombytes(buffer[start:end])
+        start, end = end, end + 4 * capacity
+        ring.response_time = array('I')
+        ring.response_time.frombytes(buffer[start:end])
+        start, end = end, end + 2 * capacity * len(PHASE_COLUMNS)
+        ring.phases = array('H')
+        ring.phases.frombytes(buffer[start:end])
+        ring.is_up = bytearray(buffer[end:end + capacity])
+        return ring
+
+    def to_bytes(self):
+        """Contenido de los arrays tal cual están en memoria (`capacity * SLOT_BYTES` bytes)"""
+        return b''.join((
+            self.checked_at.tobytes(), self.status_code.tobytes(), self.response_time.tobytes(),
+            self.phases.tobytes(), bytes(self.is_up)
+        ))
+
+    def __len__(self):
+        return self.size
+
+    def append(self, status_code, response_time, is_up, checked_at, phases=None):
+        """Añade un resultado; `phases` son las duraciones en el orden de PHASE_COLUMNS"""
+        i = self.head
+        self.checked_at[i] = _to_epoch(checked_at)
+        self.status_code[i] = max(0, min(int(status_code or 0), 0xFFFF))
+        self.response_time[i] = max(0, min(int(response_time or 0), 0xFFFFFFFF))
+        self.is_up[i] = 1 if is_up else 0
+        base = i * len(PHASE_COLUMNS)
+        for k in range(len(PHASE_COLUMNS)):
+            value = phases[k] if phases else None
+            self.phases[base + k] = _NO_PHASE if value is None else max(0, min(int(value), _NO_PHASE - 1))
+        self.head = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def latest(self, url, n=None):
+        """Devuelve hasta `n` resultados, del más reciente al más antiguo"""
+        count = self.size if n is None else min(n, self.size)
+        width = len(PHASE_COLUMNS)
+        results = []
+        for k in range(1, count + 1):
+            i = (self.head - k) % self.capacity
+            phases = [None if value == _NO_PHASE else value for value in self.phases[i * width:(i + 1) * width]]
+            results.append(CachedResult(
+                url,
+                self.status_code[i],
+                self.response_time[i],
+                bool(self.is_up[i]),
+                _from_epoch(self.checked_at[i]),
+                *phases
+            ))
+        return results
+
+
+class RecentResultsCache:
+    """Caché en memoria de los últimos K resultados de cada URL monitorizada.
+
+    Los buffers restaurados de una instantánea quedan pendientes y se copian
+    del fichero mapeado la primera vez que se usa su URL.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._rings = {}
+        self._pending = {}  # url -> (size, head, offset, origen) restaurados sin materializar
+        self._lock = threading.Lock()
+
+    def __contains__(self, url):
+        return url in self._rings or url in self._pending
+
+    def __len__(self):
+        return len(self._rings) + len(self._pending)
+
+    def _ring(self, url):
+        """Buffer de una URL (con el lock tomado); materializa el restaurado si lo hay"""
+        ring = self._rings.get(url)
+        if ring is None and url in self._pending:
+            size, head, offset, source = self._pending.pop(url)
+            ring = self._rings[url] = ResultRing.from_buffer(
+                self.capacity, size, head, source.read(offset, self.capacity * SLOT_BYTES)
+            )
+            source.release()
+        return ring
+
+    def _discard_pending(self, url):
+        entry = self._pending.pop(url, None)
+        if entry is not None:
+            entry[3].release()
+
+    def record(self, url, status_code, response_time, is_up, checked_at, timings=None):
+        """Añade un resultado al buffer de la URL; `timings` es el desglose {fase: ms}"""
+        phases = [timings.get(phase) for phase in PHASE_COLUMNS] if timings else None
+        with self._lock:
+            ring = self._ring(url)
+            if ring is None:
+                ring = self._rings[url] = ResultRing(self.capacity)
+            ring.append(status_code, response_time, is_up, checked_at, phases)
+
+    def get(self, url, limit=None):
+        """Últimos resultados de una URL (lista vacía si no hay ninguno)"""
+        with self._lock:
+            ring = self._ring(url)
+            if ring is None:
+                return []
+            return ring.latest(url, limit)
+
+    def latest_states(self, urls):
+        """{url: (status_code, is_up)} del último resultado de cada URL que tenga alguno.
+
+        Los buffers restaurados pendientes se leen en el fichero mapeado sin
+        materializarlos, así que sirve para filtrar muchas URLs por estado.
+        """
+        capacity = self.capacity
+        states = {}
+        with self._lock:
+            for url in urls:
+                ring = self._rings.get(url)
+                if ring is not None:
+                    if ring.size:
+                        i = (ring.head - 1) % capacity
+                        states[url] = (ring.status_code[i], bool(ring.is_up[i]))
+                    continue
+                entry = self._pending.get(url)
+                if entry is None or not entry[0]:
+                    continue
+                size, head, offset, source = entry
+                i = (head - 1) % capacity
+                # Mismo orden que to_bytes(): checked_at, status_code, ..., is_up al final
+                status_code = _STATUS_CODE.unpack(source.read(offset + 8 * capacity + 2 * i, 2))[0]
+                is_up = source.read(offset + (SLOT_BYTES - 1) * capacity + i, 1)[0]
+                states[url] = (status_code, bool(is_up))
+        return states
+
+    def ensure(self, url):
+        """Reserva el buffer de una URL aunque todavía no tenga resultados"""
+        with self._lock:
+            if url not in self._rings and url not in self._pending:
+                self._rings[url] = ResultRing(self.capacity)
+
+    def remove(self, url):
+        with self._lock:
+            self._rings.pop(url, None)
+            self._discard_pending(url)
+
+    def load(self, results_by_url):
+        """Rellena la caché a partir de {url: [resultados más recientes primero]}"""
+        with self._lock:
+            for url, results in results_by_url.items():
+                self._discard_pending(url)
+                ring = self._rings[url] = ResultRing(self.capacity)
+                # Insertar del más antiguo al más reciente para conservar el orden
+                for result in reversed(results[:self.capacity]):
+                    ring.append(
+                        result.status_code, result.response_time, result.is_up, result.checked_at,
+                        [getattr(result, column, None) for column in PHASE_COLUMNS.values()]
+                    )
+
+    def export(self, url):
+        """(size, head, bytes) del buffer de una URL, o None si no tiene resultados"""
+        with self._lock:
+            entry = self._pending.get(url)
+            if entry is not None:
+                size, head, offset, source = entry
+                return size, head, bytes(source.read(offset, self.capacity * SLOT_BYTES))
+            ring = self._rings.get(url)
+            if not ring:
+                return None
+            return ring.size, ring.head, ring.to_bytes()
+
+    def restore(self, entries, source):
+        """Registra buffers exportados {url: (size, head, offset)} dentro de `source`.
+
+        `source` ofrece read(offset, length) y release(), que se llama una vez
+        por URL al materializarla o descartarla.
+        """
+        with self._lock:
+            for url, (size, head, offset) in entries.items():
+                self._rings.pop(url, None)
+                self._discard_pending(url)
+                self._pending[url] = (size, head, offset, source)
+
+    def memory_bytes(self):
+        """Memoria reservada por los buffers (URLs × posiciones × bytes por posición)"""
+        return len(self) * self.capacity * SLOT_BYTES
+
+    def get_stats(self):
+        return {
+            'urls': len(self),
+            'restored_pending': len(self._pending),
+            'capacity': self.capacity,
+            'slot_bytes': SLOT_BYTES,
+            'memory_bytes': self.memory_bytes()
+        }
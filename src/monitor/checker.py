@@ -3,258 +3,455 @@ import threading
 import time
 from datetime import datetime, timedelta
 import logging
-from storage.database import save_result, save_url, delete_url, get_all_urls
+from storage.database import save_url, save_urls, delete_url, get_all_urls, get_url_options, get_recent_results_by_url
 from storage.database import Session, MonitoringResult
+from storage.writer import ResultWriter
+from storage.retention import RetentionManager
+from monitor.scheduler import ProbeScheduler, phase_offset, current_queue_wait
+from monitor.limiter import HostLimiter
+from monitor.probe import ProbeEngine, TIMING_WARM, TIMING_MODES, PROBE_FULL, PROBE_MODES
+from monitor.cache import RecentResultsCache
+from monitor.stats import StatsEngine
+from monitor.policy import AdaptivePolicy
+from monitor.broadcast import StatusBroadcaster
+from monitor.versions import DataVersions
+from monitor.imports import ImportTracker
+from monitor.singleflight import SingleFlight
+from monitor.snapshot import StateSnapshot
+from utils.metrics import REGISTRY
+from monitor.sharding import ShardCoordinator
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# La configuración de handlers corresponde a la aplicación (utils.logging_config)
 logger = logging.getLogger(__name__)
 
+PROBES = REGISTRY.counter('uptime_probes_total', 'Resultados de verificación registrados', ['result'])
+PROBE_DURATION = REGISTRY.histogram('uptime_probe_duration_seconds', 'Tiempo de respuesta de las sondas')
+PROBES_IN_FLIGHT = REGISTRY.gauge('uptime_probes_in_flight', 'Sondas en curso en este proceso')
+
 class UptimeChecker:
-    def __init__(self, socketio=None):
+    def __init__(self, socketio=None, max_workers=50, recent_results_size=100,
+                 shard_workers=0, shard_address=None, jitter=0.0, startup_ramp=None, adaptive=True,
+                 host_concurrency=4, host_rate=None, snapshot_interval=60, snapshot_path=None):
         self.urls = {}  # Cambiar a un diccionario: {url: intervalo}
         self.default_interval = 30
         self.running = False
-        self.threads = {}  # Guardar threads por URL
         self.last_check_times = {}  # Rastrear la última vez que se verificó cada URL
+        self.timings = {}  # Modo de medición por URL: {url: 'warm' | 'cold'}
+        self.probe_modes = {}  # Modo de sondeo por URL: {url: 'head' | 'headers' | 'partial' | 'full'}
+        self.dns_caching = {}  # Uso de la caché DNS por URL: {url: True | False}
         self.socketio = socketio
+        # Ventana (segundos) en la que se reparten las primeras verificaciones al arrancar
+        self.startup_ramp = startup_ramp
         self._lock = threading.Lock()  # Para operaciones thread-safe
+        if shard_workers or shard_address:
+            # Modo shards: los procesos worker sondean y este proceso solo coordina y persiste
+            self.scheduler = ShardCoordinator(
+                self._on_shard_result,
+                lambda url: {
+                    'timing': self.timings.get(url, TIMING_WARM),
+                    'probe_mode': self.probe_modes.get(url, PROBE_FULL),
+                    'dns_cache': self.dns_caching.get(url, True)
+                },
+                address=shard_address or ('127.0.0.1', 6000),
+                spawn_workers=shard_workers
+            )
+        else:
+            # Planificador central: un heap por próxima ejecución y un pool acotado de workers,
+            # con límite de peticiones en vuelo y por segundo para cada host
+            self.scheduler = ProbeScheduler(
+                self.check_url, workers=max_workers, jitter=jitter,
+                limiter=HostLimiter(max_per_host=host_concurrency, rate=host_rate)
+            )
+        # Motor de sondeo compartido con pool de conexiones keep-alive por host
+        self.probe_engine = ProbeEngine(max_total=max_workers)
+        # Buffer write-behind: los resultados se insertan en bloque en segundo plano
+        self.result_writer = ResultWriter()
+        # Agregación por minuto/hora y purga del histórico antiguo
+        self.retention = RetentionManager()
+        # Últimos resultados de cada URL en memoria para servir las lecturas sin consultar SQLite
+        self.recent_results = RecentResultsCache(capacity=recent_results_size)
+        # Ventanas deslizantes de disponibilidad y percentiles de latencia por URL
+        self.stats = StatsEngine()
+        # Versiones de los datos para invalidar las respuestas cacheadas de la API
+        self.versions = DataVersions()
+        # Trabajos de alta en bloque a la espera de la primera verificación de sus URLs
+        self.imports = ImportTracker()
+        # Una sola sonda en curso por URL: las llamadas concurrentes comparten su resultado
+        self.flights = SingleFlight()
+        # Instantánea periódica del estado en memoria para no reconstruirlo al reiniciar
+        self.snapshot = StateSnapshot(self, snapshot_path, snapshot_interval) if snapshot_interval else None
+        # Confirmación rápida de caídas, backoff de URLs caídas y timeouts según la latencia propia.
+        # En modo shards cada worker sondea con su propio planificador y no se aplica
+        self.policy = None
+        if adaptive and isinstance(self.scheduler, ProbeScheduler):
+            self.policy = AdaptivePolicy(self.stats, max_timeout=self.probe_engine.timeout)
+        # Difusión agrupada por ticks de las actualizaciones de estado a los clientes
+        self.broadcaster = None
+        if socketio:
+            self.broadcaster = StatusBroadcaster(socketio)
+            self.broadcaster.register_handlers()
+        
+        self._register_metrics()
         
         # Cargar URLs existentes desde la base de datos
         self.load_urls_from_db()
     
+    def _register_metrics(self):
+        """Gauges que se leen del estado existente solo cuando se piden las métricas"""
+        REGISTRY.callback_gauge('uptime_monitored_urls', 'URLs monitorizadas', lambda: len(self.urls))
+        REGISTRY.callback_counter(
+            'uptime_probes_coalesced_total', 'Verificaciones que reutilizaron la sonda ya en curso de su URL',
+            lambda: self.flights.shared
+        )
+        REGISTRY.callback_gauge(
+            'uptime_write_queue_depth', 'Resultados pendientes de escribir en la base de datos',
+            lambda: self.result_writer.queue_depth
+        )
+        REGISTRY.callback_counter(
+            'uptime_write_dropped_total', 'Resultados descartados por el buffer de escritura lleno',
+            lambda: self.result_writer.total_dropped
+        )
+        if self.broadcaster:
+            REGISTRY.callback_gauge(
+                'uptime_socketio_clients', 'Clientes Socket.IO conectados',
+                lambda: self.broadcaster.clients
+            )
+    
     def load_urls_from_db(self):
         """Carga las URLs monitoreadas desde la base de datos"""
         try:
             self.urls = get_all_urls()
+            url_options = get_url_options()
+            self.timings = {url: options['timing'] for url, options in url_options.items()}
+            self.probe_modes = {url: options['probe_mode'] for url, options in url_options.items()}
+            self.dns_caching = {url: options['dns_cache'] for url, options in url_options.items()}
+            # Restaurar desde la instantánea y consultar la base de datos solo para el resto,
+            # precargando su caché de resultados recientes con una única consulta
+            restored = set()
+            if self.snapshot:
+                try:
+                    restored = self.snapshot.load()
+                except Exception as e:
+                    logger.warning(f"No se pudo leer la instantánea de estado: {str(e)}")
+            for url in self.urls:
+                if url not in self.recent_results:
+                    self.recent_results.ensure(url)
+            missing = [url for url in self.urls if url not in restored]
+            recent = get_recent_results_by_url(missing, limit=self.recent_results.capacity) if missing else {}
+            self.recent_results.load(recent)
+            # Sembrar las ventanas de estadísticas con los resultados recientes (del más antiguo al más nuevo).
+            # Solo cubren el tramo de esos resultados: cada ventana informa de su cobertura en /api/stats
+            for url, results in recent.items():
+                for result in reversed(results):
+                    self.stats.record(url, result.status_code, result.response_time, result.is_up, result.checked_at)
             logger.info(f"Cargadas {len(self.urls)} URLs desde la base de datos")
         except Exception as e:
             logger.error(f"Error al cargar URLs desde la base de datos: {e}")
             self.urls = {}
+            self.timings = {}
+            self.probe_modes = {}
+            self.dns_caching = {}
 
-    def add_url(self, url, interval=None):
+    def add_url(self, url, interval=None, timing=None, probe_mode=None, dns_cache=None):
         """Añade una URL con un intervalo de monitoreo personalizado"""
-        if interval is None:
-            interval = self.default_interval
-        
-        interval = max(5, int(interval))  # Mínimo 5 segundos
+        interval = self._validate_options(interval, timing, probe_mode, dns_cache)
         
         with self._lock:
             # Verificar si la URL ya existe
             url_exists = url in self.urls
             current_interval = self.urls.get(url)
+            options_changed = (
+                (timing is not None and timing != self.timings.get(url)) or
+                (probe_mode is not None and probe_mode != self.probe_modes.get(url)) or
+                (dns_cache is not None and dns_cache != self.dns_caching.get(url))
+            )
             
-            # Si la URL existe y el intervalo ha cambiado, detener el monitoreo actual
-            if url_exists and current_interval != interval:
-                logger.info(f"Cambiando intervalo para {url}: {current_interval}s -> {interval}s")
-                self._stop_monitoring_url(url)
-                url_exists = False  # Forzar reinicio del monitoreo
-            
-            # Actualizar intervalo
+            # Actualizar intervalo y modos de medición y sondeo
             self.urls[url] = interval
+            if timing is not None:
+                self.timings[url] = timing
+            if probe_mode is not None:
+                self.probe_modes[url] = probe_mode
+            if dns_cache is not None:
+                self.dns_caching[url] = dns_cache
+            self.recent_results.ensure(url)
+            self.versions.bump(url)
             
             # Guardar en la base de datos
-            save_url(url, interval)
+            save_url(url, interval, timing, probe_mode, dns_cache)
             
-            # Si estamos monitorizando y es una URL nueva o ha cambiado el intervalo, iniciar nuevo hilo
-            if self.running and not url_exists:
-                # Iniciar el monitoreo en un hilo separado para no bloquear la respuesta API
-                init_thread = threading.Thread(
-                    target=self._initialize_monitoring_for_url,
-                    args=(url,),
-                    daemon=True
-                )
-                init_thread.start()
+            if self.running:
+                if not url_exists:
+                    # URL nueva: primera verificación inmediata desde el pool de workers
+                    self.scheduler.schedule(url, interval, delay=0)
+                elif current_interval != interval or options_changed:
+                    # Cambio de intervalo: actualizar la entrada del heap sin reiniciar nada
+                    logger.info(f"Cambiando intervalo para {url}: {current_interval}s -> {interval}s")
+                    self.scheduler.reschedule(url, interval)
             
             return True
 
-    def _initialize_monitoring_for_url(self, url):
-        """Inicializa el monitoreo para una URL (función segura para ejecutar en un hilo)"""
+    def _validate_options(self, interval, timing, probe_mode, dns_cache):
+        """Comprueba las opciones de una URL y devuelve el intervalo efectivo; lanza ValueError"""
+        if interval is None:
+            interval = self.default_interval
         try:
-            # Iniciar el monitoreo
-            self._start_monitoring_url(url)
-            
-            # Dar tiempo al hilo para inicializarse
-            time.sleep(0.5)
+            interval = max(5, int(interval))  # Mínimo 5 segundos
+        except (TypeError, ValueError):
+            raise ValueError(f"Intervalo inválido: {interval}")
+        if timing is not None and timing not in TIMING_MODES:
+            raise ValueError(f"Modo de medición inválido: {timing}. Disponibles: {list(TIMING_MODES)}")
+        if probe_mode is not None and probe_mode not in PROBE_MODES:
+            raise ValueError(f"Modo de sondeo inválido: {probe_mode}. Disponibles: {list(PROBE_MODES)}")
+        if dns_cache is not None and not isinstance(dns_cache, bool):
+            raise ValueError(f"dns_cache debe ser true o false: {dns_cache}")
+        return interval
+
+    def add_urls(self, entries):
+        """Alta o actualización en bloque de URLs.
+
+        `entries` son dicts con 'url' y opcionalmente interval, timing,
+        probe_mode y dns_cache. Se validan todas antes de tocar nada (ValueError
+        indicando la posición), se guardan en una sola transacción y las nuevas
+        se programan a la vez para su primera verificación. Devuelve el
+        ImportJob con el que seguir esas primeras verificaciones.
+        """
+        validated = {}
+        for position, entry in enumerate(entries):
+            try:
+                interval = self._validate_options(
+                    entry.get('interval'), entry.get('timing'), entry.get('probe_mode'), entry.get('dns_cache')
+                )
+            except ValueError as e:
+                raise ValueError(f"Entrada {position} ({entry.get('url')}): {e}")
+            # Si una URL se repite, vale la última aparición. Sin intervalo se conserva
+            # el de una URL existente y solo las nuevas reciben el intervalo por defecto
+            validated[entry['url']] = dict(entry, interval=interval if entry.get('interval') is not None else None)
+        
+        with self._lock:
+            for url, entry in validated.items():
+                if entry['interval'] is None and url not in self.urls:
+                    entry['interval'] = self.default_interval
+            added, updated = save_urls(list(validated.values()))
+            to_schedule = []
+            for url, entry in validated.items():
+                previous_interval = self.urls.get(url)
+                if entry['interval'] is None:
+                    entry['interval'] = previous_interval
+                self.urls[url] = entry['interval']
+                options_given = False
+                for options, key in ((self.timings, 'timing'), (self.probe_modes, 'probe_mode'),
+                                     (self.dns_caching, 'dns_cache')):
+                    if entry.get(key) is not None:
+                        options[url] = entry[key]
+                        options_given = True
+                self.recent_results.ensure(url)
+                self.versions.bump(url)
+                if previous_interval is None:
+                    to_schedule.append((url, entry['interval'], 0))
+                elif self.running and (previous_interval != entry['interval'] or options_given):
+                    self.scheduler.reschedule(url, entry['interval'])
             
-            # Forzar una primera verificación inmediata
-            self.check_url(url)
-        except Exception as e:
-            logger.error(f"Error al inicializar monitoreo para {url}: {str(e)}")
+            job = self.imports.create([url for url, _, _ in to_schedule], updated=len(updated))
+            if self.running and to_schedule:
+                # Primera verificación inmediata; el pool de workers y el límite por host marcan el ritmo
+                self.scheduler.schedule_many(to_schedule)
+        
+        logger.info(f"Alta en bloque: {len(added)} URLs nuevas, {len(updated)} actualizadas (trabajo {job.id})")
+        return job
 
     def remove_url(self, url):
         """Elimina una URL del monitoreo"""
         with self._lock:
             if url in self.urls:
                 logger.info(f"Eliminando URL {url} del monitoreo")
-                # Detener y eliminar el hilo si existe
-                self._stop_monitoring_url(url)
+                # Sacar la URL del planificador
+                self.scheduler.unschedule(url)
                 # Eliminar la URL del diccionario
                 del self.urls[url]
                 # Eliminar cualquier tiempo de última verificación
                 if url in self.last_check_times:
                     del self.last_check_times[url]
+                self.timings.pop(url, None)
+                self.probe_modes.pop(url, None)
+                self.dns_caching.pop(url, None)
+                if self.policy:
+                    self.policy.remove(url)
+                self.recent_results.remove(url)
+                self.stats.remove(url)
+                if self.broadcaster:
+                    self.broadcaster.forget(url)
+                self.versions.bump(url)
+                self.imports.forget(url)
                 # Eliminar de la base de datos
                 delete_url(url)
                 return True
             return False
-    
-    def _stop_monitoring_url(self, url):
-        """Detiene el monitoreo para una URL específica"""
-        if url in self.threads:
-            logger.debug(f"Deteniendo hilo de monitoreo para {url}")
-            # El hilo se detendrá solo cuando vea que la URL ya no está en self.urls
-            # o cuando detecte el flag thread_should_stop
-            if hasattr(self.threads[url], 'thread_should_stop'):
-                self.threads[url].thread_should_stop = True
-            # Eliminar la referencia al hilo
-            del self.threads[url]
 
     def check_url(self, url):
-        """Verifica el estado de una URL"""
-        # Verificar si ya hemos comprobado esta URL en los últimos N segundos
-        current_time = time.time()
-        min_interval_between_checks = 3  # segundos
-        
-        if url in self.last_check_times:
-            time_since_last_check = current_time - self.last_check_times[url]
-            if time_since_last_check < min_interval_between_checks:
-                logger.warning(f"Ignorando verificación para {url}: demasiado pronto (último: hace {time_since_last_check:.1f}s)")
-                return None
-        
-        # Actualizar el tiempo de la última verificación antes de comenzar
-        self.last_check_times[url] = current_time
+        """Verifica el estado de una URL.
+
+        Si ya hay una sonda en curso para la URL (del planificador, de un alta
+        o de una verificación manual) se espera a ella y se devuelve su
+        resultado en lugar de sondear y guardar otra vez.
+        """
+        result, _ = self.flights.do(url, self._check_url, url)
+        return result
+
+    def check_now(self, url):
+        """Verificación bajo demanda; devuelve (resultado, compartido).
+
+        La próxima verificación programada se aplaza un intervalo completo para
+        no repetir la sonda en cuanto termine esta. Lanza KeyError si la URL no
+        está monitorizada.
+        """
+        if url not in self.urls:
+            raise KeyError(url)
+        if self.running and isinstance(self.scheduler, ProbeScheduler) and not self.flights.in_flight(url):
+            self.scheduler.defer(url, self.urls.get(url, self.default_interval))
+        return self.flights.do(url, self._check_url, url)
+
+    def _check_url(self, url):
+        self.last_check_times[url] = time.time()
         
-        start_time = time.time()
+        PROBES_IN_FLIGHT.inc()
         try:
-            logger.info(f"Verificando URL: {url} (intervalo configurado: {self.urls.get(url, 'desconocido')}s)")
-            response = requests.get(url, timeout=10)
-            response_time = int((time.time() - start_time) * 1000)
-            status_code = response.status_code
+            logger.debug("Verificando URL: %s", url, extra={'url': url})
+            result = self.probe_engine.probe(
+                url,
+                timing=self.timings.get(url, TIMING_WARM),
+                probe_mode=self.probe_modes.get(url, PROBE_FULL),
+                dns_cache=self.dns_caching.get(url, True),
+                timeout=self.policy.timeout_for(url) if self.policy else None
+            )
+            status_code, response_time, timings = result.status_code, result.response_time, result.timings
             is_up = status_code == 200
-            logger.info(f"Resultado para {url}: status_code={status_code}, is_up={is_up}, tiempo={response_time}ms")
+            # Los argumentos se formatean en el hilo del QueueListener, y solo si el mensaje pasa nivel y muestreo
+            logger.info("Resultado para %s: status_code=%s, is_up=%s, tiempo=%sms",
+                        url, status_code, is_up, response_time, extra={'url': url})
         except requests.RequestException as e:
-            logger.warning(f"Error al verificar {url}: {str(e)}")
+            logger.warning("Error al verificar %s: %s", url, e, extra={'url': url})
             response_time = 0
             status_code = 0
             is_up = False
+            timings = None
+        finally:
+            PROBES_IN_FLIGHT.dec()
 
-        # Guardar resultado en la base de datos
+        # Espera en la cola del planificador, aparte del tiempo de respuesta
+        queue_wait = current_queue_wait()
+        if queue_wait is not None:
+            timings = dict(timings or {}, queue=int(queue_wait * 1000))
+
+        self.record_result(url, status_code, response_time, is_up, timings=timings)
+        
+        if self.policy:
+            was_failing = self.policy.is_failing(url)
+            # Reintento rápido para confirmar una caída o backoff si lleva tiempo caída
+            delay = self.policy.on_result(url, is_up, self.urls.get(url, self.default_interval))
+            # El estado de la política forma parte de los detalles de la URL
+            self.versions.bump(url)
+            if delay is not None and self.running:
+                logger.info("Próxima verificación de %s en %.0fs (%s)",
+                            url, delay, self.policy.state(url)['state'], extra={'url': url})
+                self.scheduler.defer(url, delay)
+            elif was_failing and is_up and self.running:
+                # Recuperada: volver a la ranura de su fase para no seguir sincronizada con
+                # las demás URLs del host que cayeron a la vez
+                self.scheduler.realign(url)
+        
+        return {
+            'url': url,
+            'status_code': status_code,
+            'response_time': response_time,
+            'is_up': is_up,
+            'timings': timings
+        }
+
+    def record_result(self, url, status_code, response_time, is_up, checked_at=None, timings=None):
+        """Procesa un resultado: escritura en bloque, caché, estadísticas y difusión"""
+        # Encolar el resultado para su escritura en bloque
         try:
             check_id = int(time.time() * 1000)
-            result = save_result(url, status_code, response_time, is_up)
+            result = self.result_writer.enqueue(url, status_code, response_time, is_up, checked_at, timings)
+            self.recent_results.record(url, status_code, response_time, is_up, result['checked_at'], timings)
+            self.stats.record(url, status_code, response_time, is_up, result['checked_at'])
+            self.versions.bump(url)
+            self.imports.record(url, status_code, response_time, is_up, result['checked_at'])
+            if status_code:
+                PROBES.labels('up' if is_up else 'down').inc()
+                PROBE_DURATION.observe(response_time / 1000)
+            else:
+                PROBES.labels('error').inc()
             
-            # Emitir evento en tiempo real si socketio está configurado
-            if self.socketio:
-                logger.info(f"Emitiendo evento para {url}: status_code={status_code}, is_up={is_up}, check_id={check_id}")
-                self.socketio.emit('status_update', {
+            # Publicar la actualización; el broadcaster la agrupa con las demás del mismo tick
+            if self.broadcaster:
+                self.broadcaster.publish({
                     'url': url,
                     'status_code': status_code,
                     'response_time': response_time,
                     'is_up': is_up,
-                    'checked_at': datetime.utcnow().isoformat(),
+                    'checked_at': result['checked_at'].isoformat(),
+                    'timings': timings,
                     'check_id': check_id
-                }, namespace='/')  # Asegúrate de emitir en el namespace correcto
-                
-                # Añadir una verificación de que el evento se emitió correctamente
-                logger.info(f"Evento emitido correctamente para {url}")
+                })
         except Exception as e:
             logger.error(f"Error al procesar resultado para {url}: {str(e)}")
-        
-        return {
-            'url': url,
-            'status_code': status_code,
-            'response_time': response_time,
-            'is_up': is_up
-        }
-
-    def _monitor_url_thread_func(self, url):
-        """Función que se ejecuta en un hilo separado para monitorear una URL"""
-        thread = threading.current_thread()
-        thread.thread_should_stop = False
-        thread.thread_id = f"monitor-{url}-{int(time.time())}"
-        
-        interval = self.urls.get(url, self.default_interval)
-        logger.info(f"[{thread.thread_id}] Iniciando monitoreo para {url} con intervalo {interval} segundos")
-        
-        # Primera verificación inmediata solo si no se ha verificado recientemente
-        if url not in self.last_check_times or time.time() - self.last_check_times.get(url, 0) > 5:
-            self.check_url(url)
-        
-        while self.running and url in self.urls and not thread.thread_should_stop:
-            try:
-                # Obtener el intervalo actualizado
-                interval = self.urls.get(url, self.default_interval)
-                
-                # Esperar exactamente el intervalo configurado
-                logger.debug(f"[{thread.thread_id}] Esperando {interval}s antes de la próxima verificación de {url}")
-                
-                # Dividir el tiempo de espera en pequeños bloques
-                sleep_start = time.time()
-                while time.time() - sleep_start < interval:
-                    if not self.running or url not in self.urls or thread.thread_should_stop:
-                        break
-                    time.sleep(min(0.5, interval - (time.time() - sleep_start)))
-                
-                # Verificar si debemos continuar
-                if self.running and url in self.urls and not thread.thread_should_stop:
-                    logger.debug(f"[{thread.thread_id}] Verificando {url} después de esperar {interval}s")
-                    self.check_url(url)
-                
-            except Exception as e:
-                logger.error(f"[{thread.thread_id}] Error en hilo de monitoreo para {url}: {str(e)}")
-                time.sleep(5)  # Esperar antes de reintentar en caso de error
-        
-        logger.info(f"[{thread.thread_id}] Finalizando monitoreo para {url}")
 
-    def _start_monitoring_url(self, url):
-        """Inicia un hilo de monitoreo para una URL específica"""
-        with self._lock:
-            # Verificar si ya hay un hilo activo para esta URL
-            if url in self.threads and self.threads[url].is_alive():
-                logger.warning(f"Ya existe un hilo activo para {url}. Deteniendo primero.")
-                self._stop_monitoring_url(url)
-            
-            # Asegurar que la URL todavía está en nuestra lista
-            if url not in self.urls:
-                logger.warning(f"La URL {url} ya no está en la lista de monitoreo. No se iniciará el hilo.")
-                return
-            
-            logger.info(f"Creando nuevo hilo para {url} con intervalo {self.urls.get(url)}s")
-            thread = threading.Thread(
-                target=self._monitor_url_thread_func, 
-                args=(url,),
-                name=f"monitor-{url}-{int(time.time())}"
-            )
-            thread.daemon = True
-            thread.thread_should_stop = False
-            self.threads[url] = thread
-            thread.start()
+    def _on_shard_result(self, url, status_code, response_time, is_up, checked_at, timings=None):
+        """Resultado recibido de un worker en modo shards"""
+        self.last_check_times[url] = time.time()
+        self.record_result(url, status_code, response_time, is_up, checked_at, timings)
 
     def start_monitoring(self):
-        """Inicia el monitoreo en hilos separados para cada URL"""
+        """Inicia el monitoreo programando todas las URLs en el planificador central"""
         if not self.running:
             self.running = True
             logger.info("Iniciando sistema de monitoreo")
             
-            # Detener cualquier hilo existente por si acaso
-            for url in list(self.threads.keys()):
-                self._stop_monitoring_url(url)
+            now = time.time()
+            items = []
+            with self._lock:
+                for url, interval in self.urls.items():
+                    last_check = self.last_check_times.get(url)
+                    # Respetar el intervalo desde la última verificación conocida si aún no ha vencido
+                    delay = last_check + interval - now if last_check is not None else 0
+                    if delay <= 0:
+                        # Sin verificación pendiente (URL nueva o parada más larga que el intervalo):
+                        # no lanzar toda la flota a la vez
+                        if self.startup_ramp:
+                            # Repartir las primeras verificaciones en la ventana de arranque
+                            delay = phase_offset(url, self.startup_ramp)
+                        else:
+                            # Primera verificación en la ranura de su fase dentro del intervalo
+                            delay = None
+                    items.append((url, interval, delay))
+                # Toda la flota de una vez, con una sola toma del lock del planificador
+                self.scheduler.schedule_many(items)
             
-            # Iniciar un hilo para cada URL
-            for url in list(self.urls.keys()):
-                self._start_monitoring_url(url)
+            self.result_writer.start()
+            self.scheduler.start()
+            self.retention.start()
+            if self.snapshot:
+                self.snapshot.start()
+            if self.broadcaster:
+                self.broadcaster.start()
 
     def stop_monitoring(self):
         """Detiene el monitoreo"""
         if self.running:
             logger.info("Deteniendo sistema de monitoreo")
             self.running = False
-            
-            # Esperar a que todos los hilos terminen
-            for url, thread in list(self.threads.items()):
-                logger.debug(f"Esperando a que termine el hilo para {url}")
-                if hasattr(thread, 'thread_should_stop'):
-                    thread.thread_should_stop = True
-            
-            self.threads = {}
\ No newline at end of file
+            self.retention.stop()
+            self.scheduler.stop()
+            self.probe_engine.close()
+            # Volcar a la base de datos los resultados pendientes
+            self.result_writer.stop()
+            if self.snapshot:
+                self.snapshot.stop()
+                try:
+                    self.snapshot.save()
+                except Exception as e:
+                    logger.error(f"Error al escribir la instantánea de estado: {str(e)}")
+            if self.broadcaster:
+                self.broadcaster.stop()
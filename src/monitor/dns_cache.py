@@ -0,0 +1,189 @@
+import ipaddress
+import logging
+import socket
+import threading
+import time
+
+try:
+    # dnspython llega como dependencia de eventlet; solo se usa para conocer el TTL de los registros
+    import dns.exception
+    import dns.resolver
+except ImportError:
+    dns = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('addresses', 'error', 'resolved_at', 'expires_at', 'refreshing')
+
+    def __init__(self, addresses, error, ttl):
+        self.addresses = addresses  # [(family, ip)] o None si la resolución falló
+        self.error = error  # socket.gaierror cacheado (caché negativa)
+        self.resolved_at = time.monotonic()
+        self.expires_at = self.resolved_at + ttl
+        self.refreshing = False
+
+
+class DNSCache:
+    """Caché de resolución DNS compartida por todas las sondas del proceso.
+
+    Las entradas caducan según el TTL del registro (acotado entre `min_ttl` y
+    `max_ttl`; `default_ttl` si no se puede consultar), que se consulta en
+    segundo plano para no alargar la fase DNS de la sonda. Los fallos de
+    resolución se cachean `negative_ttl` segundos. Cuando una entrada ha
+    consumido `refresh_ahead` de su vida se vuelve a resolver en segundo plano
+    mientras se sigue sirviendo la dirección cacheada, de modo que las sondas
+    no esperan al resolver mientras el nombre siga resolviendo.
+    """
+
+    def __init__(self, default_ttl=60, min_ttl=5, max_ttl=3600, negative_ttl=10, refresh_ahead=0.8,
+                 max_entries=10000):
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_entries = max_entries
+        self._entries = {}
+        self._pending = {}  # host -> Event de la resolución en curso (una sola consulta por host)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def getaddrinfo(self, host, port):
+        """Devuelve [(family, ip)] para `host`; lanza socket.gaierror si no resuelve"""
+        if _is_ip(host):
+            return [(socket.AF_INET6 if ':' in host else socket.AF_INET, host)]
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(host)
+                now = time.monotonic()
+                if entry is not None and now < entry.expires_at:
+                    if entry.error is not None:
+                        self.negative_hits += 1
+                        raise entry.error
+                    self.hits += 1
+                    if not entry.refreshing and now - entry.resolved_at >= self.refresh_ahead * (
+                            entry.expires_at - entry.resolved_at):
+                        entry.refreshing = True
+                        threading.Thread(target=self._refresh, args=(host,), daemon=True).start()
+                    return entry.addresses
+
+                pending = self._pending.get(host)
+                if pending is None:
+                    pending = self._pending[host] = threading.Event()
+                    self.misses += 1
+                    break
+            # Otra sonda ya está resolviendo este host: esperar su resultado
+            pending.wait()
+
+        try:
+            # En el camino de la sonda solo getaddrinfo: la entrada nace con default_ttl
+            # y el TTL real del registro se consulta después en segundo plano
+            entry = self._resolve(host, lookup_ttl=False)
+            with self._lock:
+                self._store(host, entry)
+        finally:
+            with self._lock:
+                self._pending.pop(host, None)
+            pending.set()
+
+        if entry.error is not None:
+            raise entry.error
+        if dns is not None:
+            threading.Thread(target=self._learn_ttl, args=(host, entry), daemon=True).start()
+        return entry.addresses
+
+    def _learn_ttl(self, host, entry):
+        """Ajusta la caducidad de una entrada recién resuelta al TTL de su registro"""
+        ttl = self._ttl(host)
+        with self._lock:
+            if self._entries.get(host) is entry:
+                entry.expires_at = entry.resolved_at + ttl
+
+    def _refresh(self, host):
+        entry = self._resolve(host)
+        with self._lock:
+            self.refreshes += 1
+            if entry.error is not None:
+                # Un fallo transitorio no invalida la entrada vigente; caducará a su hora
+                self.refresh_failures += 1
+                current = self._entries.get(host)
+                if current is not None:
+                    current.refreshing = False
+                return
+            self._store(host, entry)
+
+    def _store(self, host, entry):
+        if host not in self._entries and len(self._entries) >= self.max_entries:
+            # Desalojar la entrada que antes caduca
+            oldest = min(self._entries, key=lambda key: self._entries[key].expires_at)
+            del self._entries[oldest]
+        self._entries[host] = entry
+
+    def _resolve(self, host, lookup_ttl=True):
+        try:
+            infos = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            logger.debug("Resolución fallida para %s: %s", host, e)
+            return _Entry(None, e, self.negative_ttl)
+
+        addresses = []
+        for family, _, _, _, sockaddr in infos:
+            address = (family, sockaddr[0])
+            if address not in addresses:
+                addresses.append(address)
+        return _Entry(addresses, None, self._ttl(host) if lookup_ttl else self.default_ttl)
+
+    def _ttl(self, host):
+        """TTL del registro A/AAAA de `host`; `default_ttl` si no es consultable (p. ej. /etc/hosts)"""
+        if dns is None:
+            return self.default_ttl
+        for rdtype in ('A', 'AAAA'):
+            try:
+                answer = dns.resolver.resolve(host, rdtype, lifetime=2, raise_on_no_answer=False)
+            except dns.exception.DNSException:
+                continue
+            if answer.rrset is not None:
+                return max(self.min_ttl, min(self.max_ttl, answer.rrset.ttl))
+        return self.default_ttl
+
+    def invalidate(self, host=None):
+        """Elimina la entrada de un host (o todas)"""
+        with self._lock:
+            if host is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(host, None)
+
+    def get_stats(self):
+        with self._lock:
+            now = time.monotonic()
+            negative = sum(1 for entry in self._entries.values() if entry.error is not None)
+            expired = sum(1 for entry in self._entries.values() if entry.expires_at <= now)
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'negative_entries': negative,
+            'expired_entries': expired,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures
+        }
+
+
+def _is_ip(host):
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
@@ -0,0 +1,107 @@
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+
+class ImportJob:
+    """Seguimiento de la primera verificación de las URLs dadas de alta en bloque"""
+
+    def __init__(self, urls, updated=0):
+        self.id = uuid.uuid4().hex
+        self.created_at = datetime.utcnow()
+        self.urls = list(urls)
+        self.updated = updated
+        self.results = {}  # url -> primer resultado tras el alta
+        self.removed = set()  # URLs dadas de baja antes de su primera verificación
+        self.finished_at = None
+
+    @property
+    def pending(self):
+        return len(self.urls) - len(self.results) - len(self.removed)
+
+    def to_dict(self, offset=0, limit=1000):
+        up = sum(1 for result in self.results.values() if result['is_up'])
+        checked = [
+            dict(self.results[url], url=url)
+            for url in self.urls if url in self.results
+        ]
+        return {
+            'job_id': self.id,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'done': self.pending == 0,
+            'added': len(self.urls),
+            'updated': self.updated,
+            'checked': len(self.results),
+            'pending': self.pending,
+            'removed': len(self.removed),
+            'up': up,
+            'down': len(self.results) - up,
+            'results': checked[offset:offset + limit]
+        }
+
+
+class ImportTracker:
+    """Trabajos de alta en bloque y sus URLs pendientes de primera verificación.
+
+    record() se llama con cada resultado; mientras no haya trabajos abiertos
+    solo cuesta comprobar un dict vacío. Se conservan los `max_jobs` trabajos
+    más recientes.
+    """
+
+    def __init__(self, max_jobs=100):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._watch = {}  # url pendiente -> trabajo
+        self._lock = threading.Lock()
+
+    def create(self, urls, updated=0):
+        job = ImportJob(urls, updated)
+        with self._lock:
+            self._jobs[job.id] = job
+            for url in job.urls:
+                self._watch[url] = job
+            while len(self._jobs) > self.max_jobs:
+                _, old = self._jobs.popitem(last=False)
+                for url in old.urls:
+                    if self._watch.get(url) is old:
+                        del self._watch[url]
+            if not job.urls:
+                job.finished_at = job.created_at
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def record(self, url, status_code, response_time, is_up, checked_at):
+        if not self._watch:
+            return
+        with self._lock:
+            job = self._watch.pop(url, None)
+            if job is None:
+                return
+            job.results[url] = {
+                'status_code': status_code,
+                'response_time': response_time,
+                'is_up': is_up,
+                'checked_at': checked_at.isoformat() if checked_at else None
+            }
+            if job.pending == 0:
+                job.finished_at = datetime.utcnow()
+
+    def forget(self, url):
+        """La URL se ha dado de baja: deja de esperarse su primera verificación"""
+        if not self._watch:
+            return
+        with self._lock:
+            job = self._watch.pop(url, None)
+            if job is not None:
+                job.removed.add(url)
+                if job.pending == 0:
+                    job.finished_at = datetime.utcnow()
+
+    def get_stats(self):
+        with self._lock:
+            return {'jobs': len(self._jobs), 'pending_urls': len(self._watch)}
@@ -0,0 +1,69 @@
+from urllib.parse import urlsplit
+
+
+def host_key(url):
+    """Clave del limitador para una URL: host y puerto en minúsculas"""
+    return urlsplit(url).netloc.lower()
+
+
+class HostLimiter:
+    """Límite de cortesía por host para las sondas.
+
+    Acota las peticiones en vuelo por host (`max_per_host`) y, si se indica
+    `rate`, las peticiones por segundo con un token bucket por host de
+    capacidad `burst`. No es thread-safe: el planificador lo usa siempre
+    bajo su propio lock.
+    """
+
+    def __init__(self, max_per_host=4, rate=None, burst=None):
+        self.max_per_host = max_per_host
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 1.0)
+        self._in_flight = {}  # host -> peticiones en curso
+        self._buckets = {}  # host -> [tokens, último relleno]
+
+        # Estadísticas expuestas
+        self.concurrency_denials = 0
+        self.rate_denials = 0
+
+    def acquire(self, host, now):
+        """Intenta ocupar un hueco para `host`.
+
+        Devuelve 0 si se concede, None si el host tiene todas sus peticiones en
+        vuelo (hay que esperar a un release) o los segundos hasta el próximo token.
+        """
+        in_flight = self._in_flight.get(host, 0)
+        if self.max_per_host and in_flight >= self.max_per_host:
+            self.concurrency_denials += 1
+            return None
+
+        if self.rate:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = [self.burst, now]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                self.rate_denials += 1
+                return (1 - bucket[0]) / self.rate
+            bucket[0] -= 1
+
+        self._in_flight[host] = in_flight + 1
+        return 0
+
+    def release(self, host):
+        in_flight = self._in_flight.get(host, 0) - 1
+        if in_flight > 0:
+            self._in_flight[host] = in_flight
+        else:
+            self._in_flight.pop(host, None)
+
+    def get_stats(self):
+        return {
+            'max_per_host': self.max_per_host,
+            'rate_per_host': self.rate,
+            'burst': self.burst if self.rate else None,
+            'busy_hosts': len(self._in_flight),
+            'concurrency_denials': self.concurrency_denials,
+            'rate_denials': self.rate_denials
+        }
@@ -0,0 +1,146 @@
+import threading
+import time
+from datetime import datetime
+
+# Estados de una URL para la política adaptativa
+STATE_UP = 'up'
+STATE_CONFIRMING = 'confirming'  # Ha fallado y se está confirmando con reintentos rápidos
+STATE_DOWN = 'down'  # Caída confirmada, cadencia normal
+STATE_BACKOFF = 'backoff'  # Caída prolongada, intervalo creciente
+
+
+class _UrlState:
+    __slots__ = ('failures', 'down_since', 'next_delay')
+
+    def __init__(self):
+        self.failures = 0  # Fallos consecutivos
+        self.down_since = None  # time.time() del primer fallo de la racha
+        self.next_delay = None  # Retraso impuesto a la próxima verificación (None = intervalo normal)
+
+
+class AdaptivePolicy:
+    """Política adaptativa de intervalos y timeouts por URL.
+
+    - Al detectar un fallo, confirma la caída con `confirm_retries`
+      verificaciones separadas `confirm_delay` segundos en lugar de esperar
+      al siguiente intervalo.
+    - Tras `backoff_after` fallos más con la caída confirmada, multiplica el
+      intervalo por `backoff_factor` en cada fallo, hasta `max_backoff` segundos.
+    - El timeout de cada sonda es el p99 de latencia de la URL en la ventana
+      `timeout_window` por `timeout_factor`, acotado entre `min_timeout` y
+      `max_timeout`. Mientras se confirma una caída se usa `max_timeout` para
+      no confundir una respuesta lenta con una caída.
+    """
+
+    def __init__(self, stats, confirm_retries=2, confirm_delay=3, backoff_after=3, backoff_factor=2,
+                 max_backoff=600, timeout_factor=4, min_timeout=2, max_timeout=10, timeout_window='24h',
+                 timeout_min_samples=20):
+        self.stats = stats
+        self.confirm_retries = confirm_retries
+        self.confirm_delay = confirm_delay
+        self.backoff_after = backoff_after
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_window = timeout_window
+        self.timeout_min_samples = timeout_min_samples
+        self._states = {}
+        self._lock = threading.Lock()
+
+        # Estadísticas expuestas
+        self.confirm_checks = 0
+        self.confirmed_outages = 0
+        self.backoff_checks = 0
+        self.adaptive_timeouts = 0
+
+    def timeout_for(self, url):
+        """Timeout en segundos para la próxima sonda de `url`"""
+        with self._lock:
+            state = self._states.get(url)
+            if state is not None and 0 < state.failures <= self.confirm_retries:
+                return self.max_timeout
+        p99 = self.stats.latency_percentile(url, 0.99, self.timeout_window, self.timeout_min_samples)
+        if p99 is None:
+            return self.max_timeout
+        self.adaptive_timeouts += 1
+        return max(self.min_timeout, min(self.max_timeout, p99 / 1000 * self.timeout_factor))
+
+    def on_result(self, url, is_up, interval):
+        """Registra un resultado y devuelve el retraso de la próxima verificación (None = intervalo normal)"""
+        with self._lock:
+            state = self._states.get(url)
+            if state is None:
+                state = self._states[url] = _UrlState()
+
+            if is_up:
+                state.failures = 0
+                state.down_since = None
+                state.next_delay = None
+                return None
+
+            state.failures += 1
+            if state.down_since is None:
+                state.down_since = time.time()
+
+            if state.failures <= self.confirm_retries:
+                self.confirm_checks += 1
+                state.next_delay = min(self.confirm_delay, interval)
+            else:
+                if state.failures == self.confirm_retries + 1:
+                    self.confirmed_outages += 1
+                excess = state.failures - self.confirm_retries - self.backoff_after
+                if excess > 0:
+                    self.backoff_checks += 1
+                    # El exponente se acota para no desbordar; el tope real es max_backoff
+                    backoff = interval * self.backoff_factor ** min(excess, 32)
+                    state.next_delay = min(max(self.max_backoff, interval), backoff)
+                else:
+                    state.next_delay = None
+            return state.next_delay
+
+    def is_failing(self, url):
+        """Si la URL tiene fallos consecutivos (confirmando, caída o en backoff)"""
+        with self._lock:
+            state = self._states.get(url)
+            return state is not None and state.failures > 0
+
+    def state(self, url):
+        """Estado de la política para una URL"""
+        with self._lock:
+            state = self._states.get(url)
+            if state is None or not state.failures:
+                return {'state': STATE_UP, 'failures': 0, 'down_since': None, 'next_delay': None}
+            if state.failures <= self.confirm_retries:
+                name = STATE_CONFIRMING
+            elif state.next_delay is not None:
+                name = STATE_BACKOFF
+            else:
+                name = STATE_DOWN
+            return {
+                'state': name,
+                'failures': state.failures,
+                'down_since': datetime.utcfromtimestamp(state.down_since).isoformat(),
+                'next_delay': state.next_delay
+            }
+
+    def remove(self, url):
+        with self._lock:
+            self._states.pop(url, None)
+
+    def get_stats(self):
+        with self._lock:
+            failing = sum(1 for state in self._states.values() if state.failures)
+            backing_off = sum(
+                1 for state in self._states.values()
+                if state.failures > self.confirm_retries and state.next_delay is not None
+            )
+        return {
+            'failing_urls': failing,
+            'backoff_urls': backing_off,
+            'confirm_checks': self.confirm_checks,
+            'confirmed_outages': self.confirmed_outages,
+            'backoff_checks': self.backoff_checks,
+            'adaptive_timeouts': self.adaptive_timeouts
+        }
@@ -0,0 +1,243 @@
+import socket
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, HTTPError, NameResolutionError, NewConnectionError, ReadTimeoutError
+from urllib3.util import connection as urllib3_connection
+from monitor.dns_cache import DNSCache
+
+logger = logging.getLogger(__name__)
+
+# Modos de medición disponibles por URL
+TIMING_WARM = 'warm'  # Reutiliza conexiones keep-alive del pool
+TIMING_COLD = 'cold'  # Abre siempre una conexión nueva (incluye TCP+TLS)
+TIMING_MODES = (TIMING_WARM, TIMING_COLD)
+
+# Modos de sondeo: cuánto de la respuesta se descarga
+PROBE_HEAD = 'head'  # Petición HEAD, sin cuerpo
+PROBE_HEADERS = 'headers'  # GET que se corta al recibir las cabeceras
+PROBE_PARTIAL = 'partial'  # GET que lee solo los primeros N bytes del cuerpo
+PROBE_FULL = 'full'  # GET completo
+PROBE_MODES = (PROBE_HEAD, PROBE_HEADERS, PROBE_PARTIAL, PROBE_FULL)
+
+# Opciones de sondeo por URL y sus valores por defecto
+# (dns_cache=False resuelve siempre con el sistema para monitorizar también la resolución)
+DEFAULT_URL_OPTIONS = {'timing': TIMING_WARM, 'probe_mode': PROBE_FULL, 'dns_cache': True}
+URL_OPTION_CHOICES = {'timing': TIMING_MODES, 'probe_mode': PROBE_MODES, 'dns_cache': (True, False)}
+
+# Fases de una petición, en milisegundos
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'transfer')
+
+# Tiempos y caché DNS de la sonda en curso en este hilo (green thread con eventlet)
+_current = threading.local()
+
+
+class PhaseTimings:
+    """Desglose por fases de una sonda en milisegundos.
+
+    dns, connect y tls quedan a 0 cuando se reutiliza una conexión del pool;
+    ttfb es el tiempo desde el envío de la petición hasta recibir las
+    cabeceras y transfer el de lectura del cuerpo.
+    """
+
+    __slots__ = PHASES
+
+    def __init__(self):
+        for phase in PHASES:
+            setattr(self, phase, 0.0)
+
+    def as_dict(self):
+        return {phase: int(round(getattr(self, phase))) for phase in PHASES}
+
+
+def _record(phase, ms):
+    timings = getattr(_current, 'timings', None)
+    if timings is not None:
+        setattr(timings, phase, getattr(timings, phase) + ms)
+
+
+class _TimedConnectMixin:
+    """Separa la resolución DNS de la conexión TCP y mide ambas"""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            addresses = self._resolve()
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter()
+        _record('dns', (resolved - start) * 1000)
+
+        error = None
+        for _, ip in addresses:
+            try:
+                sock = urllib3_connection.create_connection(
+                    (ip, self.port),
+                    self.timeout,
+                    source_address=self.source_address,
+                    socket_options=self.socket_options,
+                )
+                break
+            except socket.timeout as e:
+                raise ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                ) from e
+            except OSError as e:
+                error = e
+        else:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {error}") from error
+
+        _record('connect', (time.perf_counter() - resolved) * 1000)
+        return sock
+
+    def _resolve(self):
+        """[(family, ip)] del host, desde la caché DNS de la sonda si la tiene activa"""
+        dns_cache = getattr(_current, 'dns_cache', None)
+        if dns_cache is not None:
+            return dns_cache.getaddrinfo(self._dns_host, self.port)
+        infos = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        return [(family, sockaddr[0]) for family, _, _, _, sockaddr in infos]
+
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    def connect(self):
+        timings = getattr(_current, 'timings', None)
+        before = (timings.dns + timings.connect) if timings is not None else 0.0
+        start = time.perf_counter()
+        super().connect()
+        if timings is not None:
+            # El handshake TLS es lo que queda tras descontar DNS y TCP de esta conexión
+            elapsed = (time.perf_counter() - start) * 1000
+            timings.tls += max(0.0, elapsed - (timings.dns + timings.connect - before))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Adaptador de requests cuyas conexiones informan del tiempo de cada fase"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+
+class ProbeResult:
+    __slots__ = ('status_code', 'response_time', 'timings')
+
+    def __init__(self, status_code, response_time, timings):
+        self.status_code = status_code
+        self.response_time = response_time
+        self.timings = timings
+
+
+class ProbeEngine:
+    """Motor de sondeo HTTP con pool de conexiones keep-alive por host.
+
+    Con eventlet parcheado cada worker del planificador es un green thread, así
+    que miles de sondas concurrentes comparten un único hub. El pool limita las
+    conexiones abiertas por host (`max_per_host`) y el semáforo global limita
+    las peticiones en vuelo (`max_total`). Las resoluciones de nombres pasan
+    por una caché DNS compartida salvo que la URL la desactive.
+    """
+
+    def __init__(self, max_per_host=10, max_total=500, max_hosts=1000, timeout=10, partial_bytes=4096,
+                 dns_cache=None):
+        self.timeout = timeout
+        self.dns_cache = dns_cache if dns_cache is not None else DNSCache()
+        self.max_per_host = max_per_host
+        self.max_total = max_total
+        self.partial_bytes = partial_bytes
+        self._total = threading.BoundedSemaphore(max_total)
+
+        # pool_block=True hace que las peticiones esperen una conexión libre
+        # en lugar de abrir conexiones extra por encima del límite por host
+        self.session = self._new_session(
+            TimedHTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_per_host, pool_block=True)
+        )
+
+    @staticmethod
+    def _new_session(adapter):
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def probe(self, url, timing=TIMING_WARM, probe_mode=PROBE_FULL, timeout=None, dns_cache=True):
+        """Realiza una sonda y devuelve un ProbeResult con el desglose por fases.
+
+        Propaga requests.RequestException para que el llamador decida cómo
+        registrar el fallo.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        with self._total:
+            if timing == TIMING_COLD:
+                # Sesión efímera y `Connection: close` para medir siempre el handshake completo
+                with self._new_session(TimedHTTPAdapter()) as session:
+                    return self._probe(session, url, probe_mode, timeout, {'Connection': 'close'}, dns_cache)
+            return self._probe(self.session, url, probe_mode, timeout, None, dns_cache)
+
+    def _probe(self, session, url, probe_mode, timeout, headers, dns_cache):
+        timings = PhaseTimings()
+        _current.timings = timings
+        _current.dns_cache = self.dns_cache if dns_cache else None
+        try:
+            method = 'HEAD' if probe_mode == PROBE_HEAD else 'GET'
+            start_time = time.perf_counter()
+            response = session.request(method, url, timeout=timeout, headers=headers, stream=True)
+            headers_time = time.perf_counter()
+
+            self._read_body(response, probe_mode)
+            end_time = time.perf_counter()
+        finally:
+            _current.timings = None
+            _current.dns_cache = None
+
+        timings.ttfb = max(0.0, (headers_time - start_time) * 1000 - timings.dns - timings.connect - timings.tls)
+        timings.transfer = (end_time - headers_time) * 1000
+        response_time = int((end_time - start_time) * 1000)
+        return ProbeResult(response.status_code, response_time, timings.as_dict())
+
+    def _read_body(self, response, probe_mode):
+        if probe_mode == PROBE_FULL:
+            # Consumir el cuerpo completo devuelve la conexión al pool
+            response.content
+            return
+        if probe_mode == PROBE_PARTIAL:
+            try:
+                response.raw.read(self.partial_bytes)
+            except HTTPError as e:
+                # La lectura directa de urllib3 no pasa por requests: traducir sus errores
+                # como en el modo completo para que el llamador los registre como caída
+                response.close()
+                if isinstance(e, ReadTimeoutError):
+                    raise requests.exceptions.ReadTimeout(e, response=response) from e
+                raise requests.exceptions.ConnectionError(e, response=response) from e
+        if probe_mode == PROBE_HEAD or response.raw.length_remaining == 0:
+            # No queda cuerpo pendiente: la conexión vuelve al pool
+            response.raw.release_conn()
+        else:
+            # Con cuerpo sin leer la conexión no se puede reutilizar y se cierra
+            response.close()
+
+    def close(self):
+        """Cierra todas las conexiones del pool"""
+        self.session.close()
@@ -0,0 +1,425 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from monitor.limiter import HostLimiter, host_key
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Marcador para entradas del heap invalidadas (eliminadas o reprogramadas)
+_REMOVED = '<removed>'
+
+# Segundos de historial de despachos reales que se conservan para el perfil de carga
+LOAD_HISTORY = 300
+
+# Espera en cola (segundos) de la verificación que ejecuta el worker actual
+_worker = threading.local()
+
+SCHEDULE_LAG = REGISTRY.histogram(
+    'uptime_schedule_lag_seconds',
+    'Retraso del inicio de cada verificación respecto a su hora prevista por el intervalo',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+
+def current_queue_wait():
+    """Segundos que esperó en cola la verificación en curso en este worker (None fuera del planificador)"""
+    return getattr(_worker, 'queue_wait', None)
+
+
+def phase_offset(url, span):
+    """Desfase determinista de una URL dentro de `span` segundos, derivado de su hash"""
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64 * span
+
+
+class ProbeScheduler:
+    """Planificador central de verificaciones.
+
+    Mantiene una única cola de prioridad ordenada por el instante de la próxima
+    verificación y reparte las URLs vencidas a un pool acotado de workers.
+    Añadir, eliminar o cambiar el intervalo de una URL es una operación
+    O(log n) sobre el heap; las entradas obsoletas se marcan y se descartan
+    al llegar a la cima.
+
+    Cada URL tiene una fase fija dentro de su intervalo derivada del hash de
+    la URL, de modo que las URLs con el mismo intervalo no se disparan a la
+    vez ni siquiera tras un reinicio. `jitter` (fracción del intervalo) añade
+    un retraso aleatorio a cada ejecución sin desplazar la fase nominal.
+
+    Las URLs vencidas pasan por un limitador por host (`limiter`) y por un
+    tope global de verificaciones en vuelo (`max_in_flight`, por defecto el
+    número de workers). Las que no tienen hueco esperan en una cola por host
+    dentro del planificador, sin ocupar ningún worker, hasta que termina otra
+    verificación del mismo host o hay un token disponible.
+    """
+
+    def __init__(self, run_check, workers=20, jitter=0.0, limiter=None, max_in_flight=None):
+        self.run_check = run_check
+        self.workers = max(1, int(workers))
+        self.jitter = max(0.0, float(jitter))
+        self.limiter = limiter if limiter is not None else HostLimiter()
+        self.max_in_flight = max(1, int(max_in_flight or self.workers))
+        self.running = False
+        self._heap = []  # [due, seq, url]
+        self._entries = {}  # url -> entrada viva del heap
+        self._intervals = {}  # url -> intervalo en segundos
+        self._nominal = {}  # url -> instante nominal de la próxima ejecución (sin jitter)
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._queue = queue.Queue()
+        self._in_flight = set()
+        self._hosts = {}  # url -> clave del limitador (se calcula en su primer despacho)
+        self._waiting = {}  # host -> deque([(url, due)]) de URLs vencidas sin hueco
+        self._waiting_urls = set()
+        self._threads = []
+
+        # Estadísticas de despacho: retraso real frente al instante programado
+        self.dispatched = 0
+        self.skipped = 0
+        self.lag_sum = 0.0
+        self.max_lag = 0.0
+        # Espera en cola: desde el instante programado hasta que un worker empieza la verificación
+        self.started = 0
+        self.queue_wait_sum = 0.0
+        self.max_queue_wait = 0.0
+        # Despachos por segundo de reloj de los últimos LOAD_HISTORY segundos
+        self._load_counts = [0] * LOAD_HISTORY
+        self._load_seconds = [0] * LOAD_HISTORY
+
+        REGISTRY.callback_gauge(
+            'uptime_scheduler_queued', 'Verificaciones despachadas esperando un worker libre',
+            self._queue.qsize
+        )
+        REGISTRY.callback_gauge(
+            'uptime_scheduler_waiting_for_host', 'Verificaciones retenidas por el límite por host',
+            lambda: len(self._waiting_urls)
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return url in self._entries
+
+    def schedule(self, url, interval, delay=None):
+        """Programa (o reprograma) una URL.
+
+        Sin `delay` la primera ejecución cae en la siguiente ranura de su fase;
+        con `delay` se ejecuta dentro de esos segundos.
+        """
+        if delay is None:
+            delay = self.phase_delay(url, interval)
+        with self._cond:
+            self._remove_entry(url)
+            self._intervals[url] = interval
+            self._push(url, time.monotonic() + max(0, delay))
+
+    def schedule_many(self, items):
+        """Programa de una vez muchas URLs: `items` son tuplas (url, intervalo, delay)"""
+        with self._cond:
+            for url, interval, delay in items:
+                if delay is None:
+                    delay = self.phase_delay(url, interval)
+                self._remove_entry(url)
+                self._intervals[url] = interval
+                self._push(url, time.monotonic() + max(0, delay))
+
+    @staticmethod
+    def phase_delay(url, interval):
+        """Segundos hasta la próxima ranura de la URL alineada a su fase en el reloj de pared"""
+        now = time.time()
+        phase = phase_offset(url, interval)
+        next_slot = math.ceil((now - phase) / interval) * interval + phase
+        return next_slot - now
+
+    def reschedule(self, url, interval):
+        """Cambia el intervalo de una URL conservando la fase de la última verificación"""
+        with self._cond:
+            entry = self._entries.get(url)
+            if entry is None:
+                self._intervals[url] = interval
+                self._push(url, time.monotonic())
+                return
+            old_interval = self._intervals.get(url, interval)
+            last_run = self._nominal[url] - old_interval
+            self._remove_entry(url)
+            self._intervals[url] = interval
+            self._push(url, max(time.monotonic(), last_run + interval))
+
+    def defer(self, url, delay):
+        """Mueve la próxima verificación a dentro de `delay` segundos sin cambiar el intervalo.
+
+        La cadencia continúa a partir de ese instante. No hace nada si la URL
+        ya no está programada.
+        """
+        with self._cond:
+            if url not in self._entries:
+                return
+            self._remove_entry(url)
+            self._push(url, time.monotonic() + max(0, delay))
+
+    def realign(self, url):
+        """Devuelve la próxima verificación de una URL a la ranura de su fase.
+
+        Tras reintentos de confirmación o backoff (defer) la cadencia queda
+        desplazada; sin realinear, las URLs de un host que cayó a la vez
+        seguirían sincronizadas. No hace nada si la URL ya no está programada.
+        """
+        with self._cond:
+            if url not in self._entries:
+                return
+            self._remove_entry(url)
+            self._push(url, time.monotonic() + self.phase_delay(url, self._intervals[url]))
+
+    def unschedule(self, url):
+        """Elimina una URL de la planificación"""
+        with self._cond:
+            self._remove_entry(url)
+            self._intervals.pop(url, None)
+            self._nominal.pop(url, None)
+            self._hosts.pop(url, None)
+
+    def next_due(self, url):
+        """Segundos que faltan para la próxima verificación de una URL (None si no está programada)"""
+        with self._cond:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            return max(0.0, entry[0] - time.monotonic())
+
+    def get_stats(self):
+        """Métricas del planificador: URLs, cola de trabajo y retraso de despacho"""
+        return {
+            'urls': len(self._entries),
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'waiting_for_host': len(self._waiting_urls),
+            'waiting_hosts': len(self._waiting),
+            'in_flight': len(self._in_flight),
+            'max_in_flight': self.max_in_flight,
+            'dispatched': self.dispatched,
+            'skipped': self.skipped,
+            'avg_lag_ms': round(self.lag_sum / self.dispatched * 1000, 2) if self.dispatched else 0.0,
+            'max_lag_ms': round(self.max_lag * 1000, 2),
+            'avg_queue_wait_ms': round(self.queue_wait_sum / self.started * 1000, 2) if self.started else 0.0,
+            'max_queue_wait_ms': round(self.max_queue_wait * 1000, 2),
+            'jitter': self.jitter,
+            'limiter': self.limiter.get_stats()
+        }
+
+    def load_profile(self, horizon=60):
+        """Perfil de carga: verificaciones por segundo previstas y realmente despachadas.
+
+        `planned` cuenta las ejecuciones programadas en cada uno de los próximos
+        `horizon` segundos; `recent` las despachadas en los últimos segundos.
+        `histogram` agrupa los segundos previstos por número de verificaciones.
+        """
+        horizon = max(1, int(horizon))
+        planned = [0] * horizon
+        now = time.monotonic()
+        with self._cond:
+            for url, entry in self._entries.items():
+                interval = self._intervals[url]
+                offset = max(0.0, entry[0] - now)
+                while offset < horizon:
+                    planned[int(offset)] += 1
+                    offset += interval
+
+            current = int(time.time())
+            recent = []
+            for second in range(current - min(horizon, LOAD_HISTORY) + 1, current + 1):
+                index = second % LOAD_HISTORY
+                recent.append(self._load_counts[index] if self._load_seconds[index] == second else 0)
+
+        histogram = {}
+        for count in planned:
+            histogram[count] = histogram.get(count, 0) + 1
+        return {
+            'horizon': horizon,
+            'planned': planned,
+            'planned_peak': max(planned),
+            'planned_mean': round(sum(planned) / horizon, 2),
+            'histogram': {str(count): seconds for count, seconds in sorted(histogram.items())},
+            'recent': recent,
+            'recent_peak': max(recent) if recent else 0
+        }
+
+    def start(self):
+        """Arranca el hilo despachador y el pool de workers"""
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+
+        self._threads = [threading.Thread(target=self._dispatch_loop, name='scheduler-dispatch', daemon=True)]
+        for i in range(self.workers):
+            self._threads.append(
+                threading.Thread(target=self._worker_loop, name=f'scheduler-worker-{i}', daemon=True)
+            )
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Planificador iniciado con {self.workers} workers y {len(self._entries)} URLs")
+
+    def stop(self, timeout=5):
+        """Detiene el despachador y espera a que los workers terminen su verificación actual"""
+        with self._cond:
+            if not self.running:
+                return
+            self.running = False
+            self._cond.notify_all()
+
+        for _ in range(self.workers):
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self._threads = []
+        logger.info("Planificador detenido")
+
+    def _push(self, url, nominal):
+        self._nominal[url] = nominal
+        due = nominal
+        if self.jitter:
+            due += random.uniform(0, self.jitter * self._intervals[url])
+        entry = [due, next(self._counter), url]
+        self._entries[url] = entry
+        heapq.heappush(self._heap, entry)
+        # Despertar al despachador si la nueva entrada pasa a ser la más próxima
+        if self._heap[0] is entry:
+            self._cond.notify()
+
+    def _remove_entry(self, url):
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            entry[-1] = _REMOVED
+
+    def _dispatch_loop(self):
+        with self._cond:
+            while self.running:
+                # Descartar entradas obsoletas de la cima
+                while self._heap and self._heap[0][-1] is _REMOVED:
+                    heapq.heappop(self._heap)
+
+                now = time.monotonic()
+                # Primero las URLs que ya vencieron y esperan hueco en su host
+                retry_at = self._drain_waiting(now)
+
+                if not self._heap:
+                    self._cond.wait(None if retry_at is None else retry_at - now)
+                    continue
+
+                due, _, url = self._heap[0]
+                if due > now:
+                    self._cond.wait((due if retry_at is None else min(due, retry_at)) - now)
+                    continue
+
+                heapq.heappop(self._heap)
+                interval = self._intervals[url]
+
+                # Mantener la cadencia fija sobre el instante nominal; si vamos
+                # retrasados, saltar los ciclos perdidos
+                next_due = self._nominal[url] + interval
+                if next_due <= now:
+                    next_due = now + interval
+                self._push(url, next_due)
+
+                if url in self._in_flight or url in self._waiting_urls:
+                    logger.debug("Omitiendo %s: la verificación anterior sigue en curso", url, extra={'url': url})
+                    self.skipped += 1
+                    continue
+                # Entra en la cola de su host; el siguiente _drain_waiting la despacha si hay hueco
+                self._waiting.setdefault(self._host(url), deque()).append((url, due))
+                self._waiting_urls.add(url)
+
+    def _host(self, url):
+        host = self._hosts.get(url)
+        if host is None:
+            host = self._hosts[url] = host_key(url)
+        return host
+
+    def _drain_waiting(self, now):
+        """Despacha las URLs en espera que el limitador admite.
+
+        Devuelve el instante monotónico en que habrá un token para algún host
+        bloqueado por tasa (None si solo se espera a que terminen verificaciones).
+        """
+        retry_at = None
+        for host in list(self._waiting):
+            pending = self._waiting[host]
+            while pending:
+                if len(self._in_flight) >= self.max_in_flight:
+                    # Tope global: se reanuda cuando un worker termine
+                    return retry_at
+                url, due = pending[0]
+                if url not in self._entries:
+                    # Desprogramada mientras esperaba
+                    pending.popleft()
+                    self._waiting_urls.discard(url)
+                    continue
+                wait = self.limiter.acquire(host, now)
+                if wait is None:
+                    break
+                if wait > 0:
+                    retry_at = now + wait if retry_at is None else min(retry_at, now + wait)
+                    break
+                pending.popleft()
+                self._waiting_urls.discard(url)
+                self._dispatch(url, due, now)
+            if not pending:
+                del self._waiting[host]
+        return retry_at
+
+    def _dispatch(self, url, due, now):
+        lag = now - due
+        self.dispatched += 1
+        self._count_dispatch()
+        self.lag_sum += lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+        self._in_flight.add(url)
+        self._queue.put((url, due))
+
+    def _count_dispatch(self):
+        second = int(time.time())
+        index = second % LOAD_HISTORY
+        if self._load_seconds[index] != second:
+            self._load_seconds[index] = second
+            self._load_counts[index] = 0
+        self._load_counts[index] += 1
+
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            url, due = item
+            host = self._hosts.get(url) or host_key(url)
+            try:
+                if self.running:
+                    wait = max(0.0, time.monotonic() - due)
+                    self.started += 1
+                    self.queue_wait_sum += wait
+                    if wait > self.max_queue_wait:
+                        self.max_queue_wait = wait
+                    _worker.queue_wait = wait
+                    SCHEDULE_LAG.observe(wait)
+                    self.run_check(url)
+            except Exception as e:
+                logger.error(f"Error en worker de monitoreo para {url}: {str(e)}")
+            finally:
+                _worker.queue_wait = None
+                with self._cond:
+                    self._in_flight.discard(url)
+                    self.limiter.release(host)
+                    if self._waiting:
+                        # Hay URLs esperando hueco: despertar al despachador
+                        self._cond.notify()
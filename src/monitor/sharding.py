@@ -0,0 +1,290 @@
+import bisect
+import hashlib
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Listener
+
+logger = logging.getLogger(__name__)
+
+# Variable de entorno con la clave compartida entre coordinador y workers
+AUTHKEY_ENV = 'MONITOR_SHARD_AUTHKEY'
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'worker.py')
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Anillo de hashing consistente con nodos virtuales.
+
+    Al entrar o salir un worker solo cambian de dueño las URLs de los tramos
+    del anillo que le corresponden, el resto conserva su asignación.
+    """
+
+    def __init__(self, nodes=(), replicas=64):
+        self.replicas = replicas
+        self._keys = []
+        self._owners = []
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(set(self._owners))
+
+    def add(self, node):
+        for i in range(self.replicas):
+            key = _hash(f'{node}#{i}')
+            index = bisect.bisect(self._keys, key)
+            self._keys.insert(index, key)
+            self._owners.insert(index, node)
+
+    def remove(self, node):
+        pairs = [(k, o) for k, o in zip(self._keys, self._owners) if o != node]
+        self._keys = [k for k, _ in pairs]
+        self._owners = [o for _, o in pairs]
+
+    def owner(self, url):
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(url)) % len(self._keys)
+        return self._owners[index]
+
+
+class WorkerHandle:
+    """Conexión del coordinador con un worker remoto"""
+
+    __slots__ = ('worker_id', 'conn', 'last_seen', 'urls', 'send_lock')
+
+    def __init__(self, worker_id, conn):
+        self.worker_id = worker_id
+        self.conn = conn
+        self.last_seen = time.monotonic()
+        self.urls = set()
+        self.send_lock = threading.Lock()
+
+    def send(self, message):
+        with self.send_lock:
+            self.conn.send(message)
+
+
+class ShardCoordinator:
+    """Reparte las URLs entre procesos worker mediante hashing consistente.
+
+    Expone la misma interfaz que ProbeScheduler (schedule, reschedule,
+    unschedule, start, stop), así que UptimeChecker lo usa como planificador
+    sin cambios. Los workers sondean su shard y devuelven los resultados por
+    un socket local; cuando un worker entra o deja de responder se recalcula el
+    anillo y se reasignan sus URLs.
+    """
+
+    def __init__(self, on_result, options_provider, address=('127.0.0.1', 6000),
+                 spawn_workers=0, heartbeat_timeout=15, authkey=None):
+        self.on_result = on_result
+        self.options_provider = options_provider
+        self.address = address
+        self.spawn_workers = spawn_workers
+        self.heartbeat_timeout = heartbeat_timeout
+        self.authkey = authkey or os.environ.get(AUTHKEY_ENV) or secrets.token_hex(16)
+        self.running = False
+        self._intervals = {}  # url -> intervalo
+        self._workers = {}  # worker_id -> WorkerHandle
+        self._ring = HashRing()
+        self._lock = threading.RLock()
+        self._listener = None
+        self._processes = []
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __contains__(self, url):
+        return url in self._intervals
+
+    def next_due(self, url):
+        # La fase de cada URL la decide el worker que la tiene asignada
+        return None
+
+    def schedule(self, url, interval, delay=None):
+        with self._lock:
+            self._intervals[url] = interval
+            self._send_to_owner(url, ('schedule', url, self._url_options(url)))
+
+    def schedule_many(self, items):
+        with self._lock:
+            for url, interval, delay in items:
+                self._intervals[url] = interval
+                self._send_to_owner(url, ('schedule', url, self._url_options(url)))
+
+    def reschedule(self, url, interval):
+        self.schedule(url, interval)
+
+    def unschedule(self, url):
+        with self._lock:
+            self._intervals.pop(url, None)
+            for handle in self._workers.values():
+                if url in handle.urls:
+                    handle.urls.discard(url)
+                    self._safe_send(handle, ('unschedule', url))
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._listener = Listener(self.address, authkey=self.authkey.encode())
+        # Si se pidió el puerto 0 el sistema asigna uno libre
+        self.address = self._listener.address
+        threading.Thread(target=self._accept_loop, name='shard-accept', daemon=True).start()
+        threading.Thread(target=self._watchdog_loop, name='shard-watchdog', daemon=True).start()
+        logger.info(f"Coordinador de shards escuchando en {self.address[0]}:{self.address[1]}")
+
+        for i in range(self.spawn_workers):
+            self._spawn_worker(f'local-{i}')
+
+    def stop(self, timeout=5):
+        if not self.running:
+            return
+        self.running = False
+        with self._lock:
+            for handle in list(self._workers.values()):
+                self._safe_send(handle, ('stop',))
+                handle.conn.close()
+            self._workers = {}
+            self._ring = HashRing()
+        try:
+            self._listener.close()
+        except OSError:
+            pass
+
+        for process in self._processes:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._processes = []
+        logger.info("Coordinador de shards detenido")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'address': f'{self.address[0]}:{self.address[1]}',
+                'urls': len(self._intervals),
+                'workers': {worker_id: len(handle.urls) for worker_id, handle in self._workers.items()}
+            }
+
+    def _url_options(self, url):
+        options = dict(self.options_provider(url))
+        options['interval'] = self._intervals[url]
+        return options
+
+    def _send_to_owner(self, url, message):
+        owner = self._ring.owner(url)
+        if owner is None:
+            # Se asignará en el próximo reequilibrado, cuando se conecte un worker
+            logger.debug("No hay workers conectados; %s queda pendiente de asignación", url, extra={'url': url})
+            return
+        handle = self._workers[owner]
+        handle.urls.add(url)
+        self._safe_send(handle, message)
+
+    def _safe_send(self, handle, message):
+        try:
+            handle.send(message)
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning(f"No se pudo enviar a worker {handle.worker_id}: {str(e)}")
+
+    def _spawn_worker(self, worker_id):
+        env = dict(os.environ)
+        env[AUTHKEY_ENV] = self.authkey
+        process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT,
+             '--coordinator', f'{self.address[0]}:{self.address[1]}',
+             '--worker-id', worker_id],
+            env=env
+        )
+        self._processes.append(process)
+        logger.info(f"Worker local {worker_id} lanzado (pid {process.pid})")
+
+    def _rebalance(self):
+        """Recalcula el dueño de cada URL y envía a cada worker su shard completo"""
+        shards = {worker_id: {} for worker_id in self._workers}
+        for url in self._intervals:
+            owner = self._ring.owner(url)
+            if owner is not None:
+                shards[owner][url] = self._url_options(url)
+        for worker_id, shard in shards.items():
+            handle = self._workers[worker_id]
+            handle.urls = set(shard)
+            self._safe_send(handle, ('assign', shard))
+        logger.info(f"Shards reequilibrados: { {w: len(s) for w, s in shards.items()} }")
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self.running:
+                    logger.warning(f"Error al aceptar conexión de worker: {str(e)}")
+                continue
+            threading.Thread(target=self._worker_loop, args=(conn,), daemon=True).start()
+
+    def _worker_loop(self, conn):
+        handle = None
+        try:
+            message = conn.recv()
+            if message[0] != 'hello':
+                conn.close()
+                return
+            worker_id = message[1]
+            with self._lock:
+                previous = self._workers.pop(worker_id, None)
+                if previous is not None:
+                    self._ring.remove(worker_id)
+                    previous.conn.close()
+                handle = WorkerHandle(worker_id, conn)
+                self._workers[worker_id] = handle
+                self._ring.add(worker_id)
+                logger.info(f"Worker {worker_id} conectado")
+                self._rebalance()
+
+            while self.running:
+                message = conn.recv()
+                handle.last_seen = time.monotonic()
+                if message[0] == 'result':
+                    _, url, status_code, response_time, is_up, checked_at, timings = message
+                    if url in self._intervals:
+                        self.on_result(url, status_code, response_time, is_up, checked_at, timings)
+        except (EOFError, OSError):
+            pass
+        except Exception as e:
+            logger.error(f"Error en la conexión con el worker: {str(e)}")
+        finally:
+            if handle is not None:
+                self._drop_worker(handle)
+
+    def _drop_worker(self, handle):
+        with self._lock:
+            if self._workers.get(handle.worker_id) is not handle:
+                return
+            del self._workers[handle.worker_id]
+            self._ring.remove(handle.worker_id)
+            try:
+                handle.conn.close()
+            except OSError:
+                pass
+            if self.running:
+                logger.warning(f"Worker {handle.worker_id} desconectado; reasignando {len(handle.urls)} URLs")
+                self._rebalance()
+
+    def _watchdog_loop(self):
+        while self.running:
+            time.sleep(self.heartbeat_timeout / 3)
+            now = time.monotonic()
+            for handle in list(self._workers.values()):
+                if now - handle.last_seen > self.heartbeat_timeout:
+                    logger.warning(f"Worker {handle.worker_id} sin latido desde hace {now - handle.last_seen:.0f}s")
+                    self._drop_worker(handle)
@@ -0,0 +1,283 @@
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from monitor.cache import SLOT_BYTES
+from storage.backend import PROJECT_ROOT
+from storage.database import PHASE_COLUMNS, backend, get_results_since
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'UPTSNAP\x00'
+SNAPSHOT_VERSION = 2
+
+# Cabecera: magic, versión, orden de bytes (1 = little endian), inicio de la escritura (epoch),
+# nº de URLs, capacidad de los buffers de resultados y nº de fases por resultado
+_HEADER = struct.Struct('<8sHBdIIH')
+# Registro por URL: longitud de la URL, última verificación (epoch, 0 si no hay),
+# tamaño y cabeza del buffer y longitud de las estadísticas codificadas
+_RECORD = struct.Struct('<HdIII')
+# checked_at de una posición del buffer (arrays en el orden de bytes nativo, comprobado en la cabecera)
+_CHECKED_AT = struct.Struct('=d')
+
+# Al arrancar se revisan en la base de datos los resultados desde este margen antes de
+# la instantánea: una sonda puede registrarse segundos después de su checked_at
+REPLAY_MARGIN = 60
+
+# URLs entre cesiones del hilo al escribir (con eventlet un bucle largo bloquearía el servidor)
+_YIELD_EVERY = 500
+
+
+def default_snapshot_path():
+    """Junto a la base de datos SQLite, o en data/ con otros backends"""
+    if backend.profile == 'sqlite-wal':
+        return f'{backend.url.database}.state'
+    return os.path.join(PROJECT_ROOT, 'data', 'runtime.state')
+
+
+class MappedSnapshot:
+    """Fichero de instantánea mapeado en memoria mientras queden URLs por materializar.
+
+    Cada URL restaurada retiene una referencia que se libera al copiar sus
+    datos o al descartarla; con la última se cierra el mapeo.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._refs = 0
+        self._lock = threading.Lock()
+
+    def read(self, offset, length):
+        return memoryview(self.mm)[offset:offset + length]
+
+    def retain(self, count):
+        with self._lock:
+            self._refs += count
+        if not count:
+            self.release(0)
+
+    def release(self, count=1):
+        with self._lock:
+            self._refs -= count
+            if self._refs > 0 or self.mm.closed:
+                return
+            self.mm.close()
+            self._file.close()
+
+
+class StateSnapshot:
+    """Instantánea binaria del estado en memoria del checker.
+
+    Guarda por URL la última verificación, su buffer de resultados recientes
+    (los arrays tal cual, sin convertir resultado a resultado) y las ventanas
+    de estadísticas. Se escribe cada `interval` segundos y al detener el
+    monitoreo, en un fichero temporal que sustituye al anterior de forma
+    atómica. Al arrancar solo se recorre el índice del fichero mapeado con
+    mmap: los buffers y las ventanas de cada URL se copian de las páginas
+    mapeadas la primera vez que se usan, así que decenas de miles de URLs
+    están servidas y planificadas en una fracción de segundo. Los resultados
+    guardados en la base de datos después de la instantánea (p. ej. tras una
+    caída) se incorporan a continuación.
+    """
+
+    def __init__(self, checker, path=None, interval=60):
+        self.checker = checker
+        self.path = path or default_snapshot_path()
+        self.interval = interval
+        self.last_saved = None
+        self.last_save_stats = None
+        self.last_load_stats = None
+        self._save_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def save(self):
+        """Escribe la instantánea de todas las URLs monitorizadas; devuelve su resumen"""
+        started = time.monotonic()
+        # Todo resultado registrado antes de este instante queda en la instantánea
+        created = time.time()
+        checker = self.checker
+        cache = checker.recent_results
+        tmp_path = f'{self.path}.tmp'
+        with self._save_lock:
+            urls = list(checker.urls)
+            count = 0
+            with open(tmp_path, 'wb') as f:
+                # La cabecera se reescribe al final con el número real de registros
+                f.write(bytes(_HEADER.size))
+                for i, url in enumerate(urls):
+                    if i and i % _YIELD_EVERY == 0:
+                        time.sleep(0)
+                    ring = cache.export(url)
+                    stats = checker.stats.export(url) or b''
+                    last_check = checker.last_check_times.get(url)
+                    if ring is None and not stats and last_check is None:
+                        continue
+                    size, head, ring_bytes = ring or (0, 0, b'')
+                    encoded = url.encode('utf-8')
+                    f.write(_RECORD.pack(len(encoded), last_check or 0.0, size, head, len(stats)))
+                    f.write(encoded)
+                    f.write(ring_bytes)
+                    f.write(stats)
+                    count += 1
+                f.seek(0)
+                f.write(_HEADER.pack(
+                    SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder == 'little', created,
+                    count, cache.capacity, len(PHASE_COLUMNS)
+                ))
+                f.flush()
+                os.fsync(f.fileno())
+                size_bytes = os.fstat(f.fileno()).st_size
+            # El mapeo de una instantánea anterior sigue siendo válido: conserva el fichero sustituido
+            os.replace(tmp_path, self.path)
+        self.last_saved = datetime.utcnow()
+        self.last_save_stats = {
+            'urls': count,
+            'bytes': size_bytes,
+            'duration_ms': round((time.monotonic() - started) * 1000, 1)
+        }
+        return self.last_save_stats
+
+    def load(self):
+        """Restaura el estado de las URLs cargadas en el checker que aparezcan en la instantánea.
+
+        Devuelve el conjunto de URLs restauradas, ya al día con la base de datos;
+        las demás deben cargarse de ella. Una instantánea ausente o incompatible
+        se ignora.
+        """
+        started = time.monotonic()
+        checker = self.checker
+        cache = checker.recent_results
+        try:
+            if os.path.getsize(self.path) < _HEADER.size:
+                logger.warning(f"Instantánea de estado vacía o truncada: {self.path}")
+                return set()
+        except FileNotFoundError:
+            return set()
+        source = MappedSnapshot(self.path)
+        mm = source.mm
+        restored = {}  # url -> checked_at (epoch) del resultado más reciente en su buffer
+        rings = {}
+        stats = {}
+        try:
+            magic, version, little_endian, created, count, capacity, phases = _HEADER.unpack_from(mm, 0)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION \
+                    or bool(little_endian) != (sys.byteorder == 'little') or phases != len(PHASE_COLUMNS):
+                logger.warning(f"Instantánea de estado incompatible, se ignora: {self.path}")
+                count = 0
+            # Con otra capacidad los buffers no encajan: esas URLs se recargan desde la base de datos
+            ring_bytes = capacity * SLOT_BYTES
+            rings_usable = capacity == cache.capacity
+            urls = checker.urls
+            last_check_times = checker.last_check_times
+            offset = _HEADER.size
+            for _ in range(count):
+                url_len, last_check, size, head, stats_len = _RECORD.unpack_from(mm, offset)
+                offset += _RECORD.size
+                url = mm[offset:offset + url_len].decode('utf-8')
+                offset += url_len
+                ring_at = offset
+                if size:
+                    offset += ring_bytes
+                stats_at = offset
+                offset += stats_len
+                if offset > len(mm):
+                    raise ValueError('registro incompleto')
+                if url not in urls or (size and not rings_usable):
+                    continue
+                newest = None
+                if size:
+                    rings[url] = (size, head, ring_at)
+                    newest = _CHECKED_AT.unpack_from(mm, ring_at + _CHECKED_AT.size * ((head - 1) % capacity))[0]
+                if stats_len:
+                    stats[url] = (stats_at, stats_len)
+                if last_check:
+                    last_check_times[url] = last_check
+                restored[url] = newest
+        except (struct.error, ValueError):
+            logger.warning(f"Instantánea de estado truncada: {self.path}")
+        source.retain(len(rings) + len(stats))
+        cache.restore(rings, source)
+        checker.stats.restore(stats, source)
+        try:
+            replayed = self._replay(restored, created - REPLAY_MARGIN) if restored else 0
+        except Exception as e:
+            # Sin poder ponerlas al día, esas URLs se recargan enteras de la base de datos
+            logger.warning(f"No se pudieron incorporar los resultados posteriores a la instantánea: {str(e)}")
+            for url in restored:
+                cache.remove(url)
+                checker.stats.remove(url)
+            return set()
+        self.last_load_stats = {
+            'urls': len(restored),
+            'replayed_results': replayed,
+            'age_seconds': round(time.time() - created, 1) if restored else None,
+            'duration_ms': round((time.monotonic() - started) * 1000, 1)
+        }
+        if restored:
+            logger.info(
+                f"Estado restaurado de {len(restored)} URLs desde la instantánea "
+                f"({self.last_load_stats['age_seconds']}s de antigüedad, {replayed} resultados posteriores, "
+                f"{self.last_load_stats['duration_ms']} ms)"
+            )
+        return set(restored)
+
+    def _replay(self, newest, since):
+        """Añade a los buffers y ventanas de las URLs restauradas los resultados de la base de
+        datos más recientes que los de su buffer; devuelve cuántos se han incorporado"""
+        checker = self.checker
+        count = 0
+        since_dt = datetime.fromtimestamp(since, timezone.utc).replace(tzinfo=None)
+        for row in get_results_since(since_dt):
+            url = row.url
+            if url not in newest:
+                continue
+            ts = row.checked_at.replace(tzinfo=timezone.utc).timestamp()
+            cutoff = newest[url]
+            if cutoff is not None and ts <= cutoff:
+                continue
+            timings = {phase: getattr(row, column) for phase, column in PHASE_COLUMNS.items()}
+            checker.recent_results.record(url, row.status_code, row.response_time, row.is_up, row.checked_at, timings)
+            checker.stats.record(url, row.status_code, row.response_time, row.is_up, row.checked_at)
+            if ts > checker.last_check_times.get(url, 0):
+                checker.last_check_times[url] = ts
+            count += 1
+        return count
+
+    def start(self):
+        if self._thread is not None or not self.interval:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='state-snapshot', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self):
+        return {
+            'path': self.path,
+            'interval': self.interval,
+            'last_saved': self.last_saved.isoformat() if self.last_saved else None,
+            'last_save': self.last_save_stats,
+            'last_load': self.last_load_stats
+        }
+
+    def _run_loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"Error al escribir la instantánea de estado: {str(e)}")
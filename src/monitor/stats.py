@@ -0,0 +1,293 @@
+import math
+import struct
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import timezone
+
+# Ventanas deslizantes de SLA: nombre -> duración en segundos
+WINDOWS = {
+    '1h': 3600,
+    '24h': 24 * 3600,
+    '7d': 7 * 24 * 3600,
+    '30d': 30 * 24 * 3600
+}
+BUCKETS_PER_WINDOW = 60
+
+# Histograma logarítmico (estilo HDR): cada bin es un 10% más ancho que el anterior,
+# por lo que los percentiles tienen un error relativo acotado al 10%
+HISTOGRAM_GROWTH = 1.1
+HISTOGRAM_BINS = 128  # Cubre hasta ~1.1^127 ms (unos 3 minutos)
+_LOG_GROWTH = math.log(HISTOGRAM_GROWTH)
+BIN_UPPER_BOUNDS = [HISTOGRAM_GROWTH ** i for i in range(HISTOGRAM_BINS)]
+
+PERCENTILES = (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))
+
+# Formato binario de un bucket (id, checks, checks_ok, n_latencias, suma_latencias, n_bins)
+# seguido de n_bins pares (bin, n)
+_BUCKET = struct.Struct('<qIIIdH')
+_BIN = struct.Struct('<HI')
+# Cabecera de una ventana: número de buckets y desde cuándo tiene datos (epoch, 0 si no tiene)
+_WINDOW = struct.Struct('<Hd')
+
+
+def latency_bin(ms):
+    """Índice del bin del histograma para una latencia en milisegundos"""
+    if ms <= 1:
+        return 0
+    return min(HISTOGRAM_BINS - 1, int(math.ceil(math.log(ms) / _LOG_GROWTH)))
+
+
+def _epoch(dt):
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RollingWindow:
+    """Ventana deslizante dividida en buckets de tiempo.
+
+    Mantiene totales acumulados de toda la ventana (checks, checks OK, suma de
+    latencias e histograma), de modo que registrar un resultado es O(1) y al
+    caducar un bucket solo se restan sus propios contadores. `since` es el
+    resultado más antiguo incorporado: tras un reinicio las ventanas se siembran
+    con un historial corto y `coverage` indica qué parte de la ventana cubren.
+    """
+
+    __slots__ = ('span', 'bucket_span', 'buckets', 'count', 'up_count', 'latency_count', 'latency_sum', 'histogram',
+                 'since')
+
+    def __init__(self, span, buckets=BUCKETS_PER_WINDOW):
+        self.span = span
+        self.bucket_span = span / buckets
+        # Cada bucket: [id, checks, checks_ok, n_latencias, suma_latencias, {bin: n}]
+        self.buckets = deque()
+        self.count = 0
+        self.up_count = 0
+        self.latency_count = 0
+        self.latency_sum = 0
+        self.histogram = array('I', bytes(4 * HISTOGRAM_BINS))
+        self.since = None
+
+    def add(self, ts, is_up, latency=None):
+        if self.since is None or ts < self.since:
+            self.since = ts
+        bucket_id = int(ts // self.bucket_span)
+        self.expire(bucket_id)
+        if not self.buckets or self.buckets[-1][0] < bucket_id:
+            self.buckets.append([bucket_id, 0, 0, 0, 0, {}])
+        bucket = self.buckets[-1]
+
+        bucket[1] += 1
+        self.count += 1
+        if is_up:
+            bucket[2] += 1
+            self.up_count += 1
+        if latency is not None:
+            b = latency_bin(latency)
+            bucket[3] += 1
+            bucket[4] += latency
+            bucket[5][b] = bucket[5].get(b, 0) + 1
+            self.latency_count += 1
+            self.latency_sum += latency
+            self.histogram[b] += 1
+
+    def expire(self, current_bucket_id):
+        """Descarta los buckets que han salido de la ventana"""
+        oldest_allowed = current_bucket_id - int(round(self.span / self.bucket_span)) + 1
+        while self.buckets and self.buckets[0][0] < oldest_allowed:
+            _, count, up_count, latency_count, latency_sum, bins = self.buckets.popleft()
+            self.count -= count
+            self.up_count -= up_count
+            self.latency_count -= latency_count
+            self.latency_sum -= latency_sum
+            for b, n in bins.items():
+                self.histogram[b] -= n
+
+    def refresh(self, ts):
+        """Caduca los buckets antiguos aunque no hayan llegado resultados nuevos"""
+        self.expire(int(ts // self.bucket_span))
+
+    def dump(self, out):
+        """Añade la ventana codificada a la lista de bytes `out`"""
+        out.append(_WINDOW.pack(len(self.buckets), self.since or 0.0))
+        for bucket_id, count, up_count, latency_count, latency_sum, bins in self.buckets:
+            out.append(_BUCKET.pack(bucket_id, count, up_count, latency_count, latency_sum, len(bins)))
+            out.extend(_BIN.pack(b, n) for b, n in bins.items())
+
+    def load(self, data, offset):
+        """Restaura los buckets codificados con dump() y recalcula los totales; devuelve el nuevo offset"""
+        n_buckets, since = _WINDOW.unpack_from(data, offset)
+        offset += _WINDOW.size
+        self.since = since or None
+        for _ in range(n_buckets):
+            bucket_id, count, up_count, latency_count, latency_sum, n_bins = _BUCKET.unpack_from(data, offset)
+            offset += _BUCKET.size
+            bins = {}
+            for _ in range(n_bins):
+                b, n = _BIN.unpack_from(data, offset)
+                offset += _BIN.size
+                bins[b] = n
+                self.histogram[b] += n
+            self.buckets.append([bucket_id, count, up_count, latency_count, latency_sum, bins])
+            self.count += count
+            self.up_count += up_count
+            self.latency_count += latency_count
+            self.latency_sum += latency_sum
+        return offset
+
+    def percentile(self, p):
+        if not self.latency_count:
+            return None
+        target = max(1, int(math.ceil(p * self.latency_count)))
+        seen = 0
+        for b, n in enumerate(self.histogram):
+            seen += n
+            if seen >= target:
+                return round(BIN_UPPER_BOUNDS[b])
+        return round(BIN_UPPER_BOUNDS[-1])
+
+    def uptime_percentage(self):
+        if not self.count:
+            return None
+        return round(self.up_count / self.count * 100, 3)
+
+    def coverage(self, now):
+        """Fracción de la ventana con datos (0 sin resultados, 1 si los hay desde hace toda la ventana)"""
+        if self.since is None:
+            return 0.0
+        return round(min(1.0, max(0.0, (now - self.since) / self.span)), 3)
+
+    def snapshot(self, now=None):
+        data = {
+            'coverage': self.coverage(time.time() if now is None else now),
+            'checks': self.count,
+            'up_checks': self.up_count,
+            'uptime_percentage': self.uptime_percentage(),
+            'avg_response_time': round(self.latency_sum / self.latency_count, 1) if self.latency_count else None
+        }
+        for name, p in PERCENTILES:
+            data[f'{name}_response_time'] = self.percentile(p)
+        return data
+
+
+class UrlStats:
+    __slots__ = ('windows',)
+
+    def __init__(self):
+        self.windows = {name: RollingWindow(span) for name, span in WINDOWS.items()}
+
+    def to_bytes(self):
+        out = []
+        for window in self.windows.values():
+            window.dump(out)
+        return b''.join(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        stats = cls()
+        offset = 0
+        for window in stats.windows.values():
+            offset = window.load(data, offset)
+        return stats
+
+
+class StatsEngine:
+    """Estadísticas incrementales de disponibilidad y latencia por URL"""
+
+    def __init__(self):
+        self._stats = {}
+        self._pending = {}  # url -> (offset, longitud, origen) de ventanas restauradas sin decodificar
+        self._lock = threading.Lock()
+
+    def __contains__(self, url):
+        return url in self._stats or url in self._pending
+
+    def _get(self, url):
+        """UrlStats de una URL (con el lock tomado); las restauradas se decodifican en su primer uso"""
+        stats = self._stats.get(url)
+        if stats is None and url in self._pending:
+            offset, length, source = self._pending.pop(url)
+            stats = self._stats[url] = UrlStats.from_bytes(source.read(offset, length))
+            source.release()
+        return stats
+
+    def _discard_pending(self, url):
+        entry = self._pending.pop(url, None)
+        if entry is not None:
+            entry[2].release()
+
+    def record(self, url, status_code, response_time, is_up, checked_at):
+        """Incorpora un resultado a todas las ventanas de la URL en O(1)"""
+        ts = _epoch(checked_at)
+        # Los fallos sin respuesta (status 0) no aportan una latencia real
+        latency = response_time if status_code else None
+        with self._lock:
+            stats = self._get(url)
+            if stats is None:
+                stats = self._stats[url] = UrlStats()
+            for window in stats.windows.values():
+                window.add(ts, is_up, latency)
+
+    def remove(self, url):
+        with self._lock:
+            self._stats.pop(url, None)
+            self._discard_pending(url)
+
+    def export(self, url):
+        """Ventanas de una URL codificadas en binario (None si no tiene estadísticas)"""
+        with self._lock:
+            entry = self._pending.get(url)
+            if entry is not None:
+                offset, length, source = entry
+                return bytes(source.read(offset, length))
+            stats = self._stats.get(url)
+            return stats.to_bytes() if stats is not None else None
+
+    def restore(self, entries, source):
+        """Registra ventanas exportadas {url: (offset, longitud)} dentro de `source`
+        (como RecentResultsCache.restore); cada URL se decodifica en su primer uso"""
+        with self._lock:
+            for url, (offset, length) in entries.items():
+                self._stats.pop(url, None)
+                self._discard_pending(url)
+                self._pending[url] = (offset, length, source)
+
+    def uptime(self, url, window='24h'):
+        """Porcentaje de disponibilidad de una URL en una ventana (None sin datos)"""
+        with self._lock:
+            stats = self._get(url)
+            if stats is None:
+                return None
+            stats.windows[window].refresh(time.time())
+            return stats.windows[window].uptime_percentage()
+
+    def latency_percentile(self, url, p, window='24h', min_samples=1):
+        """Percentil de latencia (ms) de una URL; None si no hay `min_samples` latencias en la ventana"""
+        with self._lock:
+            stats = self._get(url)
+            if stats is None:
+                return None
+            rolling = stats.windows[window]
+            rolling.refresh(time.time())
+            if rolling.latency_count < min_samples:
+                return None
+            return rolling.percentile(p)
+
+    def snapshot(self, url, windows=None):
+        """Estadísticas de una URL para las ventanas indicadas (todas por defecto)"""
+        names = windows or list(WINDOWS)
+        now = time.time()
+        with self._lock:
+            stats = self._get(url)
+            if stats is None:
+                return {name: RollingWindow(WINDOWS[name]).snapshot() for name in names}
+            snapshot = {}
+            for name in names:
+                window = stats.windows[name]
+                window.refresh(now)
+                snapshot[name] = window.snapshot(now)
+            return snapshot
+
+    def urls(self):
+        with self._lock:
+            return list(self._stats) + list(self._pending)
@@ -0,0 +1,29 @@
+import threading
+
+
+class DataVersions:
+    """Contadores de versión de los datos del monitor, global y por URL.
+
+    Cada resultado nuevo (y cada alta, baja o cambio de una URL) incrementa
+    el contador de su URL y el global; las cachés de respuestas comparan
+    estos contadores para saber si lo que guardaron sigue siendo válido. Los
+    contadores de las URLs dadas de baja se conservan para que una URL que
+    vuelve no repita una versión ya vista.
+    """
+
+    def __init__(self):
+        self._global = 0
+        self._by_url = {}
+        self._lock = threading.Lock()
+
+    def bump(self, url=None):
+        with self._lock:
+            self._global += 1
+            if url is not None:
+                self._by_url[url] = self._by_url.get(url, 0) + 1
+
+    def get(self, url=None):
+        """Versión de una URL o, sin URL, la global"""
+        if url is None:
+            return self._global
+        return self._by_url.get(url, 0)
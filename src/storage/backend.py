@@ -0,0 +1,199 @@
+import importlib.util
+import logging
+import os
+import threading
+from collections import deque
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, StaticPool
+
+logger = logging.getLogger(__name__)
+
+# Raíz del proyecto (donde están config.py y data/)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+DEFAULT_URI = f"sqlite:///{os.path.join(PROJECT_ROOT, 'data', 'monitoring.db')}"
+
+# Valores por defecto de las opciones de config.py relativas al almacenamiento
+DEFAULTS = {
+    'DATABASE_URI': None,
+    'DATABASE_POOL_SIZE': 10,  # Conexiones permanentes (lectores en SQLite)
+    'DATABASE_MAX_OVERFLOW': 20,  # Conexiones extra en picos
+    'DATABASE_POOL_TIMEOUT': 30,  # Segundos esperando una conexión libre del pool
+    'SQLITE_BUSY_TIMEOUT': 5000,  # ms que SQLite reintenta antes de "database is locked"
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,  # Bytes del fichero mapeados en memoria para lecturas
+    'SQLITE_CACHE_SIZE': -64000  # Páginas de caché (negativo = KiB)
+}
+
+
+def load_settings():
+    """Opciones de almacenamiento de config.py con sus valores por defecto"""
+    settings = dict(DEFAULTS)
+    path = os.path.join(PROJECT_ROOT, 'config.py')
+    if os.path.exists(path):
+        spec = importlib.util.spec_from_file_location('monitor_config', path)
+        config = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(config)
+        for key in DEFAULTS:
+            if hasattr(config, key):
+                settings[key] = getattr(config, key)
+    return settings
+
+
+def resolve_uri(settings):
+    """URI efectiva: MONITOR_DATABASE_URI, luego config.DATABASE_URI, luego data/monitoring.db.
+
+    Las rutas SQLite relativas se interpretan desde la raíz del proyecto y no
+    desde el directorio de trabajo.
+    """
+    uri = os.environ.get('MONITOR_DATABASE_URI') or settings['DATABASE_URI'] or DEFAULT_URI
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' \
+            and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(PROJECT_ROOT, url.database))
+    return url
+
+
+class SingleWriterPool(QueuePool):
+    """Pool de una sola conexión que se entrega por orden de llegada.
+
+    QueuePool no es justo entre hilos: quien devuelve la conexión suele
+    recuperarla antes de que despierte el que esperaba, y con escritores
+    continuos uno de ellos puede quedarse sin turno indefinidamente.
+    """
+
+    def __init__(self, creator, **kw):
+        kw['pool_size'] = 1
+        kw['max_overflow'] = 0
+        super().__init__(creator, **kw)
+        self._turn_lock = threading.Lock()
+        self._turns = deque()  # Events de los hilos en espera, en orden de llegada
+        self._taken = False
+
+    def _do_get(self):
+        with self._turn_lock:
+            if not self._taken and not self._turns:
+                self._taken = True
+                turn = None
+            else:
+                turn = threading.Event()
+                self._turns.append(turn)
+        if turn is not None and not turn.wait(self._timeout):
+            with self._turn_lock:
+                if not turn.is_set():
+                    self._turns.remove(turn)
+                    raise PoolTimeoutError(
+                        f"Sin turno en la conexión de escritura tras {self._timeout}s"
+                    )
+        try:
+            return super()._do_get()
+        except Exception:
+            self._hand_over()
+            raise
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._hand_over()
+
+    def _hand_over(self):
+        """Cede la conexión al siguiente en la cola o la marca como libre"""
+        with self._turn_lock:
+            if self._turns:
+                self._turns.popleft().set()
+            else:
+                self._taken = False
+
+
+class StorageBackend:
+    """Motores de base de datos separados para escritura y lectura.
+
+    Con SQLite (fichero) se aplica un perfil afinado: WAL, synchronous=NORMAL,
+    busy_timeout y mmap. Las escrituras pasan por una única conexión
+    (SingleWriterPool, así que los escritores concurrentes esperan turno en
+    orden en lugar de chocar con "database is locked") y las lecturas por un
+    pool de conexiones de solo lectura que en WAL no bloquean al escritor.
+
+    Con cualquier otra URL de SQLAlchemy (p. ej. PostgreSQL) se usa un único
+    motor con pool dimensionado según la configuración.
+    """
+
+    def __init__(self, uri=None, settings=None):
+        self.settings = settings or load_settings()
+        self.url = make_url(uri) if uri else resolve_uri(self.settings)
+        self.dialect = self.url.get_backend_name()
+
+        if self.dialect != 'sqlite':
+            self.profile = 'pooled'
+            self.write_engine = create_engine(
+                self.url,
+                pool_size=self.settings['DATABASE_POOL_SIZE'],
+                max_overflow=self.settings['DATABASE_MAX_OVERFLOW'],
+                pool_timeout=self.settings['DATABASE_POOL_TIMEOUT'],
+                pool_pre_ping=True
+            )
+            self.read_engine = self.write_engine
+        elif not self.url.database or self.url.database == ':memory:':
+            # Una base de datos en memoria solo existe dentro de su conexión: compartir una
+            self.profile = 'sqlite-memory'
+            self.write_engine = create_engine(
+                self.url, connect_args={'check_same_thread': False}, poolclass=StaticPool
+            )
+            self.read_engine = self.write_engine
+        else:
+            self.profile = 'sqlite-wal'
+            self.write_engine = create_engine(
+                self.url,
+                connect_args={'check_same_thread': False},
+                poolclass=SingleWriterPool,
+                pool_timeout=self.settings['DATABASE_POOL_TIMEOUT']
+            )
+            self.read_engine = create_engine(
+                self.url,
+                connect_args={'check_same_thread': False},
+                poolclass=QueuePool,
+                pool_size=self.settings['DATABASE_POOL_SIZE'],
+                max_overflow=self.settings['DATABASE_MAX_OVERFLOW'],
+                pool_timeout=self.settings['DATABASE_POOL_TIMEOUT']
+            )
+            event.listen(self.write_engine, 'connect', self._tune_writer)
+            event.listen(self.read_engine, 'connect', self._tune_reader)
+
+        logger.info(f"Almacenamiento: {self.url.render_as_string(hide_password=True)} (perfil {self.profile})")
+
+    def _pragmas(self, dbapi_conn, pragmas):
+        cursor = dbapi_conn.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(f'PRAGMA {pragma}')
+        finally:
+            cursor.close()
+
+    def _common_pragmas(self):
+        return [
+            f"busy_timeout={int(self.settings['SQLITE_BUSY_TIMEOUT'])}",
+            f"mmap_size={int(self.settings['SQLITE_MMAP_SIZE'])}",
+            f"cache_size={int(self.settings['SQLITE_CACHE_SIZE'])}",
+            'temp_store=MEMORY'
+        ]
+
+    def _tune_writer(self, dbapi_conn, connection_record):
+        # journal_mode=WAL es persistente en el fichero; synchronous=NORMAL es seguro con WAL
+        self._pragmas(dbapi_conn, ['journal_mode=WAL', 'synchronous=NORMAL'] + self._common_pragmas())
+
+    def _tune_reader(self, dbapi_conn, connection_record):
+        self._pragmas(dbapi_conn, self._common_pragmas() + ['query_only=ON'])
+
+    def dispose(self):
+        self.write_engine.dispose()
+        if self.read_engine is not self.write_engine:
+            self.read_engine.dispose()
+
+    def get_stats(self):
+        stats = {
+            'url': self.url.render_as_string(hide_password=True),
+            'profile': self.profile,
+            'write_pool': self.write_engine.pool.status()
+        }
+        if self.read_engine is not self.write_engine:
+            stats['read_pool'] = self.read_engine.pool.status()
+        return stats
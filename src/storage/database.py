@@ -1,11 +1,30 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean
+from sqlalchemy import inspect, text, select, update, bindparam, func, tuple_, Column, Integer, String, DateTime, Boolean, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.orm import sessionmaker
+import time
 from datetime import datetime
-import os
+from storage.backend import StorageBackend
+from utils.metrics import REGISTRY
 
 Base = declarative_base()
 
+# Fase de la sonda -> columna de monitoring_results con su duración en milisegundos.
+# 'queue' es la espera en el planificador antes de empezar la sonda (no forma parte de response_time)
+PHASE_COLUMNS = {
+    'dns': 'dns_time',
+    'connect': 'connect_time',
+    'tls': 'tls_time',
+    'ttfb': 'ttfb_time',
+    'transfer': 'transfer_time',
+    'queue': 'queue_time'
+}
+
+# Duración de las transacciones de escritura, incluida la espera por la conexión de escritura
+COMMIT_DURATION = REGISTRY.histogram(
+    'uptime_storage_commit_seconds', 'Duración de las transacciones de escritura por operación', ['operation']
+)
+ROWS_WRITTEN = REGISTRY.counter('uptime_storage_results_written_total', 'Resultados insertados en la base de datos')
+
 class MonitoringResult(Base):
     __tablename__ = 'monitoring_results'
     
@@ -15,6 +34,44 @@ class MonitoringResult(Base):
     response_time = Column(Integer)  # en milisegundos
     is_up = Column(Boolean, default=False)
     checked_at = Column(DateTime, default=datetime.utcnow)
+    # Desglose por fases de la sonda, en milisegundos (NULL en resultados antiguos o fallidos)
+    dns_time = Column(Integer)
+    connect_time = Column(Integer)
+    tls_time = Column(Integer)
+    ttfb_time = Column(Integer)
+    transfer_time = Column(Integer)
+    queue_time = Column(Integer)  # Espera en cola del planificador, aparte de response_time
+
+    # Índice compuesto para "últimos resultados de una URL" (filtro por url + orden por fecha)
+    __table_args__ = (
+        Index('ix_monitoring_results_url_checked_at', 'url', 'checked_at'),
+        # Barridos por rango de fechas de la política de retención
+        Index('ix_monitoring_results_checked_at', 'checked_at'),
+    )
+
+class RollupMixin:
+    """Columnas comunes de las tablas de agregados por intervalo de tiempo"""
+    id = Column(Integer, primary_key=True)
+    url = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    count = Column(Integer, default=0)
+    up_count = Column(Integer, default=0)
+    min_response_time = Column(Integer)
+    avg_response_time = Column(Float)
+    max_response_time = Column(Integer)
+    p95_response_time = Column(Integer)
+
+class MinuteRollup(RollupMixin, Base):
+    __tablename__ = 'monitoring_rollups_minute'
+    __table_args__ = (
+        Index('ix_monitoring_rollups_minute_url_bucket', 'url', 'bucket_start', unique=True),
+    )
+
+class HourRollup(RollupMixin, Base):
+    __tablename__ = 'monitoring_rollups_hour'
+    __table_args__ = (
+        Index('ix_monitoring_rollups_hour_url_bucket', 'url', 'bucket_start', unique=True),
+    )
 
 class MonitoredURL(Base):
     __tablename__ = 'monitored_urls'
@@ -22,22 +79,55 @@ class MonitoredURL(Base):
     id = Column(Integer, primary_key=True)
     url = Column(String, nullable=False, unique=True)
     interval = Column(Integer, default=30)  # intervalo en segundos
+    timing = Column(String, default='warm')  # 'warm' (conexión reutilizada) o 'cold' (conexión nueva)
+    probe_mode = Column(String, default='full')  # 'head', 'headers', 'partial' o 'full'
+    dns_cache = Column(Boolean, default=True)  # False resuelve siempre con el sistema (monitoriza el DNS)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-# Ruta de la base de datos relativa al proyecto
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../data/monitoring.db')
-db_uri = f'sqlite:///{db_path}'
-
-# Crear la conexión a la base de datos con thread safety
-engine = create_engine(db_uri, connect_args={'check_same_thread': False})
-session_factory = sessionmaker(bind=engine)
-Session = scoped_session(session_factory)
+# Motores de escritura y lectura según config.DATABASE_URI (o MONITOR_DATABASE_URI para
+# benchmarks y pruebas locales); con SQLite, un único escritor en WAL y un pool de lectores
+backend = StorageBackend()
+engine = backend.write_engine
+read_engine = backend.read_engine
+# Cada función abre y cierra su propia sesión, así que no hace falta scoped_session
+Session = sessionmaker(bind=engine)
+ReadSession = sessionmaker(bind=read_engine)
 
 def init_db():
     Base.metadata.create_all(engine)
+    migrate_db()
+
+# Columnas añadidas después de la primera versión del esquema: (tabla, columna, DDL)
+MIGRATIONS = [
+    ('monitored_urls', 'timing', "ALTER TABLE monitored_urls ADD COLUMN timing VARCHAR DEFAULT 'warm'"),
+    ('monitored_urls', 'probe_mode', "ALTER TABLE monitored_urls ADD COLUMN probe_mode VARCHAR DEFAULT 'full'"),
+    ('monitored_urls', 'dns_cache', "ALTER TABLE monitored_urls ADD COLUMN dns_cache BOOLEAN DEFAULT 1"),
+    ('monitoring_results', 'dns_time', "ALTER TABLE monitoring_results ADD COLUMN dns_time INTEGER"),
+    ('monitoring_results', 'connect_time', "ALTER TABLE monitoring_results ADD COLUMN connect_time INTEGER"),
+    ('monitoring_results', 'tls_time', "ALTER TABLE monitoring_results ADD COLUMN tls_time INTEGER"),
+    ('monitoring_results', 'ttfb_time', "ALTER TABLE monitoring_results ADD COLUMN ttfb_time INTEGER"),
+    ('monitoring_results', 'transfer_time', "ALTER TABLE monitoring_results ADD COLUMN transfer_time INTEGER"),
+    ('monitoring_results', 'queue_time', "ALTER TABLE monitoring_results ADD COLUMN queue_time INTEGER"),
+]
+
+def migrate_db():
+    """Añade a las bases de datos existentes las columnas e índices que create_all no crea"""
+    with engine.begin() as conn:
+        # El inspector usa la misma conexión: el motor de escritura solo tiene una
+        inspector = inspect(conn)
+        for table, column, ddl in MIGRATIONS:
+            existing = {col['name'] for col in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(ddl))
+
+        # create_all no añade índices nuevos a tablas que ya existían
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 def save_result(url, status_code, response_time, is_up):
     """Guarda el resultado de un chequeo en la base de datos"""
+    started = time.perf_counter()
     session = Session()
     try:
         result = MonitoringResult(
@@ -49,6 +139,8 @@ def save_result(url, status_code, response_time, is_up):
         )
         session.add(result)
         session.commit()
+        COMMIT_DURATION.labels('save_result').observe(time.perf_counter() - started)
+        ROWS_WRITTEN.inc()
         return result
     except Exception as e:
         session.rollback()
@@ -56,31 +148,151 @@ def save_result(url, status_code, response_time, is_up):
     finally:
         session.close()
 
-def get_results(url=None, limit=100):
-    """Obtiene los resultados de monitoreo de la base de datos"""
-    session = Session()
+def save_results(rows):
+    """Inserta un lote de resultados en una única transacción (executemany)"""
+    if not rows:
+        return 0
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(MonitoringResult.__table__.insert(), rows)
+    COMMIT_DURATION.labels('save_results').observe(time.perf_counter() - started)
+    ROWS_WRITTEN.inc(len(rows))
+    return len(rows)
+
+def get_results(url=None, limit=100, since=None, until=None, before=None):
+    """Obtiene los resultados de monitoreo de la base de datos, del más reciente al más antiguo.
+
+    `since` (inclusivo) y `until` (exclusivo) acotan el rango de fechas.
+    `before` es el cursor (checked_at, id) de la última fila de la página
+    anterior: la consulta continúa justo después con una condición keyset
+    sobre el índice, así que una página profunda cuesta lo mismo que la
+    primera. Si el id es None se continúa por fecha estrictamente anterior.
+    """
+    session = ReadSession()
     try:
         query = session.query(MonitoringResult)
         
         if url:
             query = query.filter(MonitoringResult.url == url)
+        if since:
+            query = query.filter(MonitoringResult.checked_at >= since)
+        if until:
+            query = query.filter(MonitoringResult.checked_at < until)
+        if before:
+            checked_at, result_id = before
+            if result_id is None:
+                query = query.filter(MonitoringResult.checked_at < checked_at)
+            else:
+                query = query.filter(
+                    tuple_(MonitoringResult.checked_at, MonitoringResult.id) < tuple_(checked_at, result_id)
+                )
         
-        results = query.order_by(MonitoringResult.checked_at.desc()).limit(limit).all()
+        results = query.order_by(MonitoringResult.checked_at.desc(), MonitoringResult.id.desc()).limit(limit).all()
         return results
     finally:
         session.close()
 
-def save_url(url, interval):
+# Columnas de una fila exportada, en orden
+EXPORT_COLUMNS = ['id', 'url', 'status_code', 'response_time', 'is_up', 'checked_at'] + list(PHASE_COLUMNS.values())
+
+def iter_results(url=None, url_prefix=None, since=None, until=None, batch_size=1000):
+    """Recorre los resultados en orden (checked_at, id) ascendente sin cargarlos todos en memoria.
+
+    Cada lote es una consulta keyset que continúa tras la última fila del
+    anterior (coste constante por lote aunque se recorra todo el histórico) y
+    se lee con un cursor en streaming. Cada lote usa su propia conexión, así
+    que no se mantiene una transacción abierta durante toda la exportación.
+    `since` es inclusivo y `until` exclusivo.
+    """
+    table = MonitoringResult.__table__
+    base = select(*(table.c[column] for column in EXPORT_COLUMNS))
+    if url:
+        base = base.where(table.c.url == url)
+    if url_prefix:
+        base = base.where(table.c.url.startswith(url_prefix, autoescape=True))
+    if since:
+        base = base.where(table.c.checked_at >= since)
+    if until:
+        base = base.where(table.c.checked_at < until)
+    base = base.order_by(table.c.checked_at, table.c.id).limit(batch_size)
+
+    last = None
+    while True:
+        query = base
+        if last is not None:
+            last_checked_at, last_id = last
+            query = query.where(tuple_(table.c.checked_at, table.c.id) > tuple_(last_checked_at, last_id))
+        count = 0
+        with read_engine.connect() as conn:
+            for row in conn.execution_options(stream_results=True).execute(query):
+                count += 1
+                last = (row.checked_at, row.id)
+                yield row
+        if count < batch_size:
+            return
+
+def get_recent_results_by_url(urls=None, limit=10):
+    """Obtiene los últimos `limit` resultados de varias URLs en una sola consulta.
+
+    Usa ROW_NUMBER() particionado por URL, así que el coste es una consulta
+    independientemente del número de URLs. Devuelve {url: [filas]} con las
+    filas ordenadas de la más reciente a la más antigua.
+    """
+    table = MonitoringResult.__table__
+    row_number = func.row_number().over(
+        partition_by=table.c.url,
+        order_by=(table.c.checked_at.desc(), table.c.id.desc())
+    ).label('rn')
+    ranked = select(
+        table.c.url, table.c.status_code, table.c.response_time, table.c.is_up, table.c.checked_at,
+        *(table.c[column] for column in PHASE_COLUMNS.values()),
+        row_number
+    )
+    if urls is not None:
+        if not urls:
+            return {}
+        ranked = ranked.where(table.c.url.in_(list(urls)))
+    ranked = ranked.subquery()
+
+    query = select(ranked).where(ranked.c.rn <= limit).order_by(ranked.c.url, ranked.c.rn)
+    results = {}
+    with read_engine.connect() as conn:
+        for row in conn.execute(query):
+            results.setdefault(row.url, []).append(row)
+    return results
+
+def get_results_since(since):
+    """Resultados con checked_at posterior a `since`, del más antiguo al más nuevo (en streaming)"""
+    table = MonitoringResult.__table__
+    query = select(
+        table.c.url, table.c.status_code, table.c.response_time, table.c.is_up, table.c.checked_at,
+        *(table.c[column] for column in PHASE_COLUMNS.values())
+    ).where(table.c.checked_at > since).order_by(table.c.checked_at, table.c.id)
+    with read_engine.connect() as conn:
+        yield from conn.execution_options(stream_results=True).execute(query)
+
+def save_url(url, interval, timing=None, probe_mode=None, dns_cache=None):
     """Guarda o actualiza una URL monitoreada en la base de datos"""
+    started = time.perf_counter()
     session = Session()
     try:
         existing = session.query(MonitoredURL).filter_by(url=url).first()
         if existing:
             existing.interval = interval
+            if timing is not None:
+                existing.timing = timing
+            if probe_mode is not None:
+                existing.probe_mode = probe_mode
+            if dns_cache is not None:
+                existing.dns_cache = dns_cache
         else:
-            url_obj = MonitoredURL(url=url, interval=interval)
+            url_obj = MonitoredURL(
+                url=url, interval=interval, timing=timing or 'warm', probe_mode=probe_mode or 'full',
+                dns_cache=True if dns_cache is None else dns_cache
+            )
             session.add(url_obj)
         session.commit()
+        COMMIT_DURATION.labels('save_url').observe(time.perf_counter() - started)
         return True
     except Exception as e:
         session.rollback()
@@ -89,6 +301,55 @@ def save_url(url, interval):
     finally:
         session.close()
 
+# URLs por consulta IN al buscar las que ya existen (por debajo del límite de variables de SQLite)
+URL_LOOKUP_CHUNK = 500
+# Opciones de MonitoredURL que se pueden fijar por URL
+URL_OPTION_COLUMNS = ('interval', 'timing', 'probe_mode', 'dns_cache')
+
+def save_urls(entries):
+    """Alta o actualización de muchas URLs en una única transacción.
+
+    `entries` son dicts con 'url' y cualquiera de URL_OPTION_COLUMNS; en las
+    URLs existentes solo se cambian las opciones presentes. Devuelve
+    (urls_nuevas, urls_actualizadas).
+    """
+    table = MonitoredURL.__table__
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        urls = [entry['url'] for entry in entries]
+        existing = set()
+        for i in range(0, len(urls), URL_LOOKUP_CHUNK):
+            existing.update(conn.execute(
+                select(table.c.url).where(table.c.url.in_(urls[i:i + URL_LOOKUP_CHUNK]))
+            ).scalars())
+
+        inserts = []
+        updates = {}  # columnas presentes -> filas, para un executemany por forma
+        for entry in entries:
+            options = {key: entry[key] for key in URL_OPTION_COLUMNS if entry.get(key) is not None}
+            if entry['url'] in existing:
+                if options:
+                    updates.setdefault(tuple(sorted(options)), []).append(dict(options, target_url=entry['url']))
+            else:
+                inserts.append({
+                    'url': entry['url'],
+                    'interval': options.get('interval', 30),
+                    'timing': options.get('timing', 'warm'),
+                    'probe_mode': options.get('probe_mode', 'full'),
+                    'dns_cache': options.get('dns_cache', True)
+                })
+
+        if inserts:
+            conn.execute(table.insert(), inserts)
+        for columns, rows in updates.items():
+            conn.execute(
+                update(table).where(table.c.url == bindparam('target_url'))
+                .values({column: bindparam(column) for column in columns}),
+                rows
+            )
+    COMMIT_DURATION.labels('save_urls').observe(time.perf_counter() - started)
+    return [row['url'] for row in inserts], [entry['url'] for entry in entries if entry['url'] in existing]
+
 def delete_url(url):
     """Elimina una URL monitoreada de la base de datos"""
     session = Session()
@@ -108,9 +369,23 @@ def delete_url(url):
 
 def get_all_urls():
     """Obtiene todas las URLs monitoreadas desde la base de datos"""
-    session = Session()
-    try:
-        urls = session.query(MonitoredURL).all()
-        return {url.url: url.interval for url in urls}
-    finally:
-        session.close()
\ No newline at end of file
+    # Consulta de columnas sin ORM: no se construye un objeto por URL
+    table = MonitoredURL.__table__
+    with read_engine.connect() as conn:
+        return dict(conn.execute(select(table.c.url, table.c.interval)).all())
+
+def get_url_options():
+    """Obtiene las opciones de sondeo de cada URL monitoreada"""
+    table = MonitoredURL.__table__
+    with read_engine.connect() as conn:
+        rows = conn.execute(
+            select(table.c.url, table.c.timing, table.c.probe_mode, table.c.dns_cache)
+        ).all()
+    return {
+        url: {
+            'timing': timing or 'warm',
+            'probe_mode': probe_mode or 'full',
+            'dns_cache': dns_cache is not False
+        }
+        for url, timing, probe_mode, dns_cache in rows
+    }
\ No newline at end of file
@@ -0,0 +1,151 @@
+import math
+import threading
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func
+from storage.database import engine, read_engine, MonitoringResult, MinuteRollup, HourRollup
+
+logger = logging.getLogger(__name__)
+
+results_table = MonitoringResult.__table__
+minute_table = MinuteRollup.__table__
+hour_table = HourRollup.__table__
+
+
+def _floor(dt, unit):
+    """Trunca una fecha al inicio de su minuto u hora"""
+    if unit == 'hour':
+        return dt.replace(minute=0, second=0, microsecond=0)
+    return dt.replace(second=0, microsecond=0)
+
+
+def _percentile(sorted_values, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _aggregate(groups):
+    """Convierte {(url, bucket): [(is_up, status_code, response_time)]} en filas de agregados"""
+    rows = []
+    for (url, bucket_start), checks in groups.items():
+        # Las comprobaciones fallidas sin respuesta (status 0) no tienen latencia real
+        latencies = sorted(rt for _, status, rt in checks if status and rt is not None)
+        rows.append({
+            'url': url,
+            'bucket_start': bucket_start,
+            'count': len(checks),
+            'up_count': sum(1 for is_up, _, _ in checks if is_up),
+            'min_response_time': latencies[0] if latencies else None,
+            'avg_response_time': sum(latencies) / len(latencies) if latencies else None,
+            'max_response_time': latencies[-1] if latencies else None,
+            'p95_response_time': _percentile(latencies, 0.95)
+        })
+    return rows
+
+
+def rollup_and_purge(retention_days=7, minute_retention_days=30, now=None):
+    """Agrega en tablas por minuto y por hora los resultados con más de
+    `retention_days` días y elimina las filas originales.
+
+    El corte se alinea a la hora para que cada bucket se procese una sola vez.
+    Se trabaja hora a hora, cada una en su propia transacción, de modo que la
+    memoria usada depende del volumen de una hora y no de todo el histórico.
+    """
+    now = now or datetime.utcnow()
+    cutoff = _floor(now - timedelta(days=retention_days), 'hour')
+    summary = {'raw_deleted': 0, 'minute_rollups': 0, 'hour_rollups': 0, 'minute_rollups_deleted': 0}
+
+    with read_engine.connect() as conn:
+        oldest = conn.execute(
+            select(func.min(results_table.c.checked_at)).where(results_table.c.checked_at < cutoff)
+        ).scalar()
+
+    window_start = _floor(oldest, 'hour') if oldest else cutoff
+    while window_start < cutoff:
+        window_end = window_start + timedelta(hours=1)
+        in_window = (results_table.c.checked_at >= window_start) & (results_table.c.checked_at < window_end)
+
+        with engine.begin() as conn:
+            minute_groups = {}
+            hour_groups = {}
+            rows = conn.execute(
+                select(
+                    results_table.c.url,
+                    results_table.c.is_up,
+                    results_table.c.status_code,
+                    results_table.c.response_time,
+                    results_table.c.checked_at
+                ).where(in_window)
+            )
+            for url, is_up, status_code, response_time, checked_at in rows:
+                check = (is_up, status_code, response_time)
+                minute_groups.setdefault((url, _floor(checked_at, 'minute')), []).append(check)
+                hour_groups.setdefault((url, window_start), []).append(check)
+
+            minute_rows = _aggregate(minute_groups)
+            hour_rows = _aggregate(hour_groups)
+            if minute_rows:
+                conn.execute(minute_table.insert(), minute_rows)
+            if hour_rows:
+                conn.execute(hour_table.insert(), hour_rows)
+            deleted = conn.execute(delete(results_table).where(in_window)).rowcount
+
+        summary['raw_deleted'] += deleted
+        summary['minute_rollups'] += len(minute_rows)
+        summary['hour_rollups'] += len(hour_rows)
+        window_start = window_end
+
+    # Los agregados por minuto se conservan menos tiempo; los horarios se mantienen
+    minute_cutoff = _floor(now - timedelta(days=minute_retention_days), 'hour')
+    with engine.begin() as conn:
+        summary['minute_rollups_deleted'] = conn.execute(
+            delete(minute_table).where(minute_table.c.bucket_start < minute_cutoff)
+        ).rowcount
+
+    return summary
+
+
+class RetentionManager:
+    """Ejecuta periódicamente la agregación y purga del histórico en segundo plano"""
+
+    def __init__(self, retention_days=7, minute_retention_days=30, run_interval=3600):
+        self.retention_days = retention_days
+        self.minute_retention_days = minute_retention_days
+        self.run_interval = run_interval
+        self.last_run = None
+        self.last_summary = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Ejecuta una pasada de retención y guarda su resumen"""
+        summary = rollup_and_purge(self.retention_days, self.minute_retention_days)
+        self.last_run = datetime.utcnow()
+        self.last_summary = summary
+        if summary['raw_deleted'] or summary['minute_rollups_deleted']:
+            logger.info(f"Retención aplicada: {summary}")
+        return summary
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='retention', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error al aplicar la política de retención: {str(e)}")
+            self._stop_event.wait(self.run_interval)
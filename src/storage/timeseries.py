@@ -0,0 +1,209 @@
+import math
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, case, cast, and_, Integer
+from storage.database import backend, read_engine, MonitoringResult, MinuteRollup, HourRollup
+
+results_table = MonitoringResult.__table__
+minute_table = MinuteRollup.__table__
+hour_table = HourRollup.__table__
+
+MAX_BUCKETS = 1000
+# A partir de este ancho de bucket basta con los agregados por hora aunque existan los de minuto
+HOUR_ROLLUP_MIN_WIDTH = 3600
+# Día juliano del 1970-01-01 (para pasar fechas de SQLite a segundos epoch)
+_JULIAN_EPOCH = 2440587.5
+EPOCH = datetime(1970, 1, 1)
+
+
+class _Bucket:
+    """Acumulador de un bucket de la serie"""
+    __slots__ = ('count', 'up_count', 'latency_weight', 'latency_sum', 'min_latency', 'max_latency')
+
+    def __init__(self):
+        self.count = 0
+        self.up_count = 0
+        self.latency_weight = 0
+        self.latency_sum = 0.0
+        self.min_latency = None
+        self.max_latency = None
+
+    def add(self, count, up_count, avg_latency, min_latency, max_latency):
+        self.count += count
+        self.up_count += up_count
+        if avg_latency is not None:
+            self.latency_weight += count
+            self.latency_sum += avg_latency * count
+        if min_latency is not None and (self.min_latency is None or min_latency < self.min_latency):
+            self.min_latency = min_latency
+        if max_latency is not None and (self.max_latency is None or max_latency > self.max_latency):
+            self.max_latency = max_latency
+
+    def add_sums(self, count, up_count, latency_count, latency_sum, min_latency, max_latency):
+        """Como add() pero con la suma y el número de latencias ya agregados (resultados sin agregar)"""
+        self.add(count, up_count, None, min_latency, max_latency)
+        self.latency_weight += latency_count
+        self.latency_sum += latency_sum or 0
+
+    def to_dict(self, start, end):
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'checks': self.count,
+            'up': self.up_count,
+            'errors': self.count - self.up_count,
+            'uptime': round(self.up_count / self.count * 100, 3) if self.count else None,
+            'avg_response_time': round(self.latency_sum / self.latency_weight, 1) if self.latency_weight else None,
+            'min_response_time': self.min_latency,
+            'max_response_time': self.max_latency
+        }
+
+
+def _bucket_index(column, since, width):
+    """Expresión SQL con el índice del bucket de una fecha (entero, truncado)"""
+    offset = (since - EPOCH).total_seconds()
+    if backend.dialect == 'sqlite':
+        # CAST trunca hacia cero, suficiente con fechas >= since
+        return cast(((func.julianday(column) - _JULIAN_EPOCH) * 86400.0 - offset) / width, Integer)
+    return cast(func.floor((func.extract('epoch', column) - offset) / width), Integer)
+
+
+def closed_until(since, until, width, now=None):
+    """Fin del último bucket cerrado del rango: los datos anteriores ya no cambian con cada comprobación"""
+    now = now or datetime.utcnow()
+    if now >= until:
+        return until
+    if now <= since:
+        return since
+    return since + timedelta(seconds=math.floor((now - since).total_seconds() / width) * width)
+
+
+def _raw_bounds(conn, url, since, until):
+    """(primer resultado sin agregar de la URL, último resultado del rango)"""
+    first = conn.execute(
+        select(func.min(results_table.c.checked_at)).where(results_table.c.url == url)
+    ).scalar()
+    last = conn.execute(
+        select(func.max(results_table.c.checked_at)).where(
+            results_table.c.url == url,
+            results_table.c.checked_at >= since,
+            results_table.c.checked_at < until
+        )
+    ).scalar()
+    return first, last
+
+
+def timeseries_version(url, since, until, buckets, now=None):
+    """Marca barata (dos búsquedas por índice) que cambia cuando cambian los buckets cerrados.
+
+    Devuelve (primer resultado sin agregar, último resultado de los buckets
+    cerrados, fin del último bucket cerrado). El segundo avanza cuando se
+    cierra un bucket con comprobaciones y el primero con cada pasada de
+    retención, que es lo único que mueve datos a los agregados. Las
+    comprobaciones del bucket en curso no cambian la marca: se incorporan
+    al cerrarse.
+    """
+    width = (until - since).total_seconds() / buckets
+    closed = closed_until(since, until, width, now)
+    with read_engine.connect() as conn:
+        raw_start, last_closed = _raw_bounds(conn, url, since, closed)
+    return raw_start, last_closed, closed
+
+
+def get_timeseries(url, since, until, buckets=200):
+    """Serie de `buckets` intervalos iguales entre since (inclusivo) y until (exclusivo).
+
+    Cada bucket trae comprobaciones, caídas, disponibilidad y latencia
+    media/mínima/máxima, de modo que el tamaño de la respuesta no depende del
+    rango pedido y los picos no desaparecen al reducir puntos. La parte del
+    rango que ya pasó por la retención se lee de los agregados por minuto (o
+    por hora si el bucket es de una hora o más, o si los de minuto ya se
+    purgaron) y el resto de los resultados sin agregar.
+    """
+    buckets = max(1, min(MAX_BUCKETS, int(buckets)))
+    width = (until - since).total_seconds() / buckets
+    if width <= 0:
+        raise ValueError('until debe ser posterior a since')
+    acc = [_Bucket() for _ in range(buckets)]
+    sources = []
+
+    def index(ts):
+        return min(buckets - 1, int((ts - since).total_seconds() / width))
+
+    with read_engine.connect() as conn:
+        raw_start, _ = _raw_bounds(conn, url, since, until)
+        boundary = min(until, raw_start) if raw_start else until
+
+        # Tramo ya agregado: de since hasta el primer resultado sin agregar
+        if since < boundary:
+            rollup_end = boundary
+            if width < HOUR_ROLLUP_MIN_WIDTH:
+                rows = conn.execute(
+                    select(
+                        minute_table.c.bucket_start, minute_table.c.count, minute_table.c.up_count,
+                        minute_table.c.avg_response_time, minute_table.c.min_response_time,
+                        minute_table.c.max_response_time
+                    ).where(
+                        minute_table.c.url == url,
+                        minute_table.c.bucket_start >= since,
+                        minute_table.c.bucket_start < boundary
+                    ).order_by(minute_table.c.bucket_start)
+                ).all()
+                if rows:
+                    sources.append('minute')
+                    # Antes de la hora del primer agregado por minuto solo quedan los horarios
+                    # (los de minuto se purgan por horas completas)
+                    rollup_end = rows[0].bucket_start.replace(minute=0)
+                for bucket_start, count, up_count, avg, low, high in rows:
+                    acc[index(bucket_start)].add(count, up_count, avg, low, high)
+
+            if since < rollup_end:
+                rows = conn.execute(
+                    select(
+                        hour_table.c.bucket_start, hour_table.c.count, hour_table.c.up_count,
+                        hour_table.c.avg_response_time, hour_table.c.min_response_time,
+                        hour_table.c.max_response_time
+                    ).where(
+                        hour_table.c.url == url,
+                        # El agregado de la hora que contiene a since también cuenta
+                        hour_table.c.bucket_start > since - timedelta(hours=1),
+                        hour_table.c.bucket_start < rollup_end
+                    )
+                ).all()
+                if rows:
+                    sources.insert(0, 'hour')
+                for bucket_start, count, up_count, avg, low, high in rows:
+                    acc[index(max(bucket_start, since))].add(count, up_count, avg, low, high)
+
+        # Tramo sin agregar: la base de datos agrupa por bucket y devuelve una fila por bucket
+        if boundary < until:
+            # Las comprobaciones sin respuesta (status 0) no tienen latencia real
+            latency = case(
+                (and_(results_table.c.status_code != 0, results_table.c.response_time.isnot(None)),
+                 results_table.c.response_time),
+                else_=None
+            )
+            bucket = _bucket_index(results_table.c.checked_at, since, width).label('bucket')
+            rows = conn.execute(
+                select(
+                    bucket, func.count(), func.sum(case((results_table.c.is_up, 1), else_=0)),
+                    func.count(latency), func.sum(latency), func.min(latency), func.max(latency)
+                ).where(
+                    results_table.c.url == url,
+                    results_table.c.checked_at >= max(since, boundary),
+                    results_table.c.checked_at < until
+                ).group_by(bucket)
+            ).all()
+            for i, count, up_count, latency_count, latency_sum, low, high in rows:
+                acc[max(0, min(buckets - 1, i))].add_sums(count, up_count, latency_count, latency_sum, low, high)
+            if rows:
+                sources.append('raw')
+
+    step = timedelta(seconds=width)
+    return {
+        'url': url,
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'bucket_seconds': width,
+        'sources': sources,
+        'buckets': [bucket.to_dict(since + step * i, since + step * (i + 1)) for i, bucket in enumerate(acc)]
+    }
@@ -0,0 +1,148 @@
+import threading
+import time
+import logging
+from collections import deque
+from datetime import datetime
+from storage.database import save_results, PHASE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+class ResultWriter:
+    """Buffer write-behind para los resultados de monitoreo.
+
+    Los resultados se encolan en memoria y un hilo en segundo plano los inserta
+    en bloque (una sola transacción con executemany) cuando la cola alcanza
+    `batch_size` o han pasado `flush_interval` segundos desde el último volcado.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=1.0, max_queue=100000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.running = False
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # Serializa los volcados entre el hilo y stop()
+        self._thread = None
+
+        # Estadísticas expuestas
+        self.total_written = 0
+        self.total_dropped = 0
+        self.total_failed = 0
+        self.flush_count = 0
+        self.last_flush_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def enqueue(self, url, status_code, response_time, is_up, checked_at=None, timings=None):
+        """Encola un resultado; si el flusher no está activo se escribe directamente"""
+        row = {
+            'url': url,
+            'status_code': status_code,
+            'response_time': response_time,
+            'is_up': is_up,
+            'checked_at': checked_at or datetime.utcnow()
+        }
+        # executemany exige las mismas claves en todas las filas del lote
+        for phase, column in PHASE_COLUMNS.items():
+            row[column] = timings.get(phase) if timings else None
+
+        if not self.running:
+            self._write([row])
+            return row
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                # Protegerse de un crecimiento sin límite si la base de datos no da abasto
+                self._queue.popleft()
+                self.total_dropped += 1
+            self._queue.append(row)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return row
+
+    def start(self):
+        """Arranca el hilo de volcado en segundo plano"""
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+        self._thread = threading.Thread(target=self._flush_loop, name='result-writer', daemon=True)
+        self._thread.start()
+        logger.info(f"Escritor de resultados iniciado (lote={self.batch_size}, intervalo={self.flush_interval}s)")
+
+    def stop(self, timeout=10):
+        """Detiene el flusher y vuelca todo lo pendiente"""
+        with self._cond:
+            if not self.running:
+                return
+            self.running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Volcar lo que haya quedado en la cola
+        while self._queue:
+            self.flush()
+        logger.info(f"Escritor de resultados detenido ({self.total_written} resultados escritos)")
+
+    def flush(self):
+        """Vuelca a la base de datos un lote de resultados pendientes"""
+        with self._flush_lock:
+            with self._cond:
+                count = min(len(self._queue), self.batch_size)
+                batch = [self._queue.popleft() for _ in range(count)]
+            if batch:
+                self._write(batch)
+            return len(batch)
+
+    def get_stats(self):
+        """Devuelve las métricas del buffer"""
+        return {
+            'running': self.running,
+            'queue_depth': self.queue_depth,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'total_written': self.total_written,
+            'total_dropped': self.total_dropped,
+            'total_failed': self.total_failed,
+            'flush_count': self.flush_count,
+            'last_flush_rows': self.last_flush_rows,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'max_flush_ms': round(self.max_flush_ms, 2)
+        }
+
+    def _write(self, rows):
+        start_time = time.perf_counter()
+        try:
+            save_results(rows)
+        except Exception as e:
+            self.total_failed += len(rows)
+            logger.error(f"Error al volcar {len(rows)} resultados: {str(e)}")
+            return
+        elapsed = (time.perf_counter() - start_time) * 1000
+        self.total_written += len(rows)
+        self.flush_count += 1
+        self.last_flush_rows = len(rows)
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        logger.debug("Volcados %d resultados en %.1fms", len(rows), elapsed)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                if self.running and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if not self.running:
+                    break
+            try:
+                # Vaciar la cola en lotes mientras haya un lote completo
+                while self.flush() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"Error en el escritor de resultados: {str(e)}")
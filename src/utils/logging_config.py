@@ -1,6 +1,13 @@
 import logging
 import os
 import json
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 # Definir los niveles de logging disponibles
@@ -12,15 +19,120 @@ LOG_LEVELS = {
     'critical': logging.CRITICAL
 }
 
+LOG_FORMATS = ('text', 'json')
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+# Opciones del pipeline que se pueden cambiar en caliente
+PIPELINE_DEFAULTS = {
+    'format': 'text',
+    'sample_rate': 1.0,  # Fracción de los mensajes INFO/DEBUG con URL que se conservan
+    'url_rate': None,  # Máximo de mensajes INFO/DEBUG por segundo y URL (None = sin límite)
+    'url_burst': 10  # Ráfaga permitida por encima de url_rate
+}
+
+# Mensajes pendientes de escribir; por encima se descartan en lugar de frenar las sondas
+QUEUE_SIZE = 10000
+
 # Ruta para el archivo de configuración
 CONFIG_PATH = Path(__file__).parent.parent.parent / 'data' / 'logging_config.json'
 
+# Atributos estándar de LogRecord; el resto son campos pasados con extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por mensaje, con los campos pasados en extra= (p. ej. url)"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class UrlSampler(logging.Filter):
+    """Muestreo y límite por URL de los mensajes INFO/DEBUG que llevan extra={'url': ...}.
+
+    Los avisos y errores, y los mensajes sin URL, pasan siempre. El límite es
+    un token bucket por URL de `url_rate` mensajes por segundo con ráfagas de
+    `url_burst`.
+    """
+
+    def __init__(self, sample_rate=1.0, url_rate=None, url_burst=10):
+        super().__init__()
+        self.configure(sample_rate, url_rate, url_burst)
+        self._buckets = {}  # url -> [tokens, último instante]
+        self._lock = threading.Lock()
+        self.sampled_out = 0
+        self.rate_limited = 0
+
+    def configure(self, sample_rate=1.0, url_rate=None, url_burst=10):
+        self.sample_rate = sample_rate
+        self.url_rate = url_rate
+        self.url_burst = url_burst
+
+    def filter(self, record):
+        url = getattr(record, 'url', None)
+        if url is None or record.levelno >= logging.WARNING:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+        if self.url_rate:
+            now = time.monotonic()
+            with self._lock:
+                bucket = self._buckets.get(url)
+                if bucket is None:
+                    bucket = self._buckets[url] = [self.url_burst, now]
+                bucket[0] = min(self.url_burst, bucket[0] + (now - bucket[1]) * self.url_rate)
+                bucket[1] = now
+                if bucket[0] < 1:
+                    self.rate_limited += 1
+                    return False
+                bucket[0] -= 1
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler que no formatea en el hilo que registra el mensaje.
+
+    El QueueHandler estándar construye el texto en prepare(); aquí el
+    registro se encola tal cual y lo formatea el hilo del QueueListener. Si
+    la cola está llena el mensaje se descarta y se cuenta.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 class LoggingManager:
     def __init__(self):
         self.default_level = 'info'
         self.current_level = self.default_level
         self.root_logger = logging.getLogger()
         self.loggers = {}
+        self.pipeline = dict(PIPELINE_DEFAULTS)
+        self.sampler = UrlSampler()
+        self._queue_handler = None
+        self._output_handler = None
+        self._listener = None
         
         # Asegurarse de que exista el directorio de configuración
         os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
@@ -39,11 +151,16 @@ class LoggingManager:
                     config = json.load(f)
                     self.current_level = config.get('level', self.default_level)
                     self.loggers = config.get('loggers', {})
+                    self.pipeline.update({
+                        key: value for key, value in config.get('pipeline', {}).items()
+                        if key in PIPELINE_DEFAULTS
+                    })
         except Exception as e:
             print(f"Error al cargar configuración de logging: {e}")
             # En caso de error, usar valores predeterminados
             self.current_level = self.default_level
             self.loggers = {}
+            self.pipeline = dict(PIPELINE_DEFAULTS)
         
         # Validar el nivel cargado
         if self.current_level not in LOG_LEVELS:
@@ -55,7 +172,8 @@ class LoggingManager:
         try:
             config = {
                 'level': self.current_level,
-                'loggers': self.loggers
+                'loggers': self.loggers,
+                'pipeline': self.pipeline
             }
             with open(CONFIG_PATH, 'w') as f:
                 json.dump(config, f, indent=2)
@@ -72,6 +190,77 @@ class LoggingManager:
             if level in LOG_LEVELS:
                 logger = logging.getLogger(logger_name)
                 logger.setLevel(LOG_LEVELS[level])
+        
+        self.sampler.configure(self.pipeline['sample_rate'], self.pipeline['url_rate'], self.pipeline['url_burst'])
+        if self._output_handler:
+            self._output_handler.setFormatter(self._formatter())
+    
+    def _formatter(self):
+        if self.pipeline['format'] == 'json':
+            return JsonFormatter()
+        return logging.Formatter(TEXT_FORMAT)
+    
+    def start_pipeline(self, stream=None):
+        """Sustituye los handlers del logger raíz por una cola atendida en segundo plano.
+
+        Los hilos que registran mensajes solo comprueban el nivel, pasan el
+        muestreo por URL y encolan el registro; el formateo (texto o JSON) y
+        la escritura los hace un QueueListener.
+        """
+        if self._listener is not None:
+            return
+        self._output_handler = logging.StreamHandler(stream or sys.stderr)
+        self._output_handler.setFormatter(self._formatter())
+        self._queue_handler = _DeferredQueueHandler(queue.Queue(QUEUE_SIZE))
+        self._queue_handler.addFilter(self.sampler)
+        for handler in list(self.root_logger.handlers):
+            self.root_logger.removeHandler(handler)
+        self.root_logger.addHandler(self._queue_handler)
+        self._listener = QueueListener(self._queue_handler.queue, self._output_handler, respect_handler_level=True)
+        self._listener.start()
+    
+    def stop_pipeline(self):
+        """Vacía la cola y devuelve la salida directa al logger raíz"""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        self.root_logger.removeHandler(self._queue_handler)
+        self.root_logger.addHandler(self._output_handler)
+        self._listener = None
+        self._queue_handler = None
+    
+    def set_pipeline(self, **options):
+        """Cambia en caliente el formato, el muestreo o el límite por URL.
+
+        Lanza ValueError si alguna opción no es válida.
+        """
+        pipeline = dict(self.pipeline)
+        for key, value in options.items():
+            if key not in PIPELINE_DEFAULTS:
+                raise ValueError(f"Opción desconocida: {key}. Disponibles: {list(PIPELINE_DEFAULTS)}")
+            pipeline[key] = value
+        if pipeline['format'] not in LOG_FORMATS:
+            raise ValueError(f"Formato inválido: {pipeline['format']}. Disponibles: {list(LOG_FORMATS)}")
+        try:
+            pipeline['sample_rate'] = float(pipeline['sample_rate'])
+            pipeline['url_rate'] = float(pipeline['url_rate']) if pipeline['url_rate'] else None
+            pipeline['url_burst'] = max(1, int(pipeline['url_burst']))
+        except (TypeError, ValueError):
+            raise ValueError('sample_rate, url_rate y url_burst deben ser numéricos')
+        if not 0 < pipeline['sample_rate'] <= 1:
+            raise ValueError('sample_rate debe estar entre 0 (excluido) y 1')
+        self.pipeline = pipeline
+        self.apply_config()
+        self.save_config()
+    
+    def get_pipeline_stats(self):
+        return {
+            'running': self._listener is not None,
+            'queued': self._queue_handler.queue.qsize() if self._queue_handler else 0,
+            'dropped': self._queue_handler.dropped if self._queue_handler else 0,
+            'sampled_out': self.sampler.sampled_out,
+            'rate_limited': self.sampler.rate_limited
+        }
     
     def set_level(self, level, logger_name=None):
         """Cambia el nivel de logging global o para un logger específico."""
@@ -95,7 +284,8 @@ class LoggingManager:
         """Devuelve la configuración actual."""
         return {
             'global_level': self.current_level,
-            'loggers': self.loggers
+            'loggers': self.loggers,
+            'pipeline': self.pipeline
         }
 
 # Instancia global para usar en toda la aplicación
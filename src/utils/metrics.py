@@ -0,0 +1,279 @@
+import itertools
+import math
+import threading
+import weakref
+from bisect import bisect_left
+from collections import deque
+
+# Límites (segundos) por defecto de los histogramas de latencia
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _ThreadCells:
+    """Celdas de un hilo; el registro las suma al exponer y las acumula al morir el hilo"""
+    __slots__ = ('cells', '__weakref__')
+
+    def __init__(self):
+        self.cells = {}
+
+
+class Registry:
+    """Registro de métricas con exposición en formato de texto de Prometheus.
+
+    Cada hilo (o greenlet con eventlet) acumula en sus propias celdas, así
+    que incrementar un contador u observar un valor no toma ningún lock: solo
+    el primer uso en cada hilo se registra. Al exponer se suman las celdas de
+    los hilos vivos y el total acumulado de los que ya terminaron.
+    """
+
+    def __init__(self):
+        self._metrics = {}  # nombre -> métrica, en orden de registro
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._live = {}  # ficha del hilo -> celdas de un hilo vivo
+        self._tokens = itertools.count()
+        self._base = {}  # (nombre, etiquetas) -> celda acumulada de hilos terminados
+        self._dead = deque()  # fichas de hilos terminados pendientes de acumular
+
+    def _cells(self):
+        try:
+            return self._local.holder.cells
+        except AttributeError:
+            holder = _ThreadCells()
+            # Ficha única: el id() de un holder ya liberado puede reutilizarse antes del plegado
+            token = next(self._tokens)
+            with self._lock:
+                self._fold_dead()
+                self._live[token] = holder.cells
+            # Al terminar el hilo se libera su holder y sus celdas pasan al total acumulado.
+            # El finalizador puede ejecutarlo el GC en cualquier punto, incluso con _lock
+            # tomado por este mismo hilo, así que solo encola y el plegado se hace en _totals()
+            weakref.finalize(holder, self._dead.append, token)
+            self._local.holder = holder
+            return holder.cells
+
+    def _fold_dead(self):
+        """Pasa al total acumulado las celdas de los hilos terminados (con _lock tomado)"""
+        while self._dead:
+            cells = self._live.pop(self._dead.popleft(), None) or {}
+            for key, cell in cells.items():
+                base = self._base.get(key)
+                if base is None:
+                    self._base[key] = list(cell)
+                else:
+                    for i, value in enumerate(cell):
+                        base[i] += value
+
+    def _totals(self):
+        with self._lock:
+            self._fold_dead()
+            totals = {key: list(cell) for key, cell in self._base.items()}
+            for cells in self._live.values():
+                for key, cell in list(cells.items()):
+                    total = totals.get(key)
+                    if total is None:
+                        totals[key] = list(cell)
+                    else:
+                        for i, value in enumerate(cell):
+                            total[i] += value
+        return totals
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, CallbackMetric):
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f'Métrica ya registrada con otro tipo o etiquetas: {metric.name}')
+                return existing
+            # Las métricas calculadas se sustituyen: pertenecen a la última instancia que las registró
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def callback_gauge(self, name, documentation, func, labelnames=()):
+        """Gauge calculado al exponer: `func` devuelve un número o, con etiquetas,
+        un dict {tupla de valores de etiquetas: número}"""
+        return self._register(CallbackMetric(self, name, documentation, func, labelnames, 'gauge'))
+
+    def callback_counter(self, name, documentation, func, labelnames=()):
+        """Como callback_gauge, para contadores que ya lleva el propio componente"""
+        return self._register(CallbackMetric(self, name, documentation, func, labelnames, 'counter'))
+
+    def expose(self):
+        """Todas las métricas en formato de texto 0.0.4 de Prometheus"""
+        totals = self._totals()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(totals))
+        return '\n'.join(lines) + '\n'
+
+
+class _Child:
+    """Serie de una métrica con unos valores de etiquetas concretos"""
+    __slots__ = ('_registry', '_key', '_size', '_bounds')
+
+    def __init__(self, metric, values):
+        self._registry = metric.registry
+        self._key = (metric.name, values)
+        self._size = metric.cell_size
+        self._bounds = getattr(metric, 'bounds', None)
+
+    def _cell(self):
+        cells = self._registry._cells()
+        cell = cells.get(self._key)
+        if cell is None:
+            cell = cells[self._key] = [0] * self._size
+        return cell
+
+    def inc(self, amount=1):
+        self._cell()[0] += amount
+
+    def dec(self, amount=1):
+        self._cell()[0] -= amount
+
+    def observe(self, value):
+        cell = self._cell()
+        cell[bisect_left(self._bounds, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+
+class _Metric:
+    kind = None
+    cell_size = 1
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._default = None if self.labelnames else _Child(self, ())
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} espera las etiquetas {self.labelnames}')
+            child = self._children.setdefault(values, _Child(self, values))
+        return child
+
+    def _series(self, totals):
+        """(valores de etiquetas, celda) de esta métrica, incluidas las declaradas sin datos"""
+        series = {values: [0] * self.cell_size for values in self._children}
+        if self._default is not None:
+            series[()] = [0] * self.cell_size
+        for (name, values), cell in totals.items():
+            if name == self.name:
+                series[values] = cell
+        return sorted(series.items())
+
+    def samples(self, totals):
+        return [
+            f'{self.name}{_labels_text(self.labelnames, values)} {_format_value(cell[0])}'
+            for values, cell in self._series(totals)
+        ]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """Gauge que sube y baja (p. ej. sondas en curso); las variaciones se acumulan por hilo"""
+    kind = 'gauge'
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets)) + (math.inf,)
+        # Una cuenta por bucket (no acumulada) más la suma y el número de observaciones
+        self.cell_size = len(self.bounds) + 2
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def samples(self, totals):
+        lines = []
+        for values, cell in self._series(totals):
+            cumulative = 0
+            for bound, count in zip(self.bounds, cell):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_labels_text(self.labelnames, values, le)} {cumulative}')
+            labels = _labels_text(self.labelnames, values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(cell[-2])}')
+            lines.append(f'{self.name}_count{labels} {cell[-1]}')
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Métrica que se lee al exponer a partir de un estado que ya existe (sin coste en el camino caliente)"""
+
+    def __init__(self, registry, name, documentation, func, labelnames=(), kind='gauge'):
+        super().__init__(registry, name, documentation, labelnames)
+        self.func = func
+        self.kind = kind
+
+    def samples(self, totals):
+        try:
+            value = self.func()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        if not self.labelnames:
+            return [f'{self.name} {_format_value(value)}']
+        return [
+            f'{self.name}{_labels_text(self.labelnames, values)} {_format_value(number)}'
+            for values, number in sorted(value.items())
+            if number is not None
+        ]
+
+
+# Registro global de la aplicación
+REGISTRY = Registry()
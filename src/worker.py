@@ -0,0 +1,160 @@
+"""Proceso worker para el modo de sondeo por shards.
+
+Se conecta al coordinador del proceso web, recibe las URLs de su shard, las
+sondea con su propio planificador y devuelve cada resultado por el mismo
+socket. Puede ejecutarse en la misma máquina o en otro nodo:
+
+    MONITOR_SHARD_AUTHKEY=secreto python src/worker.py --coordinator 127.0.0.1:6000 --worker-id w1
+"""
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from multiprocessing.connection import Client
+
+import requests
+
+from monitor.scheduler import ProbeScheduler, current_queue_wait
+from monitor.probe import ProbeEngine, DEFAULT_URL_OPTIONS
+from monitor.sharding import AUTHKEY_ENV
+
+logger = logging.getLogger('worker')
+
+
+class ShardWorker:
+    def __init__(self, address, worker_id, authkey, max_workers=50, heartbeat=5):
+        self.address = address
+        self.worker_id = worker_id
+        self.authkey = authkey
+        self.heartbeat = heartbeat
+        self.options = {}  # url -> {'interval': ..., 'timing': ..., 'probe_mode': ..., 'dns_cache': ...}
+        self.conn = None
+        self.running = True
+        self._send_lock = threading.Lock()
+        self.probe_engine = ProbeEngine(max_total=max_workers)
+        self.scheduler = ProbeScheduler(self.check_url, workers=max_workers)
+
+    def check_url(self, url):
+        options = self.options.get(url)
+        if options is None:
+            return
+        try:
+            result = self.probe_engine.probe(
+                url,
+                timing=options.get('timing', DEFAULT_URL_OPTIONS['timing']),
+                probe_mode=options.get('probe_mode', DEFAULT_URL_OPTIONS['probe_mode']),
+                dns_cache=options.get('dns_cache', DEFAULT_URL_OPTIONS['dns_cache'])
+            )
+            status_code, response_time, timings = result.status_code, result.response_time, result.timings
+            is_up = status_code == 200
+        except requests.RequestException as e:
+            logger.debug("Error al verificar %s: %s", url, e, extra={'url': url})
+            status_code, response_time, is_up, timings = 0, 0, False, None
+        queue_wait = current_queue_wait()
+        if queue_wait is not None:
+            timings = dict(timings or {}, queue=int(queue_wait * 1000))
+        self.send(('result', url, status_code, response_time, is_up, datetime.utcnow(), timings))
+
+    def send(self, message):
+        with self._send_lock:
+            if self.conn is not None:
+                self.conn.send(message)
+
+    def apply_shard(self, shard):
+        """Sustituye el shard actual conservando la fase de las URLs que no cambian"""
+        for url in list(self.options):
+            if url not in shard:
+                self.unschedule(url)
+        for url, options in shard.items():
+            self.schedule(url, options)
+        logger.info(f"[{self.worker_id}] Shard asignado: {len(shard)} URLs")
+
+    def schedule(self, url, options):
+        previous = self.options.get(url)
+        self.options[url] = options
+        if previous is None:
+            self.scheduler.schedule(url, options['interval'])
+        elif previous['interval'] != options['interval']:
+            self.scheduler.reschedule(url, options['interval'])
+
+    def unschedule(self, url):
+        self.options.pop(url, None)
+        self.scheduler.unschedule(url)
+
+    def run(self):
+        self.scheduler.start()
+        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        while self.running:
+            try:
+                conn = Client(self.address, authkey=self.authkey.encode())
+            except (OSError, EOFError) as e:
+                logger.warning(f"[{self.worker_id}] No se pudo conectar al coordinador: {str(e)}; reintentando")
+                time.sleep(2)
+                continue
+
+            with self._send_lock:
+                self.conn = conn
+            self.send(('hello', self.worker_id))
+            logger.info(f"[{self.worker_id}] Conectado al coordinador {self.address[0]}:{self.address[1]}")
+            try:
+                self._receive_loop(conn)
+            except (EOFError, OSError):
+                logger.warning(f"[{self.worker_id}] Conexión con el coordinador perdida")
+            finally:
+                with self._send_lock:
+                    self.conn = None
+                conn.close()
+
+        self.scheduler.stop()
+        self.probe_engine.close()
+
+    def _receive_loop(self, conn):
+        while self.running:
+            message = conn.recv()
+            command = message[0]
+            if command == 'assign':
+                self.apply_shard(message[1])
+            elif command == 'schedule':
+                self.schedule(message[1], message[2])
+            elif command == 'unschedule':
+                self.unschedule(message[1])
+            elif command == 'stop':
+                self.running = False
+
+    def _heartbeat_loop(self):
+        while self.running:
+            time.sleep(self.heartbeat)
+            try:
+                self.send(('heartbeat',))
+            except (OSError, EOFError):
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker de sondeo por shards')
+    parser.add_argument('--coordinator', default='127.0.0.1:6000', help='host:puerto del coordinador')
+    parser.add_argument('--worker-id', default=f'{socket.gethostname()}-{os.getpid()}')
+    parser.add_argument('--max-workers', type=int, default=50, help='Sondas concurrentes en este proceso')
+    parser.add_argument('--log-level', '-l',
+                        choices=['debug', 'info', 'warning', 'error', 'critical'],
+                        default='info')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper()),
+        format='%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+    )
+
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        parser.error(f'Falta la variable de entorno {AUTHKEY_ENV} con la clave del coordinador')
+
+    host, port = args.coordinator.rsplit(':', 1)
+    ShardWorker((host, int(port)), args.worker_id, authkey, max_workers=args.max_workers).run()
+
+
+if __name__ == '__main__':
+    main()
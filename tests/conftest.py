@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Los módulos se importan como en la aplicación (src en la ruta) y con una base de datos temporal
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.environ.setdefault('MONITOR_DATABASE_URI', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
@@ -0,0 +1,99 @@
+import time
+import pytest
+import requests
+from storage.database import init_db
+from monitor.checker import UptimeChecker
+from monitor.probe import ProbeResult
+
+FLEET = 200
+INTERVAL = 60
+
+
+@pytest.fixture(autouse=True)
+def database():
+    init_db()
+
+
+def _checker(snapshot_path, **kwargs):
+    return UptimeChecker(max_workers=4, snapshot_interval=3600, snapshot_path=str(snapshot_path), **kwargs)
+
+
+def _start_scheduling_only(checker, monkeypatch):
+    """Programa la flota sin arrancar hilos ni sondear"""
+    for component in (checker.scheduler, checker.result_writer, checker.retention, checker.snapshot):
+        monkeypatch.setattr(component, 'start', lambda: None)
+    checker.start_monitoring()
+
+
+@pytest.fixture
+def stale_snapshot(tmp_path, request):
+    """Instantánea de una flota cuya última verificación es muy anterior a su intervalo"""
+    path = tmp_path / 'runtime.state'
+    urls = [f'http://stale-{request.node.name}-{i}.test/' for i in range(FLEET)]
+    checker = _checker(path)
+    for url in urls:
+        checker.add_url(url, INTERVAL)
+        checker.last_check_times[url] = time.time() - 3600
+    checker.snapshot.save()
+    return path, urls
+
+
+@pytest.mark.parametrize('startup_ramp, span', [(None, INTERVAL), (30, 30)])
+def test_stale_snapshot_restart_spreads_first_checks(stale_snapshot, monkeypatch, startup_ramp, span):
+    path, urls = stale_snapshot
+    checker = _checker(path, startup_ramp=startup_ramp)
+    assert all(checker.last_check_times[url] < time.time() - INTERVAL for url in urls)
+    _start_scheduling_only(checker, monkeypatch)
+
+    due = sorted(checker.scheduler.next_due(url) for url in urls)
+    # Nada de disparar toda la flota a la vez: los vencimientos cubren la ventana
+    assert sum(1 for d in due if d < 1) < FLEET // 10
+    assert due[-1] - due[0] > span * 0.8
+    assert due[-1] <= span
+    checker.running = False
+
+
+def test_recent_snapshot_restart_keeps_cadence(tmp_path, monkeypatch):
+    path = tmp_path / 'runtime.state'
+    url = 'http://recent.test/'
+    checker = _checker(path)
+    checker.add_url(url, INTERVAL)
+    checker.last_check_times[url] = time.time() - 10
+    checker.snapshot.save()
+
+    restarted = _checker(path, startup_ramp=5)
+    _start_scheduling_only(restarted, monkeypatch)
+    assert restarted.scheduler.next_due(url) == pytest.approx(INTERVAL - 10, abs=1)
+    restarted.running = False
+
+
+def test_recovered_urls_return_to_their_phase_slots(tmp_path, monkeypatch):
+    checker = _checker(tmp_path / 'runtime.state')
+    urls = [f'http://outage.test/{i}' for i in range(50)]
+    for url in urls:
+        checker.add_url(url, INTERVAL)
+    _start_scheduling_only(checker, monkeypatch)
+
+    host_up = False
+
+    def probe(url, **kwargs):
+        if not host_up:
+            raise requests.ConnectionError('caído')
+        return ProbeResult(200, 5, None)
+
+    monkeypatch.setattr(checker.probe_engine, 'probe', probe)
+
+    # La caída del host deja todas sus URLs en el mismo tick de confirmación
+    for url in urls:
+        checker._check_url(url)
+    confirm = [checker.scheduler.next_due(url) for url in urls]
+    assert max(confirm) - min(confirm) < 1
+
+    host_up = True
+    for url in urls:
+        checker._check_url(url)
+    due = [checker.scheduler.next_due(url) for url in urls]
+    for url, seconds in zip(urls, due):
+        assert seconds == pytest.approx(checker.scheduler.phase_delay(url, INTERVAL), abs=1)
+    assert max(due) - min(due) > INTERVAL / 2
+    checker.running = False
@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta
+from storage.database import init_db, save_results, iter_results
+
+
+def test_iter_results_keyset_crosses_equal_timestamps():
+    init_db()
+    url = 'http://keyset.test/'
+    start = datetime(2026, 1, 1)
+    # Varias filas por instante para que los cortes de lote caigan entre empates de checked_at
+    save_results([
+        {'url': url, 'status_code': 200, 'response_time': i, 'is_up': True,
+         'checked_at': start + timedelta(seconds=i // 4)}
+        for i in range(23)
+    ])
+    rows = list(iter_results(url=url, batch_size=3))
+    keys = [(row.checked_at, row.id) for row in rows]
+    assert len(rows) == 23
+    assert keys == sorted(keys)
+    assert len(set(keys)) == 23
+    assert [row.response_time for row in iter_results(url=url, since=start + timedelta(seconds=2), batch_size=2)] \
+        == list(range(8, 23))
@@ -0,0 +1,23 @@
+import pytest
+from flask import Flask
+from api.log_config import log_api
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(log_api)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('body', [['format', 'json'], 'json', 5])
+def test_set_pipeline_rejects_non_object_body(client, body):
+    response = client.post('/api/logging/pipeline', json=body)
+    assert response.status_code == 400
+    assert response.json['success'] is False
+
+
+def test_set_pipeline_rejects_unknown_option(client):
+    response = client.post('/api/logging/pipeline', json={'colour': 'red'})
+    assert response.status_code == 400
+    assert response.json['success'] is False
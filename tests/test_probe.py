@@ -0,0 +1,72 @@
+import socket
+import struct
+import threading
+import time
+import pytest
+import requests
+from monitor.probe import ProbeEngine, PROBE_PARTIAL, PROBE_FULL
+
+
+class StubServer:
+    """Servidor HTTP mínimo que envía parte del cuerpo y luego se detiene o reinicia la conexión"""
+
+    def __init__(self, after_body):
+        self.after_body = after_body
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(5)
+        self.url = f'http://127.0.0.1:{self.sock.getsockname()[1]}/'
+        self._stop = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            conn.recv(65536)
+            conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 100000\r\n\r\n' + b'x' * 100)
+            if self.after_body == 'stall':
+                self._stop.wait(5)
+            else:
+                # Cierre abrupto (RST) a mitad del cuerpo
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            conn.close()
+
+    def close(self):
+        self._stop.set()
+        self.sock.close()
+
+
+@pytest.fixture
+def server(request):
+    stub = StubServer(request.param)
+    yield stub
+    stub.close()
+
+
+@pytest.mark.parametrize('server', ['stall'], indirect=True)
+def test_partial_body_stall_raises_read_timeout(server):
+    engine = ProbeEngine(partial_bytes=4096)
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        engine.probe(server.url, probe_mode=PROBE_PARTIAL, timeout=0.5)
+    assert time.monotonic() - started < 4
+    engine.close()
+
+
+@pytest.mark.parametrize('server', ['stall'], indirect=True)
+def test_full_body_stall_raises_request_exception(server):
+    engine = ProbeEngine()
+    with pytest.raises(requests.RequestException):
+        engine.probe(server.url, probe_mode=PROBE_FULL, timeout=0.5)
+    engine.close()
+
+
+@pytest.mark.parametrize('server', ['reset'], indirect=True)
+def test_partial_body_reset_raises_connection_error(server):
+    engine = ProbeEngine(partial_bytes=4096)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        engine.probe(server.url, probe_mode=PROBE_PARTIAL, timeout=2)
+    engine.close()